@@ -6,6 +6,8 @@ from typing import List, Tuple
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.by import By
 
+from ..seen_index import CARD_UNCHANGED, check_card
+
 
 def _scroll_listing(driver, steps: int):
     try:
@@ -25,6 +27,8 @@ def collect_list_items(
 ) -> Tuple[list[dict], int, int, int]:
     """
     Return (items, total_cards, skipped_pid, skipped_href).
+    Card đã crawl mà giá/diện tích/ngày đăng/tiêu đề không đổi thì bỏ qua (tính vào skipped_href),
+    card đã đổi được trả về với card_status = "changed" để runner lấy lại detail.
     """
     _scroll_listing(driver, scroll_steps)
 
@@ -52,19 +56,7 @@ def collect_list_items(
             except:
                 continue  # nếu không có href thì bỏ qua
 
-            if href in scraped_hrefs:
-                skipped_href += 1
-                continue
-
-            # ==============================
-            # Thumbnail (ảnh lớn)
-            # ==============================
-            try:
-                img = el.find_element(By.CSS_SELECTOR, ".clearfix a img")
-                thumbnail = img.get_attribute("src")
-            except:
-                thumbnail = ""
-
+            # Giá, diện tích, thời gian lấy trước để so card với lần crawl trước (check_card)
             # ==============================
             # Giá & diện tích
             # ==============================
@@ -78,6 +70,28 @@ def collect_list_items(
             except:
                 area = ""
 
+            # ==============================
+            # Thời gian (posted_date)
+            # ==============================
+            try:
+                posted_date = el.find_element(By.CSS_SELECTOR, ".reals-update-time").text.strip()
+            except:
+                posted_date = ""
+
+            card_status, digest = check_card(scraped_hrefs, href, title, price, area, posted_date)
+            if card_status == CARD_UNCHANGED:
+                skipped_href += 1
+                continue
+
+            # ==============================
+            # Thumbnail (ảnh lớn)
+            # ==============================
+            try:
+                img = el.find_element(By.CSS_SELECTOR, ".clearfix a img")
+                thumbnail = img.get_attribute("src")
+            except:
+                thumbnail = ""
+
             # ==============================
             # Vị trí
             # ==============================
@@ -94,14 +108,6 @@ def collect_list_items(
             except:
                 description = ""
 
-            # ==============================
-            # Thời gian (posted_date)
-            # ==============================
-            try:
-                posted_date = el.find_element(By.CSS_SELECTOR, ".reals-update-time").text.strip()
-            except:
-                posted_date = ""
-
             # ==============================
             # Agent Name
             # ==============================
@@ -139,7 +145,9 @@ def collect_list_items(
                     "config": {},
                     "map_coords": "",
                     "map_link": "",
-                    "map_dms": ""
+                    "map_dms": "",
+                    "card_digest": digest,
+                    "card_status": card_status,
                 }
             )
 
@@ -149,7 +157,7 @@ def collect_list_items(
         
     if not out:
         print(
-            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} by href."
+            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} unchanged."
         )
         
     return out[:max_items], len(els), 0, skipped_href
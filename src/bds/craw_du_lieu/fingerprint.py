@@ -0,0 +1,224 @@
+"""
+Fingerprint nội dung tin đăng để phát hiện cùng một BĐS đăng trên nhiều site (hoặc đăng lại).
+
+Mỗi tin có hai dấu vết:
+- SimHash 64-bit trên shingle 3 từ của title + description (đã bỏ dấu): tin gần giống nhau
+  có khoảng cách Hamming nhỏ.
+- attr key: số điện thoại chuẩn hoá | diện tích (m², làm tròn) | giá (2 chữ số có nghĩa).
+
+Index dùng chung cho cả 7 site (SQLite ở config.SHARED_OUTPUT_DIR). SimHash được chia thành
+4 band 16 bit, mỗi band có index riêng: hai tin lệch <= 3 bit chắc chắn trùng ít nhất một band
+(nguyên lý chuồng bồ câu), nên tìm ứng viên chỉ cần vài lần tra index thay vì quét toàn bảng.
+
+Module này phải giống hệt nhau giữa các package để fingerprint của các site so sánh được.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .parsers import parse_area, parse_price
+from .utils import normalize_text
+
+FINGERPRINT_DB_FILENAME = "fingerprints.sqlite"
+
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+# Dưới số shingle này SimHash không đủ tin cậy (mô tả quá ngắn), chỉ dùng attr key
+_MIN_SHINGLES = 8
+# Cùng attr key (điện thoại, diện tích, giá) thì chỉ cần nội dung giống nhau ở mức lỏng hơn
+_ATTR_MAX_DISTANCE = 20
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _to_signed(value: int) -> int:
+    # SQLite INTEGER là int64 có dấu
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def simhash(text: str) -> Optional[int]:
+    """SimHash 64-bit (có dấu, để lưu SQLite) trên shingle 3 từ; None nếu văn bản quá ngắn."""
+    tokens = _TOKEN_RE.findall(normalize_text(text))
+    shingles = {" ".join(tokens[i:i + 3]) for i in range(max(0, len(tokens) - 2))}
+    if len(shingles) < _MIN_SHINGLES:
+        return None
+
+    # Mỗi hash thành 64 ký tự '0'/'1' nối liền nhau; cột i (bit 63-i) đếm bằng slice [i::64],
+    # nhanh hơn nhiều so với vòng lặp 64 bit cho từng shingle
+    bits = "".join(
+        format(int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for shingle in shingles
+    )
+    value = 0
+    for i in range(64):
+        # Bit = 1 nếu số shingle có bit 1 nhiều hơn số shingle có bit 0
+        if bits[i::64].count("1") * 2 > len(shingles):
+            value |= 1 << (63 - i)
+    return _to_signed(value)
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+def _bands(value: int) -> list[int]:
+    unsigned = value & 0xFFFFFFFFFFFFFFFF
+    return [(unsigned >> (i * _BAND_BITS)) & _BAND_MASK for i in range(_BANDS)]
+
+
+def normalize_phone(phone: Any) -> Optional[str]:
+    """Chỉ giữ chữ số, +84/84 -> 0; None nếu số bị che hoặc quá ngắn."""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if digits.startswith("84") and len(digits) >= 11:
+        digits = "0" + digits[2:]
+    return digits if len(digits) >= 9 else None
+
+
+def attr_key(item: dict[str, Any]) -> Optional[str]:
+    """Điện thoại | diện tích | giá; None nếu không có số điện thoại hoặc không có cả diện tích lẫn giá."""
+    phone = normalize_phone(item.get("agent_phone"))
+    if not phone:
+        return None
+    # Cùng parser với storage: "5 tỷ 200 triệu", "1.200.000.000", "5 x 20m"... ra cùng số như khi lưu
+    area = parse_area(item.get("area"))
+    price = parse_price(item.get("price")).value
+    if not area and not price:
+        return None
+    area_part = str(round(area)) if area else ""
+    price_part = f"{price:.2g}" if price else ""
+    return f"{phone}|{area_part}|{price_part}"
+
+
+def fingerprint_item(item: dict[str, Any]) -> tuple[Optional[int], Optional[str]]:
+    """(simhash, attr_key) của item raw trả về từ open_detail_and_extract."""
+    text = f"{item.get('title') or ''} {item.get('description') or ''}"
+    return simhash(text), attr_key(item)
+
+
+class FingerprintIndex:
+    """
+    Index fingerprint dùng chung giữa các site (nhiều process cùng mở: WAL + busy_timeout).
+
+    lookup(item) trả về {"site", "href", "distance"} của tin gần giống nhất đã có (khác href),
+    hoặc None, và không ghi gì. add_items(items) ghi fingerprint của các item đã lưu: gọi sau khi
+    sink ghi thành công (WriteBehindSink), để index không trỏ tới tin chưa từng được lưu.
+    Dùng được từ nhiều thread (vòng scrape tra, thread ghi kết quả ghi): mọi truy cập qua self._lock.
+    """
+
+    def __init__(self, db_path: str | Path, site: str, max_distance: int = 3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.site = site
+        self.max_distance = max_distance
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                " site TEXT NOT NULL,"
+                " href TEXT NOT NULL,"
+                " simhash INTEGER,"
+                + "".join(f" band{i} INTEGER," for i in range(_BANDS))
+                + " attr TEXT,"
+                " seen_at TEXT NOT NULL,"
+                " PRIMARY KEY (site, href)"
+                ")"
+            )
+            # Index phủ (band, simhash): lấy ứng viên và tính khoảng cách mà không đọc bảng chính
+            for i in range(_BANDS):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_band{i} ON fingerprints (band{i}, simhash)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_attr ON fingerprints (attr, simhash)")
+
+    def _candidates(self, value: Optional[int], attr: Optional[str]) -> dict[int, tuple[Optional[int], bool]]:
+        """rowid -> (simhash, cùng attr key) của các tin trùng ít nhất một band hoặc trùng attr key."""
+        queries, params = [], []
+        if value is not None:
+            for i, band in enumerate(_bands(value)):
+                queries.append(f"SELECT rowid, simhash, 0 FROM fingerprints WHERE band{i} = ?")
+                params.append(band)
+        if attr:
+            queries.append("SELECT rowid, simhash, 1 FROM fingerprints WHERE attr = ?")
+            params.append(attr)
+        if not queries:
+            return {}
+        candidates: dict[int, tuple[Optional[int], bool]] = {}
+        for rowid, other_value, same_attr in self._conn.execute(" UNION ALL ".join(queries), params):
+            previous = candidates.get(rowid)
+            candidates[rowid] = (other_value, bool(same_attr) or (previous is not None and previous[1]))
+        return candidates
+
+    def find_duplicate(self, href: str, value: Optional[int], attr: Optional[str]) -> Optional[dict[str, Any]]:
+        with self._lock:
+            return self._find_duplicate(href, value, attr)
+
+    def _find_duplicate(self, href: str, value: Optional[int], attr: Optional[str]) -> Optional[dict[str, Any]]:
+        matches = []
+        for rowid, (other_value, same_attr) in self._candidates(value, attr).items():
+            distance = hamming(value, other_value) if value is not None and other_value is not None else None
+            similar_text = distance is not None and distance <= self.max_distance
+            same_attr = same_attr and (distance is None or distance <= _ATTR_MAX_DISTANCE)
+            if similar_text or same_attr:
+                # Trùng attr nhưng không so được nội dung: xếp sau mọi ứng viên có khoảng cách
+                matches.append((distance if distance is not None else 64, rowid))
+
+        for distance, rowid in sorted(matches):
+            site, other_href = self._conn.execute(
+                "SELECT site, href FROM fingerprints WHERE rowid = ?", (rowid,)
+            ).fetchone()
+            if site == self.site and other_href == href:
+                continue
+            return {"site": site, "href": other_href, "distance": distance}
+        return None
+
+    def add(self, href: str, value: Optional[int], attr: Optional[str]) -> None:
+        self.add_many([(href, value, attr)])
+
+    def add_many(self, entries: Iterable[tuple[str, Optional[int], Optional[str]]]) -> None:
+        """Ghi nhiều (href, simhash, attr_key) trong một transaction."""
+        seen_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = (
+            (self.site, href, value, *(_bands(value) if value is not None else [None] * _BANDS), attr, seen_at)
+            for href, value, attr in entries
+        )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, " + "?, " * _BANDS + "?, ?)", rows
+            )
+
+    def lookup(self, item: dict[str, Any]) -> Optional[dict[str, Any]]:
+        """Tin trùng với item raw (xem find_duplicate); không ghi item vào index."""
+        href = str(item.get("href") or "")
+        value, attr = fingerprint_item(item)
+        if not href or (value is None and attr is None):
+            return None
+        return self.find_duplicate(href, value, attr)
+
+    def add_items(self, items: Iterable[dict[str, Any]]) -> int:
+        """Ghi fingerprint của các item raw đã lưu (bỏ qua item không có href hay fingerprint); trả về số item ghi."""
+        entries = []
+        for item in items:
+            href = str(item.get("href") or "")
+            value, attr = fingerprint_item(item)
+            if href and (value is not None or attr is not None):
+                entries.append((href, value, attr))
+        if entries:
+            self.add_many(entries)
+        return len(entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
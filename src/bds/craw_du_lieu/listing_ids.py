@@ -0,0 +1,129 @@
+"""Key số nguyên cho tin đăng: listing ID trong URL, hoặc hash của href nếu URL không có ID."""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+from .. import config
+
+_ID_RE = re.compile(config.LISTING_ID_PATTERN) if config.LISTING_ID_PATTERN else None
+
+
+def extract_listing_id(href: str) -> Optional[int]:
+    """Lấy listing ID (số) từ URL theo config.LISTING_ID_PATTERN, None nếu không có."""
+    if not href or _ID_RE is None:
+        return None
+    match = _ID_RE.search(str(href))
+    if not match:
+        return None
+    listing_id = int(match.group(1))
+    return listing_id if 0 < listing_id < 2 ** 63 else None
+
+
+def listing_key(href: str) -> int:
+    """
+    Key int64 của một href: listing ID (> 0) nếu có, ngược lại là hash 63-bit của href (< 0)
+    để hai loại key không bao giờ trùng nhau.
+    """
+    listing_id = extract_listing_id(href)
+    if listing_id is not None:
+        return listing_id
+    normalized = str(href).strip().split("#", 1)[0].rstrip("/")
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    return -(int.from_bytes(digest, "big") >> 1) - 1
+
+
+class CompactKeySet:
+    """
+    Tập href lưu dưới dạng key int64 (8 byte/tin) thay cho set[str].
+
+    Key đã sort nằm trong array('q') (tìm bằng bisect), key mới vào buffer nhỏ và được
+    merge vào array khi buffer vượt 1/16 kích thước array. Hỗ trợ `in`, add, update, len như set[str].
+    """
+
+    _MIN_PENDING = 4096
+
+    def __init__(self, keys: Iterable[int] = ()):
+        self._sorted = array("q", sorted(set(keys)))
+        self._pending: set[int] = set()
+
+    @classmethod
+    def from_sorted_keys(cls, keys: Iterable[int]) -> "CompactKeySet":
+        """Tạo từ key đã sort tăng dần và không trùng (ví dụ đọc từ INTEGER PRIMARY KEY)."""
+        key_set = cls()
+        key_set._sorted = array("q", keys)
+        return key_set
+
+    def contains_key(self, key: int) -> bool:
+        if key in self._pending:
+            return True
+        idx = bisect_left(self._sorted, key)
+        return idx < len(self._sorted) and self._sorted[idx] == key
+
+    def add_key(self, key: int) -> bool:
+        """Thêm key, trả về True nếu key chưa có."""
+        if self.contains_key(key):
+            return False
+        self._pending.add(key)
+        if len(self._pending) >= max(self._MIN_PENDING, len(self._sorted) >> 4):
+            self._merge()
+        return True
+
+    def _merge(self, batch: Iterable[int] = ()) -> None:
+        # Chỉ sort phần key mới; array cũ đã sort và không trùng nên chỉ cần merge tuyến tính
+        # (không dựng set/list int Python cho toàn bộ array như khi sort lại từ đầu)
+        new_keys = sorted(set(chain(self._pending, batch)))
+        old = self._sorted
+        merged = array("q")
+        if len(new_keys) * 4 > len(old):
+            # Nhiều key mới so với array (nạp lịch sử): merge hai dãy đã sort, bỏ key trùng
+            last = None
+            for key in heapq.merge(old, new_keys):
+                if key != last:
+                    merged.append(key)
+                    last = key
+        else:
+            # Ít key mới: tìm điểm chèn bằng bisect, đoạn array cũ giữa hai điểm chèn được copy nguyên slice
+            start = 0
+            for key in new_keys:
+                idx = bisect_left(old, key, start)
+                merged.extend(old[start:idx])
+                start = idx
+                if idx == len(old) or old[idx] != key:
+                    merged.append(key)
+            merged.extend(old[start:])
+        self._sorted = merged
+        self._pending.clear()
+
+    def __contains__(self, href) -> bool:
+        return bool(href) and self.contains_key(listing_key(href))
+
+    def add(self, href) -> None:
+        if href:
+            self.add_key(listing_key(href))
+
+    def update(self, hrefs: Iterable) -> None:
+        # Nạp nhiều href một lần: gom key vào array rồi merge một lần duy nhất
+        batch = array("q", (listing_key(href) for href in hrefs if href))
+        if len(batch) < self._MIN_PENDING:
+            for key in batch:
+                self.add_key(key)
+            return
+        self._merge(batch)
+
+    def keys(self) -> Iterator[int]:
+        if self._pending:
+            self._merge()
+        return iter(self._sorted)
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._pending)
+
+    def nbytes(self) -> int:
+        """Bộ nhớ ước tính của dữ liệu key (array + buffer)."""
+        return self._sorted.itemsize * len(self._sorted) + 8 * len(self._pending)
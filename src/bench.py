@@ -0,0 +1,960 @@
+"""
+Benchmark cho các bước xử lý dữ liệu (không cần trình duyệt), dùng chung cho mọi package site.
+
+Chạy từ thư mục src/:
+    python bench.py bds                   # chạy tất cả benchmark với package bds
+    python bench.py mogi seen_set         # chỉ chạy các benchmark kể tên
+"""
+from __future__ import annotations
+
+import importlib
+import inspect
+import json
+import math
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+PACKAGES = ("bds", "chotot", "mogi", "nhadat_cafeland", "sosanhnha", "thongkenhadat", "vndiaoc")
+
+# Corpus chữ hiển thị giá / diện tích / số phòng của các site, dùng chung với tests/test_parsers.py
+PARSER_CORPUS = Path(__file__).with_name("parser_corpus.json")
+
+_MODULES = (
+    "fingerprint", "fuzzy", "gazetteer", "geo", "listing_ids", "mapping", "matcher",
+    "parsers", "price_history", "result_stream", "storage", "utils",
+)
+
+
+class Site:
+    """
+    Site(package): các module craw_du_lieu của một package (site.storage, site.mapping, ...).
+    Module mà package không có (chotot không có gazetteer, fuzzy) là None.
+    """
+
+    def __init__(self, package: str):
+        self.package = package
+        for name in _MODULES:
+            module_name = f"{package}.craw_du_lieu.{name}"
+            try:
+                module = importlib.import_module(module_name)
+            except ModuleNotFoundError as e:
+                if e.name != module_name:
+                    raise
+                module = None
+            setattr(self, name, module)
+        # Sheet của map.xlsx lưu entry {"id", "province_id", ...} theo key đã normalize_text,
+        # hay chỉ ID theo key chữ thường (chotot)
+        self.entries = "filter_slug_parts" in inspect.signature(self.mapping.get_mapping).parameters
+
+    def has(self, name: str) -> bool:
+        """Package có module ("fuzzy") hoặc hàm ("mapping.find_ward_key_loose") này không."""
+        module_name, _, attr = name.partition(".")
+        module = getattr(self, module_name)
+        return module is not None and (not attr or hasattr(module, attr))
+
+    def lookup(self, sheet_name: str, value: str) -> Any:
+        """get_mapping không qua LRU (đo index)."""
+        if self.entries:
+            return self.mapping._get_mapping_cached.__wrapped__(sheet_name, value, None, False)
+        return self.mapping._get_mapping_cached.__wrapped__(sheet_name, value)
+
+    def sheet_key(self, name: str) -> str:
+        """Key của tên trong sheet map.xlsx."""
+        return self.utils.normalize_text(name) if self.entries else name.lower().strip()
+
+
+def _traced(build: Callable[[], object]) -> tuple[object, int, float]:
+    """Chạy build() hai lần: một lần đo thời gian, một lần đo số byte còn giữ (tracemalloc)."""
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def _sample_hrefs(n: int):
+    for i in range(n):
+        yield f"https://example.vn/ban-nha-rieng-tai-bac-giang-{i % 97}-{20_000_000 + i}.html"
+
+
+def bench_seen_set(site: Site, n: int = 1_000_000) -> None:
+    """Bộ nhớ cho n href: set[str] hiện tại so với CompactKeySet."""
+    str_set, str_bytes, str_time = _traced(lambda: set(_sample_hrefs(n)))
+    del str_set
+
+    def build_compact():
+        key_set = site.listing_ids.CompactKeySet()
+        key_set.update(_sample_hrefs(n))
+        return key_set
+
+    key_set, key_bytes, key_time = _traced(build_compact)
+
+    probe = [f"https://example.vn/ban-nha-rieng-tai-bac-giang-{i % 97}-{20_000_000 + i}.html" for i in range(0, n, max(1, n // 10_000))]
+    start = time.perf_counter()
+    hits = sum(1 for href in probe if href in key_set)
+    lookup_us = (time.perf_counter() - start) / len(probe) * 1e6
+
+    with_id = sum(1 for href in probe if site.listing_ids.extract_listing_id(href) is not None)
+    per_million = 1_000_000 / n
+    print(f"[seen_set] {n} hrefs ({with_id}/{len(probe)} mẫu có listing ID)")
+    print(f"  set[str]      : {str_bytes * per_million / 2**20:8.1f} MiB / 1M tin, build {str_time:.2f}s")
+    print(f"  CompactKeySet : {key_bytes * per_million / 2**20:8.1f} MiB / 1M tin, build {key_time:.2f}s, "
+          f"lookup {lookup_us:.2f} µs ({hits}/{len(probe)} hit)")
+
+
+def _sample_record(i: int, rng: random.Random) -> dict:
+    """Record giống output đã transform, description dài như tin thật."""
+    words = ["nhà", "mặt tiền", "sổ hồng", "chính chủ", "gần chợ", "hẻm xe hơi", "view đẹp", "tiện kinh doanh"]
+    return {
+        "real_estate_type_id": rng.randint(1, 30),
+        "sale_type": "sell",
+        "demand_id": 1,
+        "province_id": rng.randint(1, 63),
+        "district_id": None,
+        "ward_id": rng.randint(1, 10_000),
+        "address_detail": f"Phường {i % 20}, Quận {i % 12}, Hồ Chí Minh",
+        "area": round(rng.uniform(30, 300), 1),
+        "area_unit": "m2",
+        "price": rng.randint(1, 200) * 100_000_000,
+        "price_unit": 1,
+        "title": f"Bán nhà {rng.choice(words)} {i}",
+        "content": " ".join(rng.choice(words) for _ in range(rng.randint(80, 250))),
+        "contact_type": 2,
+        "contact_name": "Anh Nam",
+        "images": [f"https://img.example.vn/{i}/{j}.jpg" for j in range(rng.randint(3, 12))],
+        "other_info": {"href": f"https://example.vn/ban-nha-{20_000_000 + i}.html"},
+    }
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def bench_compression(site: Site, days: int = 30, per_day: int = 1000) -> None:
+    """Dung lượng và thời gian load một tháng output: .json (indent=2) so với .json.gz và archive tháng."""
+    rng = random.Random(0)
+    month = [[_sample_record(d * per_day + i, rng) for i in range(per_day)] for d in range(days)]
+    today = datetime(2025, 2, 1)
+    root = Path(tempfile.mkdtemp(prefix="bench_compression_"))
+    try:
+        print(f"[compression] {days} ngày x {per_day} tin")
+        for label, suffix, seal in (("plain .json", ".json", False),
+                                    ("gzip .json.gz", ".json.gz", False),
+                                    ("sealed .zip", ".json", True)):
+            output_dir = root / label.split()[0]
+            month_dir = output_dir / "2025-01"
+            month_dir.mkdir(parents=True)
+            start = time.perf_counter()
+            for d, items in enumerate(month, start=1):
+                site.storage._atomic_write_json(month_dir / f"2025-01-{d:02d}{suffix}", {"data": items})
+            if seal:
+                site.storage.seal_past_months(output_dir, today)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            n_items = sum(1 for source in site.storage._iter_previous_files(str(output_dir), today) for _ in site.result_stream.iter_results(source))
+            load_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            n_hrefs = len(site.storage.load_previous_hrefs(str(output_dir), today))
+            href_time = time.perf_counter() - start
+
+            print(f"  {label:14s}: {_dir_bytes(output_dir) / 2**20:8.1f} MiB, ghi {write_time:.2f}s, "
+                  f"load {n_items} items {load_time:.2f}s, hrefs {n_hrefs} {href_time:.2f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_manifest(site: Site, months: int = 3, per_day: int = 500) -> None:
+    """Thời gian warm-up dedup: parse toàn bộ file ngày so với chỉ đọc manifest tháng."""
+    rng = random.Random(0)
+    root = Path(tempfile.mkdtemp(prefix="bench_manifest_"))
+    today = datetime(2025, months + 1, 1)
+    try:
+        n = 0
+        for m in range(1, months + 1):
+            month_dir = root / f"2025-{m:02d}"
+            month_dir.mkdir()
+            for d in range(1, 29):
+                items = [_sample_record(n + i, rng) for i in range(per_day)]
+                n += per_day
+                site.storage._atomic_write_json(month_dir / f"2025-{m:02d}-{d:02d}.json", {"data": items})
+        print(f"[manifest] {months} tháng, {n} tin, {_dir_bytes(root) / 2**20:.1f} MiB")
+
+        start = time.perf_counter()
+        hrefs, _ = site.storage.load_previous_results(str(root), today)
+        print(f"  parse file ngày        : {len(hrefs)} href {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        hrefs = site.storage.load_previous_hrefs(str(root), today)
+        print(f"  dựng manifest (1 lần)  : {len(hrefs)} href {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        hrefs = site.storage.load_previous_hrefs(str(root), today)
+        print(f"  đọc manifest           : {len(hrefs)} href {time.perf_counter() - start:.2f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_fingerprint(site: Site, n: int = 1_000_000, probes: int = 10_000) -> None:
+    """Tra tin trùng trong index fingerprint có n tin: thời gian / lần tra và tỉ lệ tìm đúng."""
+    rng = random.Random(0)
+    root = Path(tempfile.mkdtemp(prefix="bench_fingerprint_"))
+    try:
+        index = site.fingerprint.FingerprintIndex(root / "fingerprints.sqlite", "bench")
+        values = [rng.getrandbits(64) - (1 << 63) for _ in range(n)]
+        start = time.perf_counter()
+        index.add_many((f"https://example.vn/{i}", value, None) for i, value in enumerate(values))
+        build_time = time.perf_counter() - start
+
+        # Một nửa là bản sao lệch 1-3 bit của tin đã có, một nửa là tin mới
+        queries = []
+        for i in range(probes):
+            if i % 2 == 0:
+                value = values[rng.randrange(n)]
+                for bit in rng.sample(range(64), rng.randint(1, 3)):
+                    value ^= 1 << bit
+                value = ((value + (1 << 63)) % (1 << 64)) - (1 << 63)
+                queries.append((value, True))
+            else:
+                queries.append((rng.getrandbits(64) - (1 << 63), False))
+
+        start = time.perf_counter()
+        found = [index.find_duplicate("https://example.vn/probe", value, None) is not None for value, _ in queries]
+        lookup_us = (time.perf_counter() - start) / probes * 1e6
+        recall = sum(f for f, (_, dup) in zip(found, queries) if dup) / (probes // 2)
+        false_hits = sum(f for f, (_, dup) in zip(found, queries) if not dup)
+
+        rng_item = random.Random(1)
+        items = [_sample_record(i, rng_item) for i in range(1000)]
+        start = time.perf_counter()
+        for item in items:
+            site.fingerprint.fingerprint_item({"title": item["title"], "description": item["content"], "agent_phone": "0912345678",
+                              "area": f"{item['area']} m²", "price": "5,2 tỷ"})
+        fp_us = (time.perf_counter() - start) / len(items) * 1e6
+
+        print(f"[fingerprint] {n} tin, nạp {build_time:.1f}s")
+        print(f"  tra cứu      : {lookup_us:.0f} µs / lần, recall {recall:.3f}, trùng nhầm {false_hits}/{probes // 2}")
+        print(f"  fingerprint  : {fp_us:.0f} µs / tin")
+        index.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_price_history(site: Site, listings: int = 200_000, days: int = 180, changes_per_day: int = 5_000) -> None:
+    """Nạp log lịch sử giá và truy vấn "giá đổi trong N ngày ở tỉnh X"."""
+    rng = random.Random(0)
+    root = Path(tempfile.mkdtemp(prefix="bench_price_history_"))
+    try:
+        start_ts = 1_735_689_600  # 2025-01-01
+        history = site.price_history.PriceHistory(root / "price_history.bin")
+        provinces = {key: rng.randint(1, 63) for key in range(1, listings + 1)}
+        history.record_many(
+            ((key, rng.randint(1, 200) * 1e8, 1, province) for key, province in provinces.items()), ts=start_ts
+        )
+        for day in range(1, days + 1):
+            keys = rng.sample(range(1, listings + 1), changes_per_day)
+            history.record_many(
+                ((key, rng.randint(1, 200) * 1e8, 1, provinces[key]) for key in keys), ts=start_ts + day * 86400
+            )
+        size = history.path.stat().st_size
+        print(f"[price_history] {len(history)} bản ghi, {history.listing_count()} tin, {size / 2**20:.1f} MiB")
+
+        start = time.perf_counter()
+        history = site.price_history.PriceHistory(history.path)
+        print(f"  nạp log                : {time.perf_counter() - start:.2f}s")
+
+        now = start_ts + days * 86400
+        for window in (1, 7, 30):
+            start = time.perf_counter()
+            changes = history.price_changes(window, province_id=1, now=now)
+            elapsed = time.perf_counter() - start
+            print(f"  {window:>2} ngày, tỉnh 1       : {len(changes)} lần đổi {elapsed * 1000:.1f}ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _find_ward_key_scan(json_path: Path, name: str, province_id=None, district_id=None):
+    """Bản cũ của find_ward_key_loose (json.load + quét tuyến tính mỗi lần gọi), để so sánh."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    name_norm = name.strip().lower()
+    for key, value in data.items():
+        if value.get("province_id") != province_id or name_norm not in value.get("name", "").lower():
+            continue
+        if not district_id or float(value.get("district_id")) == float(district_id):
+            return int(key)
+    return None
+
+
+def bench_ward_lookup(site: Site, provinces: int = 63, districts: int = 12, wards: int = 14, queries: int = 2_000) -> None:
+    """find_ward_key_loose: load JSON + quét mỗi lần gọi so với index (province_id, district_id)."""
+    rng = random.Random(0)
+    root = Path(tempfile.mkdtemp(prefix="bench_ward_"))
+    try:
+        data, names = {}, []
+        key = 0
+        for province_id in range(1, provinces + 1):
+            for d in range(districts):
+                district_id = province_id * 100 + d
+                for w in range(wards):
+                    key += 1
+                    name = f"Phường {w + 1}" if w % 2 else f"Xã {rng.choice(['An', 'Bình', 'Tân', 'Phú'])} {rng.choice(['Hòa', 'Lộc', 'Thạnh', 'Long'])}"
+                    data[str(key)] = {"name": name, "province_id": province_id, "district_id": float(district_id)}
+                    names.append((name, province_id, district_id))
+        json_path = root / "ward_mapping.json"
+        json_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        print(f"[ward_lookup] {len(data)} ward, {json_path.stat().st_size / 2**20:.1f} MiB JSON")
+
+        probes = []
+        for _ in range(queries):
+            name, province_id, district_id = rng.choice(names)
+            kind = rng.random()
+            if kind < 0.2:
+                name = name.split()[-1]          # chỉ một phần tên
+            elif kind < 0.3:
+                name = "không tồn tại"
+            probes.append((name, province_id, district_id if rng.random() < 0.8 else None))
+
+        start = time.perf_counter()
+        old = [_find_ward_key_scan(json_path, *probe) for probe in probes[:200]]
+        old_time = (time.perf_counter() - start) / 200
+        lookup = site.mapping.find_ward_key_loose.__wrapped__      # đo index, không qua LRU
+        start = time.perf_counter()
+        lookup(str(json_path), *probes[0])
+        load_time = time.perf_counter() - start
+        start = time.perf_counter()
+        new = [lookup(str(json_path), *probe) for probe in probes]
+        new_time = (time.perf_counter() - start) / len(probes)
+        differ = sum(1 for a, b in zip(old, new) if a != b)
+        print(f"  load + quét (cũ)       : {old_time * 1e3:.2f}ms / lần")
+        print(f"  dựng index (1 lần)     : {load_time * 1e3:.1f}ms")
+        print(f"  tra index (mới)        : {new_time * 1e6:.1f}µs / lần")
+        print(f"  khác kết quả           : {differ}/{len(old)} (tên khớp chính xác được ưu tiên)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _get_mapping_scan(site: Site, sheet_mapping: dict, value: str):
+    """Bước 1-3 của get_mapping trước khi có index (không filter), để so sánh."""
+    if not site.entries:
+        # Sheet chỉ lưu ID: khớp chính xác rồi "chứa", không có bước partial
+        value_lower = value.lower().strip()
+        if value_lower in sheet_mapping:
+            return sheet_mapping[value_lower]
+        for key, mapped_id in sheet_mapping.items():
+            if value_lower in key or key in value_lower:
+                return mapped_id
+        return None
+    value_norm = site.utils.normalize_text(value)
+    entry = sheet_mapping.get(value_norm)
+    if entry:
+        return entry["id"]
+    for key, entry in sheet_mapping.items():
+        if site.mapping.partial_match(value_norm, key):
+            return entry["id"]
+    for key, entry in sheet_mapping.items():
+        if value_norm in key or key in value_norm:
+            return entry["id"]
+    return None
+
+
+_SYLLABLES = ["An", "Bình", "Tân", "Phú", "Hòa", "Lộc", "Thạnh", "Long", "Mỹ", "Đông", "Tây", "Sơn", "Hải", "Quang"]
+
+
+def _ward_sheet(site: Site, wards: int, rng: random.Random) -> tuple[dict, list[str]]:
+    """Sheet ward_id giả (các key như _parse_workbook lưu) và tên ward."""
+    prefixes = ["Phường", "Xã", "Thị trấn"]
+    sheet: dict = {}
+    names = []
+    for i in range(wards):
+        if i % 3 == 0:
+            name = f"Phường {i % 30 + 1}"
+        else:
+            name = f"{rng.choice(prefixes)} {rng.choice(_SYLLABLES)} {rng.choice(_SYLLABLES)}"
+        names.append(name)
+        if not site.entries:
+            sheet.setdefault(name.lower(), i + 1)
+            sheet[f"{name.lower().replace(' ', '-')}-{i}"] = i + 1
+            continue
+        entry = {"id": i + 1, "district_id": i // 12 + 1, "province_id": i // 160 + 1}
+        for key in (name.lower(), site.utils.normalize_text(name), f"{site.utils.normalize_text(name).replace(' ', '-')}-{i}"):
+            sheet[key] = entry
+    return sheet, names
+
+
+def bench_mapping_fallback(site: Site, wards: int = 10_000, queries: int = 2_000) -> None:
+    """get_mapping khi không khớp chính xác: quét mọi key so với inverted index từ/trigram của sheet."""
+    rng = random.Random(0)
+    sheet, names = _ward_sheet(site, wards, rng)
+    print(f"[mapping_fallback] sheet {len(sheet)} key")
+
+    probes = []
+    for _ in range(queries):
+        kind = rng.random()
+        if kind < 0.4:
+            probes.append(rng.choice(names).split(" ", 1)[1])                   # bỏ "Phường/Xã"
+        elif kind < 0.7:
+            probes.append(f"{rng.choice(_SYLLABLES)} {rng.choice(['Xanh', 'Trung', 'Cát'])}")  # không có
+        else:
+            probes.append(f"{rng.choice(names)} {rng.choice(['cũ', 'mới'])}")
+
+    lookup = site.lookup  # đo index, không qua LRU
+    site.mapping._mappings_cache["__bench__"] = sheet
+    try:
+        start = time.perf_counter()
+        old = [_get_mapping_scan(site, sheet, probe) for probe in probes[:200]]
+        old_time = (time.perf_counter() - start) / 200
+        start = time.perf_counter()
+        lookup("__bench__", probes[0])
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        new = [lookup("__bench__", probe) for probe in probes]
+        new_time = (time.perf_counter() - start) / len(probes)
+    finally:
+        site.mapping._mappings_cache.pop("__bench__", None)
+        site.mapping._sheet_indexes.pop("__bench__", None)
+    differ = sum(1 for a, b in zip(old, new) if a != b)
+    print(f"  quét toàn sheet (cũ)   : {old_time * 1e3:.2f}ms / lần")
+    print(f"  dựng index (1 lần)     : {build_time * 1e3:.1f}ms")
+    print(f"  qua index (mới)        : {new_time * 1e3:.3f}ms / lần")
+    print(f"  khác kết quả           : {differ}/{len(old)}")
+
+
+_PROVINCES = [
+    "Hà Nội", "Hồ Chí Minh", "Đà Nẵng", "Hải Phòng", "Cần Thơ", "Bình Dương", "Đồng Nai", "Khánh Hòa",
+    "Bà Rịa Vũng Tàu", "Long An", "Quảng Ninh", "Lâm Đồng", "Thừa Thiên Huế", "Bắc Ninh", "Kiên Giang",
+]
+_SPEC_KEYS = [
+    "Diện tích", "Mức giá", "Mặt tiền", "Đường vào", "Hướng nhà", "Hướng ban công", "Số tầng",
+    "Số phòng ngủ", "Số toilet", "Pháp lý", "Giấy tờ pháp lý", "Nội thất", "Tình trạng nội thất",
+    "Loại hình nhà ở", "Vị trí", "Tiện ích", "An ninh", "Điều kiện sử dụng",
+]
+_SPEC_VALUES = [
+    "Sổ đỏ/ Sổ hồng", "Đã có sổ", "Sổ hồng riêng", "Hợp đồng mua bán", "Đang chờ sổ", "Đầy đủ",
+    "Cơ bản", "4 m", "Đông Nam", "3 tầng", "Nhà mặt phố", "Hẻm xe hơi", "Bảo vệ 24/7",
+]
+_TYPE_SLUGS = ["nha-mat-pho-mat-tien", "nha-ngo-hem", "nha-rieng", "can-ho-chung-cu", "dat-nen-du-an", "dat", "kho-nha-xuong", "van-phong"]
+
+
+def _sample_raw_item(i: int, rng: random.Random) -> dict:
+    """Item raw như open_detail_and_extract trả về (trước transform)."""
+    province = rng.choice(_PROVINCES)
+    sale = "cho-thue" if rng.random() < 0.2 else "ban"
+    return {
+        "pid": str(20_000_000 + i),
+        "href": f"https://example.vn/{sale}-{rng.choice(_TYPE_SLUGS)}-duong-le-loi-phuong-{i % 20}-pr{20_000_000 + i}",
+        "title": f"{rng.choice(['Bán', 'Chính chủ bán', 'Cho thuê'])} {rng.choice(['nhà riêng', 'căn hộ chung cư', 'đất nền', 'nhà mặt phố', 'kho xưởng', 'biệt thự'])} {province} {rng.choice(['gần chợ', 'sổ hồng riêng', 'hẻm xe hơi', 'view sông'])}",
+        "price": rng.choice(["4,5 tỷ", "850 triệu", "12 triệu/tháng", "Thỏa thuận", "2.5 tỷ"]),
+        "area": f"{rng.randint(30, 300)} m²",
+        "location": f"Đường Lê Lợi, Phường {i % 20 + 1}, Quận {i % 12 + 1}, {province}",
+        "specs": {key: rng.choice(_SPEC_VALUES) for key in rng.sample(_SPEC_KEYS, rng.randint(4, 10))},
+        "config": {},
+        "agent_name": "Anh Nam",
+        "agent_phone": "0901234567",
+        "images": [],
+    }
+
+
+def bench_matcher(site: Site, items: int = 20_000) -> None:
+    """KeywordMatcher so với vòng `kw in text` cũ, trên các bảng từ khoá của transform."""
+    rng = random.Random(0)
+    raw = [_sample_raw_item(i, rng) for i in range(items)]
+    hrefs = [item["href"].lower() for item in raw]
+    titles = [item["title"].lower() for item in raw]
+    spec_keys = [str(key).lower() for item in raw for key in item["specs"]]
+    spec_values = [str(value).lower() for item in raw for value in item["specs"].values()]
+    # Bước 3 của get_mapping trên sheet cỡ province_id: key của tỉnh so với từng phần của location
+    sheet_keys = []
+    for province in _PROVINCES:
+        for name in (province, f"Tỉnh {province}", f"Thành phố {province}"):
+            for key in (name.lower(), site.sheet_key(name), site.sheet_key(name).replace(" ", "-")):
+                if key not in sheet_keys:
+                    sheet_keys.append(key)
+    parts = [site.sheet_key(part) for item in raw[:5000] for part in item["location"].split(",")]
+    print(f"[matcher] {len(raw)} item: {len(spec_keys)} tên trường, {len(parts)} phần location")
+
+    def timed(fn, texts) -> float:
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        return (time.perf_counter() - start) / len(texts) * 1e6
+
+    groups: dict = {}
+    for pattern, label in zip(site.storage._SPEC_KEY_GROUPS.patterns, site.storage._SPEC_KEY_GROUPS.labels):
+        groups.setdefault(label, []).append(pattern)
+    legal_keywords = [kw for keywords in site.storage._LEGAL_DOCS_VALUES.values() for kw in keywords]
+    cases = [
+        ("slug loại BĐS / href", site.storage._REAL_ESTATE_TYPE_SLUGS, hrefs,
+         lambda t: [kw for kw in site.storage._REAL_ESTATE_TYPE_SLUGS if kw in t]),
+        ("loại BĐS / title", site.storage._REAL_ESTATE_TYPE_TITLE_WORDS, titles,
+         lambda t: [kw for kw in site.storage._REAL_ESTATE_TYPE_TITLE_WORDS if kw in t]),
+        ("nhóm tên trường", site.storage._SPEC_KEY_GROUPS.patterns, spec_keys,
+         lambda t: [label for label, kws in groups.items() if any(kw in t for kw in kws)]),
+        ("giấy tờ / giá trị", legal_keywords, spec_values,
+         lambda t: [kw for kw in legal_keywords if kw in t]),
+        (f"sheet {len(sheet_keys)} key", sheet_keys, parts,
+         lambda t: [key for key in sheet_keys if key in t]),
+    ]
+    print(f"  {'bảng':<22} {'từ khoá':>7} {'vòng in':>9} {'automaton':>10}  (automaton từ {site.matcher.MIN_PATTERNS} từ khoá)")
+    for label, patterns, texts, loop in cases:
+        automaton = site.matcher.KeywordMatcher(patterns)
+        assert all(automaton.matches(t) == [kw for kw in patterns if kw in t] for t in texts[:2000])
+        print(f"  {label:<22} {len(patterns):>7} {timed(loop, texts):>7.2f}µs {timed(automaton.search, texts):>8.2f}µs")
+
+
+def bench_mapping_cache(site: Site, items: int = 5_000, wards: int = 10_000) -> None:
+    """LRU của get_mapping: tra từng phần location của các tin như transform, có và không có cache."""
+    rng = random.Random(0)
+    sheet, _ = _ward_sheet(site, wards, rng)
+    parts = [part.strip() for i in range(items) for part in _sample_raw_item(i, rng)["location"].split(",")]
+    print(f"[mapping_cache] {len(parts)} lần tra, {len(set(parts))} chuỗi khác nhau")
+
+    lookup = site.lookup
+    site.mapping._mappings_cache["__bench__"] = sheet
+    try:
+        lookup("__bench__", parts[0])   # dựng index trước
+        sample = parts[:2000]
+        start = time.perf_counter()
+        expected = [lookup("__bench__", part) for part in sample]
+        uncached_time = (time.perf_counter() - start) / len(sample)
+
+        site.mapping._get_mapping_cached.cache_clear()
+        start = time.perf_counter()
+        got = [site.mapping.get_mapping("__bench__", part) for part in parts]
+        cached_time = (time.perf_counter() - start) / len(parts)
+        stats = site.mapping.mapping_cache_stats()["get_mapping"]
+    finally:
+        site.mapping._mappings_cache.pop("__bench__", None)
+        site.mapping._sheet_indexes.pop("__bench__", None)
+        site.mapping._get_mapping_cached.cache_clear()
+    assert got[:len(expected)] == expected
+    print(f"  không cache            : {uncached_time * 1e6:.1f}µs / lần")
+    print(f"  LRU                    : {cached_time * 1e6:.1f}µs / lần "
+          f"({stats['hits']}/{stats['hits'] + stats['misses']} hit, nhớ {stats['size']})")
+
+
+def _admin_tree(site: Site, provinces: int, districts: int, wards: int, rng: random.Random) -> tuple[dict, dict, dict, list]:
+    """Sheet province_id, district_mapping.json, ward_mapping.json giả và (tên phường, quận, tỉnh, ID) của mỗi phường."""
+    sheet, district_data, ward_data, rows = {}, {}, {}, []
+    for province_id in range(1, provinces + 1):
+        province = _PROVINCES[province_id - 1] if province_id <= len(_PROVINCES) else f"Tỉnh {province_id}"
+        for key in (f"Thành phố {province}", province):
+            sheet[site.utils.normalize_text(key)] = {"id": province_id}
+        for d in range(districts):
+            district_id = len(district_data) + 1
+            district = f"Quận {d + 1}" if d % 2 else f"Huyện {rng.choice(_SYLLABLES)} {rng.choice(_SYLLABLES)}"
+            district_data[str(district_id)] = {"name": district, "province_id": province_id}
+            for w in range(wards):
+                ward_id = len(ward_data) + 1
+                ward = f"Phường {w + 1}" if w % 2 else f"Xã {rng.choice(_SYLLABLES)} {rng.choice(_SYLLABLES)}"
+                ward_data[str(ward_id)] = {"name": ward, "province_id": province_id, "district_id": float(district_id)}
+                rows.append((ward, district, province, (province_id, district_id, ward_id)))
+    return sheet, district_data, ward_data, rows
+
+
+def _abbreviate(name: str) -> str:
+    for full, short in (("Thành phố ", "TP. "), ("Quận ", "Q."), ("Phường ", "P."), ("Huyện ", "H. ")):
+        if name.startswith(full):
+            return short + name[len(full):]
+    return name
+
+
+def bench_gazetteer(site: Site, provinces: int = 63, districts: int = 12, wards: int = 14, queries: int = 5_000) -> None:
+    """Tìm tỉnh/quận/phường của location: get_mapping + find_ward_key_loose theo từng phần so với gazetteer."""
+    rng = random.Random(0)
+    sheet, district_data, ward_data, rows = _admin_tree(site, provinces, districts, wards, rng)
+    locations, expected = [], []
+    for _ in range(queries):
+        ward, district, province, ids = rng.choice(rows)
+        if rng.random() < 0.3:
+            ward, district, province = _abbreviate(ward), _abbreviate(district), _abbreviate(f"Thành phố {province}")
+        parts = [ward, district, province]
+        if rng.random() < 0.4:
+            parts.insert(0, "Đường Lê Lợi")
+        locations.append(", ".join(parts))
+        expected.append(ids)
+    print(f"[gazetteer] {len(ward_data)} phường, {len(district_data)} quận/huyện, {len(locations)} location")
+
+    lookup = site.lookup
+    district_index = site.mapping._LooseIndex(district_data)
+    ward_index = site.mapping._LooseIndex(ward_data)
+
+    def per_part(location: str) -> tuple:
+        # Như transform của mogi: tỉnh ở phần cuối cùng tra được, quận parts[-2], phường parts[-3]
+        parts = [part.strip() for part in location.split(",") if part.strip()]
+        province_id = district_id = ward_id = None
+        for part in reversed(parts):
+            if not province_id:
+                province_id = lookup("__bench__", part)
+        if len(parts) >= 2:
+            district_id = district_index.find(parts[-2].replace("TP.", "Thành phố").strip(), province_id, None)
+        if len(parts) >= 3 and district_id and province_id:
+            ward_id = ward_index.find(parts[-3], province_id, district_id)
+        return province_id, district_id, ward_id
+
+    site.mapping._mappings_cache["__bench__"] = sheet
+    try:
+        lookup("__bench__", locations[0])
+        start = time.perf_counter()
+        old = [per_part(location) for location in locations]
+        old_time = (time.perf_counter() - start) / len(locations)
+    finally:
+        site.mapping._mappings_cache.pop("__bench__", None)
+        site.mapping._sheet_indexes.pop("__bench__", None)
+
+    start = time.perf_counter()
+    index = site.gazetteer.Gazetteer(sheet, district_data, ward_data)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    new = [index.resolve(location) for location in locations]
+    new_time = (time.perf_counter() - start) / len(locations)
+
+    def accuracy(results: list) -> str:
+        return "/".join(str(sum(1 for got, ids in zip(results, expected) if got[level] == ids[level])) for level in range(3))
+
+    print(f"  dựng gazetteer (1 lần) : {build_time * 1e3:.1f}ms")
+    print(f"  từng phần (cũ)         : {old_time * 1e6:.1f}µs / location, đúng tỉnh/quận/phường {accuracy(old)}")
+    print(f"  gazetteer (mới)        : {new_time * 1e6:.1f}µs / location, đúng tỉnh/quận/phường {accuracy(new)}")
+
+
+def _typo(name: str, rng: random.Random) -> str:
+    """Một lỗi gõ: thay, xoá hoặc thêm một ký tự."""
+    chars = list(name)
+    pos = rng.randrange(len(chars))
+    kind = rng.random()
+    if kind < 0.4:
+        chars[pos] = rng.choice("abcdeghiklmnopqrstuvxy")
+    elif kind < 0.7:
+        del chars[pos]
+    else:
+        chars.insert(pos, rng.choice("abcdeghiklmnopqrstuvxy"))
+    return "".join(chars)
+
+
+def bench_fuzzy(site: Site, districts: int = 24, wards: int = 25, queries: int = 2_000) -> None:
+    """Tên phường/xã gõ sai trong một tỉnh: quét Levenshtein mọi tên so với BK-tree."""
+    rng = random.Random(0)
+    sheet, district_data, ward_data, rows = _admin_tree(site, 1, districts, wards, rng)
+    scope = site.gazetteer.Gazetteer(sheet, district_data, ward_data).wards[(1, None)]
+    ward_names = {ids[2]: site.gazetteer._split_prefix(site.gazetteer._fold(ward))[1] for ward, _, _, ids in rows}
+    probes = []
+    while len(probes) < queries:
+        name = rng.choice(list(ward_names.values()))
+        if len(name) >= 6:
+            probes.append((_typo(name, rng), name))
+    print(f"[fuzzy] {len(ward_names)} phường/xã trong tỉnh, {len(probes)} tên gõ sai (một lỗi)")
+
+    def scan(query: str):
+        limit = site.fuzzy.max_distance(query)
+        best = None
+        for name, value in scope.cores:
+            distance = site.fuzzy.levenshtein(query, name)
+            if distance <= limit and (best is None or distance < best[0]):
+                best = (distance, value)
+        return best and best[1]
+
+    start = time.perf_counter()
+    old = [scan(query) for query, _ in probes[:200]]
+    scan_time = (time.perf_counter() - start) / 200
+    start = time.perf_counter()
+    tree = scope.tree()
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    new = [tree.best(query) for query, _ in probes]
+    tree_time = (time.perf_counter() - start) / len(probes)
+
+    exact = sum(1 for query, _ in probes if query in scope.names)
+    found = sum(1 for match in new if match is not None)
+    correct = sum(1 for match, (_, name) in zip(new, probes) if match is not None and ward_names[match[0]] == name)
+    scan_found = sum(1 for value in old if value is not None)
+    print(f"  quét mọi tên           : {scan_time * 1e6:.0f}µs / lần (tìm được {scan_found}/{len(old)})")
+    print(f"  dựng BK-tree (1 lần)   : {build_time * 1e3:.1f}ms")
+    print(f"  BK-tree                : {tree_time * 1e6:.0f}µs / lần")
+    print(f"  khớp nguyên tên        : {exact}/{len(probes)}")
+    print(f"  khớp gần đúng          : {found}/{len(probes)}, đúng tên {correct} "
+          f"(còn lại: trùng khoảng cách giữa nhiều tên nên bỏ qua)")
+
+
+def bench_geo(site: Site, city_wards: int = 300, other_wards: int = 5_000, pages: int = 400, page_size: int = 20) -> None:
+    """map_coords -> phường gần nhất: quét mọi tâm so với lưới, từng điểm và theo trang (nearest_many)."""
+    rng = random.Random(0)
+    centroids = {}
+    for ward_id in range(1, city_wards + other_wards + 1):
+        if ward_id <= city_wards:
+            lat, lng = 10.7 + rng.uniform(0, 0.3), 106.55 + rng.uniform(0, 0.3)   # một thành phố dày đặc
+        else:
+            lat, lng = rng.uniform(8.5, 23.3), rng.uniform(102.2, 109.4)
+        centroids[str(ward_id)] = {"lat": lat, "lng": lng, "province_id": 1 + ward_id % 63, "district_id": ward_id // 12}
+    grid = site.geo.WardGrid(centroids)
+
+    # Mỗi trang là các tin của cùng thành phố; tin trong cùng dự án trùng toạ độ
+    page_points = []
+    for _ in range(pages):
+        page = []
+        for _ in range(page_size):
+            if page and rng.random() < 0.3:
+                page.append(rng.choice(page))
+            else:
+                page.append((round(10.7 + rng.uniform(0, 0.3), 5), round(106.55 + rng.uniform(0, 0.3), 5)))
+        page_points.append(page)
+    points = [point for page in page_points for point in page]
+    print(f"[geo] {grid.size} tâm phường/xã ({city_wards} trong một thành phố), {pages} trang x {page_size} tin")
+
+    def scan(lat: float, lng: float):
+        best, best_km = None, grid.max_km
+        for key, value in centroids.items():
+            km = site.geo._distance_km(lat, lng, value["lat"], value["lng"])
+            if km <= best_km:
+                best, best_km = int(key), km
+        return best
+
+    start = time.perf_counter()
+    old = [scan(*point) for point in points[:200]]
+    scan_time = (time.perf_counter() - start) / 200
+    start = time.perf_counter()
+    single = [grid.nearest(*point) for point in points]
+    single_time = (time.perf_counter() - start) / len(points)
+    start = time.perf_counter()
+    batched = [grid.nearest_many(page) for page in page_points]
+    batch_time = (time.perf_counter() - start) / len(points)
+
+    assert [location and location[2] for location in single[:200]] == old
+    offset = 0
+    for page, batch in zip(page_points, batched):
+        assert all(batch[point] == single[offset + pos] for pos, point in enumerate(page))
+        offset += len(page)
+    found = sum(1 for location in single if location is not None)
+    print(f"  quét mọi tâm           : {scan_time * 1e6:.0f}µs / điểm")
+    print(f"  lưới, từng điểm        : {single_time * 1e6:.1f}µs / điểm")
+    print(f"  lưới, theo trang       : {batch_time * 1e6:.1f}µs / điểm (bỏ điểm trùng, ứng viên chung theo ô)")
+    print(f"  tìm được phường        : {found}/{len(points)} trong {grid.max_km}km")
+
+
+def bench_transform_batch(site: Site, items: int = 100_000) -> None:
+    """transform_to_example_format từng item so với transform_batch (tra chung location, spec, giá, diện tích)."""
+    rng = random.Random(0)
+    if site.gazetteer is not None:
+        sheet, district_data, ward_data, _ = _admin_tree(site, len(_PROVINCES), 12, 14, rng)
+    else:
+        wards, _ = _ward_sheet(site, 10_000, rng)
+    raw = [_sample_raw_item(i, rng) for i in range(items)]
+    for item in raw:
+        if rng.random() < 0.5:
+            item["map_coords"] = f"{round(10.7 + rng.uniform(0, 0.3), 5)},{round(106.55 + rng.uniform(0, 0.3), 5)}"
+    print(f"[transform_batch] {len(raw)} item, {len({item['location'] for item in raw})} location khác nhau")
+
+    # Mapping giả thay cho map.xlsx / output/*.json; dọn hết sau khi chạy
+    site.mapping.clear_mapping_caches()
+    if site.gazetteer is not None:
+        site.mapping._mappings_cache["province_id"] = sheet
+        site.mapping._loose_indexes["district_mapping.json"] = site.mapping._LooseIndex(district_data)
+        site.mapping._loose_indexes["ward_mapping.json"] = site.mapping._LooseIndex(ward_data)
+        site.gazetteer._gazetteer = (sheet, site.gazetteer.Gazetteer(sheet, district_data, ward_data))
+    else:
+        site.mapping._mappings_cache.update({
+            "province_id": {province.lower(): province_id for province_id, province in enumerate(_PROVINCES, 1)},
+            "district_id": {f"quận {d}": d for d in range(1, 13)},
+            "ward_id": wards,
+        })
+    site.geo._grid = site.geo.WardGrid({})
+    try:
+        site.storage.transform_to_example_format(raw[0])
+        start = time.perf_counter()
+        single = [site.storage.transform_to_example_format(item) for item in raw]
+        single_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batched = site.storage.transform_batch(raw)
+        batch_time = time.perf_counter() - start
+    finally:
+        site.mapping.clear_mapping_caches()
+        if site.gazetteer is not None:
+            site.gazetteer._gazetteer = None
+        site.geo.clear_geo_cache()
+
+    assert batched == single
+    print(f"  từng item              : {single_time:.2f}s ({single_time / len(raw) * 1e6:.0f}µs / item)")
+    print(f"  transform_batch        : {batch_time:.2f}s ({batch_time / len(raw) * 1e6:.0f}µs / item), "
+          f"nhanh hơn {single_time / batch_time:.1f} lần, kết quả giống hệt")
+
+
+def _normalize_text_nfd(text) -> str:
+    """Bản cũ của normalize_text (NFD + bỏ ký tự non-ASCII mỗi lần gọi), để so sánh."""
+    text = unicodedata.normalize('NFD', str(text))
+    text = text.encode('ascii', 'ignore').decode('utf-8')
+    return text.lower().strip()
+
+
+def bench_normalize_text(site: Site, items: int = 20_000) -> None:
+    """normalize_text: NFD + encode ASCII (cũ) so với bảng str.translate, có và không có LRU."""
+    rng = random.Random(0)
+    raw = [_sample_raw_item(i, rng) for i in range(items)]
+    # Như lúc tra: từng phần location, tên/giá trị spec, tiêu đề
+    texts = [part for item in raw for part in item["location"].split(",")]
+    texts += [text for item in raw for pair in item["specs"].items() for text in pair]
+    texts += [item["title"] for item in raw]
+    print(f"[normalize_text] {len(texts)} chuỗi, {len(set(texts))} chuỗi khác nhau")
+
+    timings, results = {}, {}
+    for label, fn in (("nfd", _normalize_text_nfd), ("translate", site.utils._fold_text), ("lru", site.utils.normalize_text)):
+        site.utils._fold_text_cached.cache_clear()
+        start = time.perf_counter()
+        results[label] = [fn(text) for text in texts]
+        timings[label] = (time.perf_counter() - start) / len(texts)
+
+    # Giống hệt bản cũ trừ chữ đ (bản cũ bỏ mất: "Đống Đa" -> "ong a", bản mới -> "dong da")
+    expected = [_normalize_text_nfd(text.replace("đ", "d").replace("Đ", "D")) for text in texts]
+    assert results["translate"] == results["lru"] == expected
+    with_d = sum(1 for text in texts if "đ" in text.lower())
+    print(f"  NFD + encode (cũ)      : {timings['nfd'] * 1e6:.2f}µs / chuỗi")
+    print(f"  str.translate          : {timings['translate'] * 1e6:.2f}µs / chuỗi")
+    print(f"  str.translate + LRU    : {timings['lru'] * 1e6:.2f}µs / chuỗi")
+    print(f"  chuỗi có chữ đ         : {with_d} (bản cũ bỏ mất chữ đ, bản mới -> d)")
+
+
+# Bản cũ của các hàm parse trong storage (regex riêng cho từng trường), để so sánh
+_NUMBER_WORDS_OLD = {
+    "một": 1, "mot": 1, "hai": 2, "ba": 3, "bốn": 4, "bon": 4, "năm": 5, "nam": 5,
+    "sáu": 6, "sau": 6, "bảy": 7, "bay": 7, "tám": 8, "tam": 8, "chín": 9, "chin": 9,
+}
+
+
+def _parse_number_old(text):
+    if not text or not isinstance(text, str):
+        return None
+    text_clean = text.replace(",", "").strip()
+    match = re.search(r'(\d+(?:\.\d+)?)', text_clean)
+    if not match:
+        return None
+    number = float(match.group(1))
+    if 'tỷ' in text_clean.lower() or 'ty' in text_clean.lower():
+        number *= 1000000000
+    elif 'triệu' in text_clean.lower() or 'trieu' in text_clean.lower():
+        number *= 1000000
+    return number
+
+
+def _extract_area_old(area_text):
+    if not area_text:
+        return None
+    text = str(area_text).strip()
+    if re.search(r'\d+\.\d{3}\b', text):
+        clean = text.replace('.', '').replace(',', '.')
+        match = re.search(r'(\d+(?:\.\d+)?)', clean)
+        return float(match.group(1)) if match else None
+    text = text.replace(',', '.')
+    match = re.search(r'(\d+(?:\.\d+)?)', text)
+    return float(match.group(1)) if match else None
+
+
+def _parse_int_old(text):
+    if text is None:
+        return None
+    value_str = str(text)
+    match = re.search(r'(\d+)', value_str)
+    if match:
+        return int(match.group(1))
+    value_lower = value_str.lower()
+    for word, num in _NUMBER_WORDS_OLD.items():
+        if word in value_lower:
+            return num
+    return None
+
+
+def _same_number(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(a, b, rel_tol=1e-9)
+
+
+def bench_parsers(site: Site, repeat: int = 2_000) -> None:
+    """Parse giá/diện tích/số phòng trên corpus chữ hiển thị của các site: regex cũ so với parsers.py."""
+    with open(PARSER_CORPUS, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    old = {"price": _parse_number_old, "area": _extract_area_old, "count": _parse_int_old}
+    new = {"price": lambda text: site.parsers.parse_price(text).value, "area": site.parsers.parse_area, "count": site.parsers.parse_count}
+    print(f"[parsers] {len(corpus)} mẫu từ {len({case['site'] for case in corpus})} site")
+
+    for field in ("price", "area", "count"):
+        cases = [case for case in corpus if case["field"] == field]
+        old_ok = sum(_same_number(old[field](case["text"]), case["value"]) for case in cases)
+        new_ok = 0
+        for case in cases:
+            value = new[field](case["text"])
+            ok = _same_number(value, case["value"])
+            if field == "price":
+                price = site.parsers.parse_price(case["text"])
+                ok = ok and (price.per_m2, price.per_month, price.negotiable) == (
+                    case["per_m2"], case["per_month"], case["negotiable"])
+            assert ok, f"{case['site']} {field} {case['text']!r}: {value!r} != {case['value']!r}"
+            new_ok += ok
+        print(f"  {field:<6} đúng: cũ {old_ok}/{len(cases)}, mới {new_ok}/{len(cases)}")
+
+    # Corpus lặp lại như các tin trong một lần chạy: nhiều chuỗi giống nhau
+    texts = [(case["field"], case["text"]) for case in corpus] * repeat
+    uncached = {"price": site.parsers._parse_price, "area": site.parsers._parse_area, "count": site.parsers.parse_count}
+    for label, fns in (("regex cũ", old), ("parsers.py", uncached), ("parsers.py + LRU", new)):
+        site.parsers._parse_price_cached.cache_clear()
+        site.parsers._parse_area_cached.cache_clear()
+        start = time.perf_counter()
+        for field, text in texts:
+            fns[field](text)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<17}: {elapsed / len(texts) * 1e6:.2f}µs / chuỗi ({len(texts) / elapsed:,.0f} chuỗi/s)")
+
+
+BENCHMARKS: dict[str, Callable[[Site], None]] = {
+    "seen_set": bench_seen_set,
+    "compression": bench_compression,
+    "manifest": bench_manifest,
+    "fingerprint": bench_fingerprint,
+    "price_history": bench_price_history,
+    "ward_lookup": bench_ward_lookup,
+    "mapping_fallback": bench_mapping_fallback,
+    "matcher": bench_matcher,
+    "mapping_cache": bench_mapping_cache,
+    "gazetteer": bench_gazetteer,
+    "fuzzy": bench_fuzzy,
+    "geo": bench_geo,
+    "transform_batch": bench_transform_batch,
+    "normalize_text": bench_normalize_text,
+    "parsers": bench_parsers,
+}
+
+# Benchmark cần module mà không phải package nào cũng có
+_REQUIRES = {"ward_lookup": "mapping.find_ward_key_loose", "gazetteer": "gazetteer", "fuzzy": "fuzzy"}
+
+
+def main(argv: list[str]) -> None:
+    if not argv or argv[0] not in PACKAGES:
+        print(f"Cách dùng: python bench.py <package> [benchmark ...]. Package: {', '.join(PACKAGES)}")
+        return
+    site = Site(argv[0])
+    names = argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Không có benchmark '{name}'. Có: {', '.join(BENCHMARKS)}")
+            continue
+        required = _REQUIRES.get(name)
+        if required and not site.has(required):
+            print(f"[{name}] bỏ qua: {site.package} không có {required}")
+            continue
+        BENCHMARKS[name](site)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -6,6 +6,8 @@ from typing import List, Tuple
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.by import By
 
+from ..seen_index import CARD_UNCHANGED, check_card
+
 
 def _scroll_listing(driver, steps: int):
     try:
@@ -25,6 +27,8 @@ def collect_list_items(
 ) -> Tuple[list[dict], int, int, int]:
     """
     Return (items, total_cards, skipped_pid, skipped_href).
+    Card đã crawl mà giá/diện tích/tiêu đề không đổi thì bỏ qua (tính vào skipped_href),
+    card đã đổi được trả về với card_status = "changed" để runner lấy lại detail.
     """
     _scroll_listing(driver, scroll_steps)
 
@@ -51,11 +55,6 @@ def collect_list_items(
             if not href:
                 continue
 
-            # Check trùng
-            if href in scraped_hrefs:
-                skipped_href += 1
-                continue
-
             # Lấy title (thẻ h3)
             try:
                 title = el.find_element(By.CSS_SELECTOR, "h3").text.strip()
@@ -75,6 +74,12 @@ def collect_list_items(
             except:
                 price = price_per_m2 = area = ""
 
+            # Check trùng: card đã crawl và giá/diện tích/tiêu đề không đổi thì bỏ qua
+            card_status, digest = check_card(scraped_hrefs, href, title, price, area)
+            if card_status == CARD_UNCHANGED:
+                skipped_href += 1
+                continue
+
             out.append(
                 {
                     "href": href,
@@ -93,7 +98,9 @@ def collect_list_items(
                     "config": {},
                     "map_coords": "",
                     "map_link": "",
-                    "map_dms": ""
+                    "map_dms": "",
+                    "card_digest": digest,
+                    "card_status": card_status,
                 }
             )
 
@@ -102,7 +109,7 @@ def collect_list_items(
         
     if not out:
         print(
-            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} by href."
+            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} unchanged."
         )
         
     return out[:max_items], len(els), 0, skipped_href
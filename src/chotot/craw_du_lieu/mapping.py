@@ -1,53 +1,117 @@
 """Module để load và sử dụng mapping từ file xlsx."""
+import functools
+import hashlib
+import json
 import os
+import tempfile
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+from .. import config
+from .matcher import MIN_PATTERNS, KeywordMatcher
+from .utils import normalize_text
+
 # Cache cho mappings
 _mappings_cache: Dict[str, Dict[str, Any]] = {}
 
+# Bản dịch sẵn của map.xlsx (output/map.compiled.json): đọc lại trong vài ms thay vì parse xlsx
+# mỗi lần khởi động. Tăng version khi đổi cách parse/normalize key để file cũ tự build lại.
+_COMPILED_VERSION = 2
+_COMPILED_FILENAME = "map.compiled.json"
+
+
+def _xlsx_path() -> Path:
+    project_root = Path(__file__).resolve().parents[1]
+    return project_root / "output" / "map.xlsx"
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_compiled(xlsx_path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Mapping từ file compiled nếu còn khớp với xlsx (size + mtime, hoặc sha256), ngược lại None."""
+    compiled_path = xlsx_path.with_name(_COMPILED_FILENAME)
+    try:
+        with open(compiled_path, "r", encoding="utf-8") as f:
+            compiled = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if compiled.get("version") != _COMPILED_VERSION:
+        return None
+
+    stat = xlsx_path.stat()
+    source = compiled.get("source") or {}
+    if source.get("size") != stat.st_size or source.get("mtime_ns") != stat.st_mtime_ns:
+        # mtime đổi (copy, checkout lại...) nhưng nội dung như cũ thì vẫn dùng được
+        if source.get("sha256") != _file_sha256(xlsx_path):
+            return None
+
+    mappings = {}
+    for sheet_name, sheet in compiled.get("sheets", {}).items():
+        values = sheet["values"]
+        mappings[sheet_name] = {key: values[idx] for key, idx in sheet["keys"].items()}
+    return mappings
+
+
+def _write_compiled(xlsx_path: Path, mappings: Dict[str, Dict[str, Any]]) -> None:
+    """Ghi file compiled; mỗi entry chỉ lưu một lần (các key của cùng một dòng trỏ tới cùng entry)."""
+    sheets = {}
+    for sheet_name, mapping in mappings.items():
+        values: list = []
+        positions: Dict[int, int] = {}
+        keys = {}
+        for key, value in mapping.items():
+            idx = positions.get(id(value))
+            if idx is None:
+                idx = positions[id(value)] = len(values)
+                values.append(value)
+            keys[key] = idx
+        sheets[sheet_name] = {"values": values, "keys": keys}
+
+    stat = xlsx_path.stat()
+    compiled = {
+        "version": _COMPILED_VERSION,
+        "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _file_sha256(xlsx_path)},
+        "sheets": sheets,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=str(xlsx_path.parent), prefix=".map.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(compiled, f, ensure_ascii=False)
+        os.replace(tmp_path, xlsx_path.with_name(_COMPILED_FILENAME))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _parse_workbook(xlsx_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Đọc tất cả sheet của map.xlsx (read-only, duyệt từng dòng) thành {sheet: {key: id}}."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    mappings: Dict[str, Dict[str, Any]] = {}
 
-def _load_mappings():
-    """Load tất cả mappings từ file xlsx và cache lại."""
-    global _mappings_cache
-    
-    if _mappings_cache:
-        return _mappings_cache
-    
     try:
-        from openpyxl import load_workbook
-        
-        # Tìm file xlsx
-        project_root = Path(__file__).resolve().parents[1]
-        xlsx_path = project_root / "output" / "map.xlsx"
-        
-        if not xlsx_path.exists():
-            print(f"[Mapping] File {xlsx_path} không tồn tại")
-            return {}
-        
-        wb = load_workbook(xlsx_path, data_only=True)
-        
         for sheet_name in wb.sheetnames:
             ws = wb[sheet_name]
             mapping = {}
-            
-            # Bỏ qua row đầu tiên (header)
-            rows = list(ws.iter_rows(values_only=True))
-            if len(rows) < 2:
-                continue
-            
-            # Tìm header row (có chứa "ID", "Value", "Slug")
-            header_row_idx = None
-            for idx, row in enumerate(rows):
-                if row and any(cell and str(cell).upper() in ["ID", "VALUE", "SLUG"] for cell in row):
-                    header_row_idx = idx
-                    break
-            
-            if header_row_idx is None:
-                continue
-            
-            # Parse data rows
-            for row in rows[header_row_idx + 1:]:
+            header_found = False
+
+            for row in ws.iter_rows(values_only=True):
+                # Tìm header row (có chứa "ID", "Value", "Slug")
+                if not header_found:
+                    header_found = bool(row) and any(
+                        cell and str(cell).upper() in ["ID", "VALUE", "SLUG"] for cell in row
+                    )
+                    continue
+
+                # Parse data rows
                 if not row or not any(cell for cell in row):
                     continue
                 
@@ -77,13 +141,6 @@ def _load_mappings():
                         if slug:
                             mapping[slug.lower()] = id_val
                         
-                        # Normalized version
-                        import unicodedata
-                        def normalize_text(text):
-                            text = unicodedata.normalize('NFD', text)
-                            text = text.encode('ascii', 'ignore').decode('utf-8')
-                            return text.lower().strip()
-                        
                         normalized = normalize_text(value)
                         if normalized != value.lower():
                             mapping[normalized] = id_val
@@ -96,12 +153,32 @@ def _load_mappings():
                     continue
             
             if mapping:
-                _mappings_cache[sheet_name] = mapping
-                print(f"[Mapping] Loaded {len(mapping)} entries from sheet '{sheet_name}'")
-        
+                mappings[sheet_name] = mapping
+    finally:
         wb.close()
+    return mappings
+
+
+def _load_mappings():
+    """Load tất cả mappings (từ file compiled, hoặc parse map.xlsx rồi compile) và cache lại."""
+    global _mappings_cache
+    
+    if _mappings_cache:
+        return _mappings_cache
+    
+    xlsx_path = _xlsx_path()
+    if not xlsx_path.exists():
+        print(f"[Mapping] File {xlsx_path} không tồn tại")
+        return {}
+
+    mappings = _read_compiled(xlsx_path)
+    if mappings is not None:
+        _mappings_cache.update(mappings)
+        _clear_lookup_caches()
         return _mappings_cache
-        
+
+    try:
+        mappings = _parse_workbook(xlsx_path)
     except ImportError:
         print("[Mapping] openpyxl chưa được cài đặt, không thể load mappings")
         return {}
@@ -109,6 +186,97 @@ def _load_mappings():
         print(f"[Mapping] Lỗi khi load mappings: {e}")
         return {}
 
+    _mappings_cache.update(mappings)
+    _clear_lookup_caches()
+    try:
+        _write_compiled(xlsx_path, mappings)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[Mapping] Không ghi được {_COMPILED_FILENAME}: {e}")
+    print(
+        f"[Mapping] Compiled {len(mappings)} sheets "
+        f"({sum(len(m) for m in mappings.values())} keys) từ {xlsx_path.name}"
+    )
+    return _mappings_cache
+
+
+def _json_mapping_path(json_file: str) -> Path:
+    """Đường dẫn file mapping JSON (ví dụ ward_centroids.json) trong output/."""
+    return Path(__file__).resolve().parents[1] / "output" / json_file
+
+
+# Sheet từ MIN_PATTERNS tới số key này tìm "key nằm trong value" bằng KeywordMatcher (một lần duyệt
+# value); sheet nhỏ hơn kiểm tra thẳng mọi key. Sheet lớn hơn (ward_id) dùng trigram hiếm nhất của key:
+# automaton cho hàng chục nghìn key tốn vài giây để dựng và hàng chục MB RAM.
+_CONTAINED_MATCHER_MAX_KEYS = 5000
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _SheetIndex:
+    """
+    Index trigram của một sheet cho bước partial match (contains) của get_mapping.
+
+    Chỉ thu hẹp ứng viên: get_mapping vẫn kiểm tra điều kiện cũ trên ứng viên theo thứ tự key
+    trong sheet, nên kết quả giống hệt quét toàn bộ.
+    - grams: trigram -> vị trí các key chứa nó, cho "value nằm trong key".
+    - contained (KeywordMatcher của mọi key) cho "key nằm trong value". Sheet lớn dùng gram_anchor:
+      mỗi key chỉ nằm ở danh sách trigram hiếm nhất của nó; mọi trigram của key đều có trong value
+      nên trigram hiếm nhất cũng vậy. Sheet nhỏ trả về mọi key.
+    """
+
+    def __init__(self, sheet_mapping: Dict[str, Any]):
+        self.items = list(sheet_mapping.items())
+        self.grams: Dict[str, list] = {}
+        key_grams = []
+        for pos, (key, _) in enumerate(self.items):
+            grams = _trigrams(key)
+            key_grams.append(grams)
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(pos)
+
+        self.contained: Optional[KeywordMatcher] = None
+        # Key ngắn hơn 3 ký tự: luôn là ứng viên
+        self.gram_anchor: Dict[str, list] = {}
+        self.short_keys: list = []
+        if len(self.items) < MIN_PATTERNS:
+            return
+        if len(self.items) <= _CONTAINED_MATCHER_MAX_KEYS:
+            self.contained = KeywordMatcher(key for key, _ in self.items)
+            return
+        gram_count = {gram: len(positions) for gram, positions in self.grams.items()}
+        for pos, grams in enumerate(key_grams):
+            if grams:
+                self.gram_anchor.setdefault(min(grams, key=gram_count.__getitem__), []).append(pos)
+            else:
+                self.short_keys.append(pos)
+
+    def contains_candidates(self, value_lower: str):
+        """Vị trí (tăng dần) các key có thể chứa value_lower hoặc nằm trong value_lower."""
+        if len(value_lower) < 3 or len(self.items) < MIN_PATTERNS:
+            return range(len(self.items))
+        grams = _trigrams(value_lower)
+        candidates = set(min((self.grams.get(g, ()) for g in grams), key=len))
+        if self.contained is not None:
+            candidates.update(self.contained.search(value_lower))
+        else:
+            for gram in grams:
+                candidates.update(self.gram_anchor.get(gram, ()))
+            candidates.update(self.short_keys)
+        return sorted(candidates)
+
+
+# sheet_name -> (sheet mapping, index); dựng lần đầu sheet cần tới partial match
+_sheet_indexes: Dict[str, tuple] = {}
+
+
+def _sheet_index(sheet_name: str, sheet_mapping: Dict[str, Any]) -> _SheetIndex:
+    cached = _sheet_indexes.get(sheet_name)
+    if cached is None or cached[0] is not sheet_mapping:
+        cached = _sheet_indexes[sheet_name] = (sheet_mapping, _SheetIndex(sheet_mapping))
+    return cached[1]
+
 
 def get_mapping(sheet_name: str, value: str) -> Optional[Any]:
     """
@@ -120,7 +288,18 @@ def get_mapping(sheet_name: str, value: str) -> Optional[Any]:
     
     Returns:
         ID tương ứng hoặc None nếu không tìm thấy
+
+    Kết quả được nhớ (LRU, config.MAPPING_CACHE_SIZE) theo sheet và value; bị xoá khi mapping
+    được load lại (xem clear_mapping_caches).
     """
+    # Chưa load được mapping (thiếu map.xlsx, lỗi đọc): không nhớ kết quả, lần tra sau load lại
+    if not _load_mappings():
+        return None
+    return _get_mapping_cached(sheet_name, value)
+
+
+@functools.lru_cache(maxsize=config.MAPPING_CACHE_SIZE)
+def _get_mapping_cached(sheet_name: str, value: str) -> Optional[Any]:
     mappings = _load_mappings()
     
     # Thử với tên sheet gốc và tên sheet đã strip (để xử lý khoảng trắng)
@@ -138,13 +317,32 @@ def get_mapping(sheet_name: str, value: str) -> Optional[Any]:
         return sheet_mapping[value_lower]
     
     # Tìm partial match
-    for key, mapped_id in sheet_mapping.items():
+    index = _sheet_index(sheet_name, sheet_mapping)
+    for pos in index.contains_candidates(value_lower):
+        key, mapped_id = index.items[pos]
         if value_lower in key or key in value_lower:
             return mapped_id
     
     return None
 
 
+def _clear_lookup_caches() -> None:
+    _sheet_indexes.clear()
+    _get_mapping_cached.cache_clear()
+
+
+def clear_mapping_caches() -> None:
+    """Bỏ mapping, index và kết quả đã nhớ; lần tra sau load lại map.xlsx."""
+    _mappings_cache.clear()
+    _clear_lookup_caches()
+
+
+def mapping_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Số lần trúng/trượt LRU và số kết quả đang nhớ."""
+    info = _get_mapping_cached.cache_info()
+    return {"get_mapping": {"hits": info.hits, "misses": info.misses, "size": info.currsize}}
+
+
 def get_all_mappings() -> Dict[str, Dict[str, Any]]:
     """Lấy tất cả mappings đã load."""
     return _load_mappings()
@@ -0,0 +1,208 @@
+"""Index các href đã crawl, lưu trên đĩa (SQLite) thay cho việc quét lại toàn bộ output/."""
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .listing_ids import CompactKeySet, listing_key
+
+# Kết quả so card trên trang list với index
+CARD_NEW = "new"              # chưa từng crawl -> lấy detail
+CARD_CHANGED = "changed"      # đã crawl nhưng giá/diện tích/ngày/tiêu đề đổi -> lấy lại detail
+CARD_UNCHANGED = "unchanged"  # đã crawl, card như cũ -> bỏ qua
+
+_RELATIVE_DATE_RE = re.compile(r"(\d+)\s*(phút|giờ|ngày|tuần|tháng|năm)\s*trước")
+
+
+def _card_date(posted_date: str, now: Optional[datetime] = None) -> str:
+    """
+    Ngày đăng trên card ở dạng ổn định giữa các lần chạy: "3 giờ trước" / "2 ngày trước" / "hôm nay"
+    -> YYYY-MM-DD. "2 tuần trước", "1 tháng trước" không suy ra được ngày chính xác (ngày mai vẫn
+    hiển thị y hệt) nên bỏ qua, tránh coi mọi card cũ là đã thay đổi.
+    """
+    text = " ".join(str(posted_date or "").lower().split())
+    now = now or datetime.now()
+    if "hôm nay" in text:
+        return now.strftime("%Y-%m-%d")
+    if "hôm qua" in text:
+        return (now - timedelta(days=1)).strftime("%Y-%m-%d")
+    match = _RELATIVE_DATE_RE.search(text)
+    if match:
+        num, unit = int(match.group(1)), match.group(2)
+        delta = {"phút": timedelta(minutes=num), "giờ": timedelta(hours=num), "ngày": timedelta(days=num)}.get(unit)
+        return (now - delta).strftime("%Y-%m-%d") if delta else ""
+    return text
+
+
+def card_digest(title: str = "", price: str = "", area: str = "", posted_date: str = "") -> str:
+    """Digest của những gì card trên trang list cho biết về tin: tiêu đề, giá, diện tích, ngày đăng."""
+    parts = [" ".join(str(v or "").split()) for v in (title, price, area)] + [_card_date(posted_date)]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def check_card(
+    scraped_hrefs,
+    href: str,
+    title: str = "",
+    price: str = "",
+    area: str = "",
+    posted_date: str = "",
+) -> tuple[str, str]:
+    """(CARD_NEW / CARD_CHANGED / CARD_UNCHANGED, digest) của một card, dùng trong collect_list_items."""
+    digest = card_digest(title, price, area, posted_date)
+    if isinstance(scraped_hrefs, SeenIndex):
+        return scraped_hrefs.card_status(href, digest), digest
+    return (CARD_UNCHANGED if href in scraped_hrefs else CARD_NEW), digest
+
+
+class SeenIndex:
+    """
+    Tập href đã crawl của một site, dùng thay cho set[str] (hỗ trợ `in`, add, update, len).
+
+    Mỗi href được lưu theo listing_key (listing ID hoặc hash 63-bit). Khi mở, toàn bộ key
+    được nạp vào một CompactKeySet (8 byte/tin) nên kiểm tra `in` không cần truy vấn SQLite.
+
+    - add(): chỉ ghi nhận trong phiên chạy hiện tại (item chưa được lưu ra file).
+    - update(): ghi xuống SQLite, gọi từ storage khi item đã được lưu.
+
+    Mỗi tin còn lưu card_digest (card_digest()) của lần lấy detail gần nhất, để card_status()
+    phân biệt tin mới / tin đã đổi / tin không đổi mà không cần mở trang detail.
+
+    Dùng được từ nhiều thread (vòng scrape và thread ghi kết quả): mọi truy cập qua self._lock.
+
+    persist=False: đọc index như bình thường nhưng update() / card_status() không ghi gì xuống
+    SQLite, các href chỉ được nhớ trong phiên chạy (lần chạy có filter).
+    """
+
+    def __init__(self, db_path: str | Path, persist: bool = True):
+        self.db_path = Path(db_path)
+        self.persist = persist
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            " key INTEGER PRIMARY KEY,"
+            " href TEXT,"
+            " first_seen TEXT NOT NULL,"
+            " card_digest TEXT"
+            ")"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        self._migrate_href_table()
+        self._migrate_card_digest()
+        self.card_stats = {CARD_NEW: 0, CARD_CHANGED: 0, CARD_UNCHANGED: 0}
+
+        self._keys = CompactKeySet.from_sorted_keys(
+            key for (key,) in self._conn.execute("SELECT key FROM listings ORDER BY key")
+        )
+
+    def _migrate_href_table(self) -> None:
+        """Chuyển bảng `seen` (href TEXT) của phiên bản trước sang bảng `listings` theo key số."""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'seen'"
+        ).fetchone()
+        if not exists:
+            return
+        rows = [
+            (listing_key(href), href, first_seen)
+            for href, first_seen in self._conn.execute("SELECT href, first_seen FROM seen")
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO listings (key, href, first_seen) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute("DROP TABLE seen")
+
+    def _migrate_card_digest(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(listings)")}
+        if "card_digest" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE listings ADD COLUMN card_digest TEXT")
+
+    def _status(self, href, digest: Optional[str]) -> tuple[str, Optional[int]]:
+        """(trạng thái card, key của tin đã có trong SQLite nhưng chưa có digest, nếu có)."""
+        if not href or href not in self._keys:
+            return CARD_NEW, None
+        if digest is None:
+            return CARD_UNCHANGED, None
+        key = listing_key(href)
+        row = self._conn.execute("SELECT card_digest FROM listings WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] is None:
+            return CARD_UNCHANGED, key if row is not None else None
+        return (CARD_UNCHANGED if row[0] == digest else CARD_CHANGED), None
+
+    def card_status(self, href, digest: Optional[str]) -> str:
+        """
+        So card với lần lấy detail gần nhất. Tin đã có nhưng chưa có digest (index cũ, hoặc mới lấy
+        trong phiên này) được ghi digest hiện tại và coi là không đổi.
+        """
+        with self._lock:
+            status, missing_digest = self._status(href, digest)
+            if missing_digest is not None and self.persist:
+                with self._conn:
+                    self._conn.execute("UPDATE listings SET card_digest = ? WHERE key = ?", (digest, missing_digest))
+            self.card_stats[status] += 1
+            return status
+
+    def peek_status(self, href, digest: Optional[str]) -> str:
+        """Như card_status nhưng không ghi digest và không tính vào card_stats (lọc item của checkpoint)."""
+        with self._lock:
+            return self._status(href, digest)[0]
+
+    def __contains__(self, href) -> bool:
+        with self._lock:
+            return href in self._keys
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+    def add(self, href) -> None:
+        with self._lock:
+            self._keys.add(href)
+
+    def update(self, hrefs: Iterable, card_digests: Optional[dict[str, str]] = None) -> None:
+        """Ghi các href đã lưu; card_digests (href -> digest) cập nhật digest của lần lấy detail này."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        card_digests = card_digests or {}
+        rows = []
+        for href in hrefs:
+            if not href:
+                continue
+            rows.append((listing_key(href), str(href), today, card_digests.get(href)))
+        if not rows:
+            return
+        with self._lock:
+            for row in rows:
+                self._keys.add_key(row[0])
+            if not self.persist:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO listings (key, href, first_seen, card_digest) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET card_digest = COALESCE(excluded.card_digest, card_digest)",
+                    rows,
+                )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,7 +1,11 @@
+import functools
 import time
 from random import uniform   
 from datetime import datetime, timedelta
 import re
+import unicodedata
+
+from .. import config
 
 def human_sleep(a: float = 3, b: float = 8):
     time.sleep(uniform(a, b))
@@ -76,4 +80,45 @@ def convert_time(text):
     else:
         return None
 
-    return dt.strftime("%d/%m/%Y %H:%M:%S")
\ No newline at end of file
+    return dt.strftime("%d/%m/%Y %H:%M:%S")
+
+def _build_fold_table() -> list:
+    """
+    Bảng str.translate theo mã ký tự (list: tra theo index nhanh hơn dict), đã gộp cả lowercase:
+    chữ Latin có dấu (gồm mọi chữ tiếng Việt) và dấu rời (combining) -> chữ ASCII thường như
+    NFD + bỏ ký tự non-ASCII cho ra; riêng đ/Đ (NFD không tách) -> d. Ký tự khác giữ nguyên.
+    """
+    table: list = list(range(0x1F00))
+    for code in range(ord("A"), ord("Z") + 1):
+        table[code] = code + 32
+    for start, end in ((0x80, 0x250), (0x300, 0x370), (0x1E00, 0x1F00)):
+        for code in range(start, end):
+            folded = unicodedata.normalize('NFD', chr(code)).encode('ascii', 'ignore').decode('ascii').lower()
+            table[code] = folded or None
+    # Ð (U+00D0) hay bị gõ nhầm thay cho Đ
+    for char in "đĐÐ":
+        table[ord(char)] = "d"
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def _fold_text(text: str) -> str:
+    text = text.translate(_FOLD_TABLE)
+    if not text.isascii():
+        # Ký tự ngoài bảng (hiếm): xử lý như cũ
+        text = unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('utf-8').lower()
+    return text.strip()
+
+
+# Key mapping, tên địa danh... lặp lại rất nhiều: nhớ kết quả theo chuỗi
+_fold_text_cached = functools.lru_cache(maxsize=config.MAPPING_CACHE_SIZE)(_fold_text)
+
+
+def normalize_text(text):
+    """Loại bỏ dấu (đ -> d), lowercase và strip"""
+    # Ensure text is string to avoid attribute errors for numeric inputs
+    if isinstance(text, str):
+        return _fold_text_cached(text)
+    return _fold_text(str(text))
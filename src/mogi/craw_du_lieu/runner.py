@@ -1,4 +1,5 @@
 """Module chung chứa logic scraping, có thể dùng cho cả CLI và Web interface."""
+import copy
 import time
 import re
 import unicodedata
@@ -7,10 +8,23 @@ from urllib.parse import urlencode, urlparse, parse_qs, urlunparse, urljoin
 from typing import Optional, Dict, Any, Callable
 
 from .. import config
-from ..browser import init_driver
-from .collectors.detail import open_detail_and_extract
+from .browser_pool import BrowserPool, DetailWorkers
 from .collectors.listing import collect_list_items
-from .storage import load_previous_results, load_today_results, save_results
+from .fingerprint import FINGERPRINT_DB_FILENAME, FingerprintIndex
+from .mapping import mapping_cache_stats
+from .seen_index import CARD_CHANGED, CARD_UNCHANGED
+from .sinks import WriteBehindSink, build_sinks
+from .storage import (
+    clear_checkpoint,
+    compact_journal,
+    compact_past_journals,
+    load_checkpoint,
+    load_today_results,
+    open_seen_index,
+    save_checkpoint,
+    seal_past_months,
+    transform_cache_stats,
+)
 from .utils import human_sleep, normalize_text
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
@@ -259,57 +273,98 @@ def scrape_url(
     all_results,
     results_file,
     filters: Optional[Dict[str, Any]] = None,
-    status_callback: Optional[Dict[str, Any]] = None
+    status_callback: Optional[Dict[str, Any]] = None,
+    fingerprint_index: Optional[FingerprintIndex] = None,
+    sink: Optional[WriteBehindSink] = None,
+    workers: Optional[DetailWorkers] = None,
 ):
-    """Scrape một URL cụ thể với filter tùy chọn."""
+    """
+    Scrape một URL cụ thể với filter tùy chọn.
+
+    `driver` đọc trang list; trang chi tiết của mỗi trang list được mở qua `workers` (song song
+    nếu pool có nhiều trình duyệt). Không có workers thì mở tuần tự trên chính `driver`.
+
+    Nếu checkpoint (của lần chạy bị dừng trước đó) thuộc URL này, bỏ qua bước tìm kiếm và
+    tiếp tục từ trang list đang dở, xử lý nốt các item chưa được lưu.
+
+    Kết quả và checkpoint được ghi qua `sink` (write-behind); không có sink thì ghi đồng bộ
+    vào các sink trong config.RESULT_SINKS.
+    """
     print(f"\n{'='*60}")
     print(f"Starting scrape for URL: {base_url}")
     print(f"{'='*60}\n")
+
+    start_url = base_url
+    if sink is None:
+        sink = WriteBehindSink(
+            build_sinks(results_file), scraped_hrefs, all_results, threaded=False, fingerprint_index=fingerprint_index
+        )
+    if workers is None:
+        workers = DetailWorkers([(None, driver, wait)], threaded=False)
+    checkpoint = load_checkpoint(results_file)
+    if checkpoint and checkpoint["base_url"] != start_url:
+        checkpoint = None
     
     try:
         # ===============================================================
-        # 1) LOAD TRANG GỐC
-        # ===============================================================
-        driver.get(base_url)
-        human_sleep(3, 6)
-
+        # 0) CÓ CHECKPOINT → MỞ THẲNG TRANG LIST ĐANG DỞ
         # ===============================================================
-        # 2) NẾU CÓ LOCATION → TÌM LOCATION TRƯỚC
-        # ===============================================================
-        if filters and filters.get("location"):
-            applied, location_url = apply_search_filters(driver, wait, filters["location"], base_url)
-            human_sleep(2, 4)
-
-            if applied and location_url:
-                # cập nhật base_url bằng URL sau khi tìm kiếm location (có thể đã được điều chỉnh từ sidebar)
-                base_url = location_url
-                print("[URL] Base URL mới sau location:", base_url)
-                
-                # Nếu URL đã được điều chỉnh, load lại trang với URL chính xác
-                if location_url != driver.current_url:
-                    driver.get(location_url)
-                    human_sleep(3, 5)
-            else:
-                print("[Filter] Không thể áp dụng filter location, bỏ qua URL này.")
-                return None
-
+        if checkpoint:
+            print(f"[Checkpoint] Resume page {checkpoint['page_idx']}: {checkpoint['list_url']}")
+            driver.get(checkpoint["list_url"])
+            human_sleep(3, 6)
+        else:
             # ===============================================================
-            # 3) XÂY DỰNG URL CUỐI CÙNG VỚI QUERY FILTER KHÁC
+            # 1) LOAD TRANG GỐC
             # ===============================================================
-        
-            url_with_filters = build_url_with_filters(base_url, filters)
-            print("[URL] URL cuối cùng để scrape:", url_with_filters)
+            driver.get(base_url)
+            human_sleep(3, 6)
 
             # ===============================================================
-            # 4) LOAD URL ĐÃ BAO GỒM LOCATION + FILTERS
+            # 2) NẾU CÓ LOCATION → TÌM LOCATION TRƯỚC
             # ===============================================================
-            driver.get(url_with_filters)
-            human_sleep(3, 6)
+            if filters and filters.get("location"):
+                applied, location_url = apply_search_filters(driver, wait, filters["location"], base_url)
+                human_sleep(2, 4)
+
+                if applied and location_url:
+                    # cập nhật base_url bằng URL sau khi tìm kiếm location (có thể đã được điều chỉnh từ sidebar)
+                    base_url = location_url
+                    print("[URL] Base URL mới sau location:", base_url)
+                
+                    # Nếu URL đã được điều chỉnh, load lại trang với URL chính xác
+                    if location_url != driver.current_url:
+                        driver.get(location_url)
+                        human_sleep(3, 5)
+                else:
+                    print("[Filter] Không thể áp dụng filter location, bỏ qua URL này.")
+                    return None
+
+                # ===============================================================
+                # 3) XÂY DỰNG URL CUỐI CÙNG VỚI QUERY FILTER KHÁC
+                # ===============================================================
+        
+                url_with_filters = build_url_with_filters(base_url, filters)
+                print("[URL] URL cuối cùng để scrape:", url_with_filters)
+
+                # ===============================================================
+                # 4) LOAD URL ĐÃ BAO GỒM LOCATION + FILTERS
+                # ===============================================================
+                driver.get(url_with_filters)
+                human_sleep(3, 6)
 
         # ===============================================================
         # 5) BẮT ĐẦU SCRAPE
         # ===============================================================
         page_idx = 0
+        pending = None
+        if checkpoint:
+            page_idx = max(int(checkpoint.get("page_idx") or 1), 1) - 1
+            # Bỏ các item đã lưu; item "changed" vẫn giữ nếu detail mới chưa được lưu
+            pending = [
+                it for it in checkpoint.get("pending") or []
+                if it.get("href") and scraped_hrefs.peek_status(it["href"], it.get("card_digest")) != CARD_UNCHANGED
+            ]
         max_pages = filters.get("max_pages", config.MAX_PAGES) if filters else config.MAX_PAGES
         max_items_per_page = filters.get("max_items_per_page", config.MAX_ITEMS_PER_PAGE) if filters else config.MAX_ITEMS_PER_PAGE
         
@@ -323,12 +378,17 @@ def scrape_url(
             human_sleep(1, 3)
             current_list_url = driver.current_url
 
-            collected, total_cards, skipped_pid, skipped_href = collect_list_items(
-                driver,
-                scraped_hrefs,
-                max_items_per_page,
-                config.LIST_SCROLL_STEPS,
-            )
+            if pending is not None:
+                # Trang đang dở từ checkpoint: chỉ xử lý các item chưa lưu
+                collected, total_cards, skipped_pid, skipped_href = pending, len(pending), 0, 0
+                pending = None
+            else:
+                collected, total_cards, skipped_pid, skipped_href = collect_list_items(
+                    driver,
+                    scraped_hrefs,
+                    max_items_per_page,
+                    config.LIST_SCROLL_STEPS,
+                )
 
             if not collected:
                 print(
@@ -341,33 +401,41 @@ def scrape_url(
                 if not find_and_click_next_page(driver,wait):
                     print("No further pages available, stopping.")
                     break
+                sink.call(save_checkpoint, results_file, start_url, driver.current_url, page_idx + 1)
                 continue
 
-            print(f"Collected {len(collected)} new items meta on list page.")
+            changed = sum(1 for it in collected if it.get("card_status") == CARD_CHANGED)
+            print(f"Collected {len(collected)} items meta on list page ({changed} changed, re-fetching detail).")
+            # Bản sao: thread ghi chạy song song trong khi các item được mở detail (sửa tại chỗ)
+            sink.call(save_checkpoint, results_file, start_url, current_list_url, page_idx, copy.deepcopy(collected))
 
-            for i, item in enumerate(collected, start=1):
+            for i, (item, full, error) in enumerate(workers.run(collected, current_list_url), start=1):
                 if status_callback:
                     status_callback["total_items"] = len(all_results) + i
                     status_callback["progress"] = f"Trang {page_idx}/{max_pages} - Item {i}/{len(collected)}"
-                
-                print(f"[Page {page_idx}] Item {i}/{len(collected)}")
-                human_sleep(2, 5)
+
+                print(f"[Page {page_idx}] Item {i}/{len(collected)}: {item.get('href')}")
+                if error is not None:
+                    print("  -> error on detail:", error)
+                    continue
                 try:
-                    full = open_detail_and_extract(
-                        driver,
-                        wait,
-                        item,
-                        current_list_url=current_list_url,
-                        screenshot_dir=config.SCREENSHOT_DIR,
-                        detail_scroll_steps=config.DETAIL_SCROLL_STEPS,
-                        human_sleep=human_sleep,
-                    )
                     # Lọc theo ngày
                     if filters:
                         posted_date_from = utils.normalize_date(filters.get("posted_date_from"))
                         expiration_date  = utils.normalize_date(full.get("expiration_date", ""))
                         if expiration_date and expiration_date < posted_date_from:
                             continue
+
+                    if fingerprint_index is not None:
+                        # Chỉ tra; fingerprint được ghi vào index khi item đã lưu (WriteBehindSink)
+                        duplicate_of = fingerprint_index.lookup(full)
+                        if duplicate_of:
+                            print(f"  -> trùng với tin {duplicate_of['site']}: {duplicate_of['href']} (distance {duplicate_of['distance']})")
+                            if config.DUPLICATE_MODE == "drop":
+                                # Ghi vào index để lần sau không mở lại tin đã bỏ
+                                scraped_hrefs.update([full.get("href")])
+                                continue
+                            full["duplicate_of"] = duplicate_of
                     all_results.append(full)
                 
                     if full.get("href"):
@@ -375,9 +443,8 @@ def scrape_url(
                     print(f"  -> phone: {full.get('agent_phone')}, images: {len(full.get('images', []))}")
                 except Exception as e:
                     print("  -> error on detail:", e)
-                human_sleep(1, 3)
 
-            save_results(all_results, results_file, scraped_hrefs)
+            sink.submit(all_results)
             
             if status_callback:
                 status_callback["progress"] = f"Đã lưu {len(all_results)} items. Nghỉ {config.PAGE_COOLDOWN_SECONDS/60:.1f} phút..."
@@ -389,6 +456,9 @@ def scrape_url(
                 break
             if not find_and_click_next_page(driver, wait):
                 break
+            sink.call(save_checkpoint, results_file, start_url, driver.current_url, page_idx + 1)
+
+        sink.call(clear_checkpoint, results_file)
 
     except Exception as e:
         print(f"Error scraping URL {base_url}: {e}")
@@ -408,27 +478,50 @@ def run_scraper(
     Args:
         base_urls: List các URL hoặc string URL đơn
         filters: Dict chứa các filter (location, price_from, price_to, area_from, area_to, direction, frontage, road, max_pages, max_items_per_page)
-        debugger_address: Địa chỉ Chrome debugger (mặc định từ config)
+        debugger_address: Địa chỉ Chrome debugger cho trang list (mặc định trình duyệt đầu tiên trong
+            config.DEBUGGER_ADDRESSES); các trình duyệt còn lại trong pool mở trang chi tiết song song
         status_callback: Dict để cập nhật trạng thái (cho web interface)
     
     Returns:
         Dict chứa total_items và results_file
     """
     today, _, results_file = config.prepare_output_paths(datetime.now(), filters)
+
+    # Journal của ngày trước còn sót (crash) được gộp trước, rồi mới seal các tháng đã qua
+    for output_dir in (config.OUTPUT_DIR, config.OUTPUT_DIR_FILTER):
+        compact_past_journals(output_dir, today)
+        if config.COMPRESS_OUTPUT:
+            seal_past_months(output_dir, today)
     
-    scraped_hrefs, _ = load_previous_results(config.OUTPUT_DIR, today)
+    # Lần chạy có filter không ghi href vào index chung (output chính vẫn crawl lại các tin đó)
+    scraped_hrefs = open_seen_index(config.OUTPUT_DIR, today, persist=not filters)
     all_results = load_today_results(results_file, scraped_hrefs)
 
+    fingerprint_index = None
+    if config.DUPLICATE_MODE != "off":
+        fingerprint_index = FingerprintIndex(
+            config.SHARED_OUTPUT_DIR / FINGERPRINT_DB_FILENAME,
+            config.SITE_NAME,
+            max_distance=config.DUPLICATE_MAX_DISTANCE,
+        )
+
     if all_results:
         print(
             f"Loaded{len(scraped_hrefs)} hrefs "
             f"and {len(all_results)} items from {results_file}"
         )
     
-    driver, wait = init_driver(
-        debugger_address or config.DEBUGGER_ADDRESS,
-        config.PAGE_LOAD_TIMEOUT,
-        config.WAIT_TIMEOUT
+    # Tạo sink trước khi mở trình duyệt để lỗi cấu hình (ví dụ thiếu HTTP_SINK_URL) báo ngay
+    sinks = build_sinks(results_file)
+    addresses = list(config.DEBUGGER_ADDRESSES)
+    if debugger_address:
+        addresses[:1] = [debugger_address]
+    pool = BrowserPool(addresses, launch=config.LAUNCH_BROWSERS)
+    driver, wait = pool.listing
+    # Trình duyệt list cũng là trình duyệt chi tiết duy nhất → mở tuần tự, không cần thread
+    workers = DetailWorkers(pool.detail, threaded=len(pool.drivers) > 1)
+    sink = WriteBehindSink(
+        sinks, scraped_hrefs, all_results, threaded=config.WRITE_BEHIND, fingerprint_index=fingerprint_index
     )
     
     try:
@@ -437,6 +530,12 @@ def run_scraper(
             base_urls = [base_urls]
         elif not isinstance(base_urls, list):
             raise ValueError(f"base_urls phải là string hoặc list, nhận được: {type(base_urls)}")
+
+        # Lần chạy trước dừng giữa chừng → bỏ qua các URL đã xong, tiếp tục từ URL trong checkpoint
+        checkpoint = load_checkpoint(results_file)
+        if checkpoint and checkpoint["base_url"] in base_urls:
+            base_urls = base_urls[base_urls.index(checkpoint["base_url"]):]
+            print(f"[Checkpoint] Resuming from {checkpoint['base_url']}")
         
         for url_idx, base_url in enumerate(base_urls, start=1):
             if status_callback:
@@ -456,7 +555,10 @@ def run_scraper(
                     all_results,
                     results_file,
                     filters=filters,
-                    status_callback=status_callback
+                    status_callback=status_callback,
+                    fingerprint_index=fingerprint_index,
+                    sink=sink,
+                    workers=workers,
                 )
             except Exception as e:
                 print(f"Error processing URL {base_url}: {e}")
@@ -472,13 +574,25 @@ def run_scraper(
                 
     except KeyboardInterrupt:
         print("\nScraping interrupted by user. Saving current results...")
-        save_results(all_results, results_file, scraped_hrefs)
+        sink.submit(all_results)
     finally:
-        driver.quit()
+        # Ghi nốt các batch còn trong queue trước khi gộp journal và đóng index
+        sink.close()
+        workers.close()
+        pool.close()
+        compact_journal(results_file)
+        scraped_hrefs.close()
+        if fingerprint_index is not None:
+            fingerprint_index.close()
     
     return {
         "total_items": len(all_results),
         "results_file": str(results_file),
+        "transform_cache": dict(transform_cache_stats),
+        "cards": dict(scraped_hrefs.card_stats),
+        "sink": dict(sink.stats),
+        "mapping_cache": mapping_cache_stats(),
+        "workers": [dict(stats) for stats in workers.stats],
         "url":base_url
     }
 
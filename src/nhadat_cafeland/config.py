@@ -4,6 +4,13 @@ import os
 
 # === Config mặc định ===
 DEBUGGER_ADDRESS = "127.0.0.1:9222"
+# Pool trình duyệt: mỗi address là một Chrome đã mở sẵn với --remote-debugging-port.
+# Trình duyệt đầu tiên đọc trang list; có từ hai trình duyệt trở lên thì mỗi trình duyệt còn lại
+# mở trang chi tiết song song (một thread/trình duyệt). Một trình duyệt: chạy tuần tự như cũ.
+DEBUGGER_ADDRESSES = [DEBUGGER_ADDRESS]
+# Tự mở thêm LAUNCH_BROWSERS Chrome (cổng trống bất kỳ, profile riêng trong CHROME_PROFILE_DIR)
+LAUNCH_BROWSERS = 0
+CHROME_BINARY = os.environ.get("CRAW_CHROME_BINARY", "google-chrome")
 BASE_URL = "https://nhadat.cafeland.vn/nha-dat-ban/ban-nha-rieng-tai-bac-giang-bac-ninh/"   # hoặc list URL
 MAX_PAGES = 2
 MAX_ITEMS_PER_PAGE = 26
@@ -15,10 +22,60 @@ DETAIL_SCROLL_STEPS = 6
 
 SCREENSHOT_DIR = "screenshots_blocked"
 
+# "journal": mỗi trang chỉ append item mới vào YYYY-MM-DD.jsonl, gộp thành .json ở cuối lần chạy
+# "rewrite": ghi lại toàn bộ file .json sau mỗi trang (cách cũ)
+SAVE_MODE = "journal"
+
+# Ghi kết quả ở thread nền (write-behind): vòng scrape chỉ đẩy batch mỗi trang vào queue rồi chạy tiếp.
+# Queue đầy (ghi chậm hơn scrape) thì vòng scrape chờ. False: ghi đồng bộ sau mỗi trang như cũ.
+WRITE_BEHIND = True
+WRITE_BEHIND_QUEUE_SIZE = 8
+
+# Nơi ghi kết quả, mỗi batch được ghi vào tất cả (fan-out):
+# "json": file output/YYYY-MM/YYYY-MM-DD.json (format example.json) như trước
+# "sqlite": bảng results trong output/results.sqlite (upsert theo tin)
+# "http": POST các chunk JSON nén gzip tới HTTP_SINK_URL (service ingest)
+RESULT_SINKS = ["json"]
+SQLITE_SINK_FILENAME = "results.sqlite"
+HTTP_SINK_URL = os.environ.get("CRAW_INGEST_URL", "")
+HTTP_SINK_TOKEN = os.environ.get("CRAW_INGEST_TOKEN", "")
+HTTP_SINK_BATCH_SIZE = 200
+HTTP_SINK_MAX_RETRIES = 5
+HTTP_SINK_TIMEOUT = 30
+
+# Số kết quả get_mapping / find_ward_key_loose được nhớ (LRU) trong một process: cùng một chuỗi
+# địa chỉ, loại BĐS... lặp lại hàng nghìn lần mỗi lần chạy nên chỉ phải tra lần đầu
+MAPPING_CACHE_SIZE = 20_000
+
+# Khi địa chỉ chữ không tìm được tỉnh/phường: lấy phường/xã có tâm gần map_coords nhất (geo.py),
+# trong phạm vi GEO_MAX_DISTANCE_KM. Tâm đọc từ output/WARD_CENTROIDS_FILENAME; không có file thì bỏ qua.
+WARD_CENTROIDS_FILENAME = "ward_centroids.json"
+GEO_MAX_DISTANCE_KM = 3.0
+
+# Nén output: file ngày ghi thành YYYY-MM-DD.json.gz (gzip, không indent) và các folder tháng
+# đã qua được đóng gói thành output/YYYY-MM.zip. Loader đọc được cả file thường lẫn file nén.
+COMPRESS_OUTPUT = False
+COMPRESS_LEVEL = 6
+
+# Tin trùng giữa các site: fingerprint (SimHash nội dung + điện thoại/diện tích/giá) lưu trong
+# index chung SHARED_OUTPUT_DIR/fingerprints.sqlite cho cả 7 site.
+# "flag": vẫn lưu, ghi other_info.duplicate_of; "drop": bỏ tin trùng; "off": tắt (mặc định)
+DUPLICATE_MODE = "off"
+# Khoảng cách Hamming tối đa giữa hai SimHash để coi là cùng một tin (<= 3 luôn tìm được qua index)
+DUPLICATE_MAX_DISTANCE = 3
+SITE_NAME = Path(__file__).resolve().parent.name
+# Dùng chung cho cả 7 package nên không theo OUTPUT_DIR riêng của package: output/shared ở gốc repo
+SHARED_OUTPUT_DIR = Path(__file__).resolve().parents[2] / "output" / "shared"
+
+# Regex lấy listing ID (số) từ URL chi tiết, ví dụ https://nhadat.cafeland.vn/...-2150123.html
+# None: URL không có ID, dùng hash của href làm key
+LISTING_ID_PATTERN = r"-(\d+)\.html"
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 OUTPUT_DIR = PROJECT_ROOT / "output"
 OUTPUT_DIR_FILTER = OUTPUT_DIR / "output_filtered"
 OUTPUT_DIR_IMAGES = PROJECT_ROOT / "images"
+CHROME_PROFILE_DIR = PROJECT_ROOT / "chrome_profiles" / SITE_NAME
 
 def ensure_directories():
     """Create top-level directories required for scraping."""
@@ -31,6 +88,10 @@ def sanitize_filename(value: str) -> str:
     return str(value).replace("/", "_").replace("\\", "_").replace(" ", "_")
 
 
+def _results_suffix() -> str:
+    return ".json.gz" if COMPRESS_OUTPUT else ".json"
+
+
 def prepare_output_paths(today: datetime | None = None, filters: dict | None = None):
     today = today or datetime.now()
 
@@ -44,7 +105,7 @@ def prepare_output_paths(today: datetime | None = None, filters: dict | None = N
         month_folder = OUTPUT_DIR_FILTER / today.strftime("%Y-%m")
         month_folder.mkdir(parents=True, exist_ok=True)
 
-        results_file = month_folder / f"{today.strftime('%Y-%m-%d')}_{filtered}.json"
+        results_file = month_folder / f"{today.strftime('%Y-%m-%d')}_{filtered}{_results_suffix()}"
         return today, month_folder, results_file
 
     # Nếu không có filter → output mặc định
@@ -53,5 +114,5 @@ def prepare_output_paths(today: datetime | None = None, filters: dict | None = N
     month_folder = OUTPUT_DIR / today.strftime("%Y-%m")
     month_folder.mkdir(parents=True, exist_ok=True)
 
-    results_file = month_folder / f"{today.strftime('%Y-%m-%d')}.json"
+    results_file = month_folder / f"{today.strftime('%Y-%m-%d')}{_results_suffix()}"
     return today, month_folder, results_file
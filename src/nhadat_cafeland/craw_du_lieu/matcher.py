@@ -0,0 +1,109 @@
+"""
+Khớp nhiều từ khoá trong một chuỗi (Aho-Corasick), thay cho vòng `for kw in bảng: if kw in text`.
+
+Bảng từ khoá được compile một lần; mỗi lần tra chỉ duyệt chuỗi một lần và trả về mọi từ khoá
+xuất hiện trong chuỗi (kể cả các từ khoá chồng lên nhau), theo thứ tự trong bảng.
+
+Chỉ đáng dùng cho bảng lớn (MIN_PATTERNS từ khoá trở lên): với bảng nhỏ, vòng `kw in text` nhanh
+hơn vì so chuỗi của CPython chạy bằng C, còn automaton duyệt từng ký tự bằng Python (xem bench matcher).
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Iterable, Optional
+
+# Số từ khoá tối thiểu để automaton nhanh hơn vòng `kw in text` (đo bằng bench matcher)
+MIN_PATTERNS = 32
+
+
+class KeywordMatcher:
+    """
+    KeywordMatcher(patterns, labels=None): labels[i] là nhãn của patterns[i] (ví dụ nhóm từ khoá),
+    dùng với labels_in().
+    """
+
+    def __init__(self, patterns: Iterable[str], labels: Optional[Iterable[Any]] = None):
+        self.patterns = list(patterns)
+        self.labels = list(labels) if labels is not None else list(self.patterns)
+        if len(self.labels) != len(self.patterns):
+            raise ValueError("labels phải có cùng số phần tử với patterns")
+
+        # "" nằm trong mọi chuỗi
+        self._always = tuple(idx for idx, pattern in enumerate(self.patterns) if not pattern)
+        self._compile()
+
+    @classmethod
+    def from_groups(cls, groups: dict[Any, Iterable[str]]) -> "KeywordMatcher":
+        """Một bảng cho nhiều nhóm từ khoá: nhãn của mỗi từ khoá là tên nhóm."""
+        patterns, labels = [], []
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                patterns.append(keyword)
+                labels.append(label)
+        return cls(patterns, labels)
+
+    def _compile(self) -> None:
+        # Trie
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[int, ...]] = [()]
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                node = nxt
+            out[node] += (idx,)
+
+        # Fail link theo BFS; out của mỗi node gồm cả out của node fail (từ khoá là hậu tố)
+        fail = [0] * len(goto)
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                if node:
+                    f = fail[node]
+                    while f and ch not in goto[f]:
+                        f = fail[f]
+                    fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+
+        # Bảng chuyển đầy đủ (DFA): mỗi ký tự chỉ một lần tra dict, không phải lần theo fail link
+        delta: list[dict[str, int]] = [{}] * len(goto)
+        delta[0] = goto[0]
+        for node in order:
+            transitions = dict(delta[fail[node]])
+            transitions.update(goto[node])
+            delta[node] = transitions
+        self._delta = delta
+        self._out = out
+
+    def search(self, text: str) -> list[int]:
+        """Vị trí (trong bảng) các từ khoá có trong text, tăng dần, không lặp."""
+        delta, out = self._delta, self._out
+        found = set(self._always)
+        node = 0
+        for ch in text:
+            node = delta[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return sorted(found)
+
+    def matches(self, text: str) -> list[str]:
+        """Các từ khoá có trong text, theo thứ tự trong bảng."""
+        return [self.patterns[idx] for idx in self.search(text)]
+
+    def labels_in(self, text: str) -> set:
+        """Nhãn của các từ khoá có trong text."""
+        return {self.labels[idx] for idx in self.search(text)}
+
+    def __len__(self) -> int:
+        return len(self.patterns)
@@ -0,0 +1,227 @@
+"""
+Lịch sử giá theo tin đăng: log nhị phân append-only (output/price_history.bin).
+
+Mỗi bản ghi (25 byte) là một lần giá của tin thay đổi (hoặc lần đầu thấy tin):
+listing_key (int64) | thời điểm (epoch giây) | giá | price_unit | province_id (uint32).
+File bắt đầu bằng header _MAGIC; log của phiên bản trước (không header, province_id 16-bit)
+được chuyển sang format hiện tại khi mở.
+Khi mở, log được nạp vào các array theo cột; prev[i] trỏ tới bản ghi trước đó của cùng tin,
+nên chuỗi giá của một tin và truy vấn "giá đổi trong N ngày qua ở tỉnh X" không cần
+đọc lại các file JSON theo ngày.
+
+Xem nhanh từ thư mục src/:
+    python -m nhadat_cafeland.craw_du_lieu.price_history 7        # giá đổi trong 7 ngày qua
+    python -m nhadat_cafeland.craw_du_lieu.price_history 7 1      # ... chỉ tỉnh province_id = 1
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+PRICE_HISTORY_FILENAME = "price_history.bin"
+
+_MAGIC = b"CRPH\x02\x00\x00\x00"
+_RECORD = struct.Struct("<qIdBI")
+# Format cũ, không header: province_id 16-bit (tràn với ID > 65535)
+_LEGACY_RECORD = struct.Struct("<qIdBH")
+_MAX_PROVINCE_ID = 2 ** 32 - 1
+
+
+class PriceHistory:
+    """Lịch sử giá của mọi tin trong một output dir; chỉ ghi khi giá (hoặc đơn vị giá) thay đổi."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.keys = array("q")
+        self.times = array("I")
+        self.prices = array("d")
+        self.units = array("B")
+        self.provinces = array("I")
+        self.prev = array("q")
+        # listing_key -> vị trí bản ghi mới nhất
+        self._last: dict[int, int] = {}
+        # Thời điểm không giảm dần theo vị trí (record_many không nhận ts lùi); log cũ có thể không
+        # thoả, khi đó price_changes quét cả log thay vì bisect
+        self._ordered = True
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            header = f.read(len(_MAGIC))
+        if header != _MAGIC:
+            self._migrate_legacy()
+            return
+
+        size = self.path.stat().st_size
+        usable = size - (size - len(_MAGIC)) % _RECORD.size
+        if usable != size:
+            # Bản ghi cuối bị ghi dở (crash): bỏ phần thừa
+            with open(self.path, "r+b") as f:
+                f.truncate(usable)
+        with open(self.path, "rb") as f:
+            f.seek(len(_MAGIC))
+            while True:
+                chunk = f.read(_RECORD.size * 65536)
+                if not chunk:
+                    break
+                for key, ts, price, unit, province in _RECORD.iter_unpack(chunk):
+                    self._append(key, ts, price, unit, province)
+
+    def _migrate_legacy(self) -> None:
+        """Đọc log format cũ (23 byte/bản ghi, không header) rồi ghi lại toàn bộ theo format hiện tại."""
+        data = self.path.read_bytes()
+        data = data[:len(data) - len(data) % _LEGACY_RECORD.size]
+        for key, ts, price, unit, province in _LEGACY_RECORD.iter_unpack(data):
+            self._append(key, ts, price, unit, province)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_MAGIC)
+                for idx in range(len(self.keys)):
+                    f.write(_RECORD.pack(
+                        self.keys[idx], self.times[idx], self.prices[idx], self.units[idx], self.provinces[idx]
+                    ))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _append(self, key: int, ts: int, price: float, unit: int, province: int) -> None:
+        if self.times and ts < self.times[-1]:
+            self._ordered = False
+        self.prev.append(self._last.get(key, -1))
+        self._last[key] = len(self.keys)
+        self.keys.append(key)
+        self.times.append(ts)
+        self.prices.append(price)
+        self.units.append(unit)
+        self.provinces.append(province)
+
+    def record_many(self, rows: Iterable[tuple[int, float, int, Optional[int]]], ts: Optional[int] = None) -> int:
+        """
+        Ghi (listing_key, price, price_unit, province_id) nếu giá khác lần ghi gần nhất của tin.
+        Trả về số bản ghi đã append. ts trước bản ghi cuối của log thì raise ValueError.
+        """
+        last_ts = self.times[-1] if self.times else 0
+        if ts is None:
+            # Đồng hồ máy bị chỉnh lùi: giữ thời điểm của bản ghi cuối để log vẫn theo thứ tự
+            ts = max(int(time.time()), last_ts)
+        else:
+            ts = int(ts)
+            if ts < last_ts:
+                raise ValueError(f"ts={ts} trước bản ghi cuối của log ({last_ts})")
+        packed = []
+        for key, price, unit, province in rows:
+            unit = int(unit or 0)
+            last = self._last.get(key)
+            if last is not None and self.prices[last] == price and self.units[last] == unit:
+                continue
+            province = int(province or 0)
+            if not 0 <= province <= _MAX_PROVINCE_ID:
+                # ID ngoài khoảng uint32: ghi như không rõ tỉnh thay vì làm hỏng bản ghi
+                province = 0
+            self._append(key, ts, float(price), unit, province)
+            packed.append(_RECORD.pack(key, ts, float(price), unit, province))
+
+        if packed:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                header = _MAGIC if f.tell() == 0 else b""
+                f.write(header + b"".join(packed))
+                f.flush()
+                os.fsync(f.fileno())
+        return len(packed)
+
+    def history(self, key: int) -> list[tuple[int, float, int]]:
+        """Chuỗi (thời điểm, giá, price_unit) của một tin, cũ -> mới."""
+        out = []
+        idx = self._last.get(key, -1)
+        while idx != -1:
+            out.append((self.times[idx], self.prices[idx], self.units[idx]))
+            idx = self.prev[idx]
+        out.reverse()
+        return out
+
+    def price_changes(
+        self,
+        days: float,
+        province_id: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Các lần đổi giá trong `days` ngày gần nhất (bỏ lần đầu thấy tin), lọc theo tỉnh nếu có.
+        Log được ghi theo thời gian nên chỉ duyệt phần đuôi từ mốc thời gian (bisect).
+        """
+        cutoff = int((now if now is not None else time.time()) - days * 86400)
+        start = bisect_left(self.times, max(cutoff, 0)) if self._ordered else 0
+        changes = []
+        for idx in range(start, len(self.keys)):
+            if self.times[idx] < cutoff:
+                continue
+            prev = self.prev[idx]
+            if prev == -1:
+                continue
+            if province_id is not None and self.provinces[idx] != province_id:
+                continue
+            changes.append({
+                "key": self.keys[idx],
+                "changed_at": self.times[idx],
+                "old_price": self.prices[prev],
+                "new_price": self.prices[idx],
+                "price_unit": self.units[idx],
+                "province_id": self.provinces[idx] or None,
+            })
+        return changes
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def listing_count(self) -> int:
+        return len(self._last)
+
+
+def main(argv: list[str]) -> None:
+    from .. import config
+    from .storage import SEEN_INDEX_FILENAME
+
+    days = float(argv[0]) if argv else 7
+    province_id = int(argv[1]) if len(argv) > 1 else None
+    history = PriceHistory(config.OUTPUT_DIR / PRICE_HISTORY_FILENAME)
+    changes = history.price_changes(days, province_id)
+
+    # href lấy từ seen index (key -> href)
+    hrefs: dict[int, str] = {}
+    seen_db = config.OUTPUT_DIR / SEEN_INDEX_FILENAME
+    if changes and seen_db.exists():
+        conn = sqlite3.connect(str(seen_db))
+        for change in changes:
+            row = conn.execute("SELECT href FROM listings WHERE key = ?", (change["key"],)).fetchone()
+            if row:
+                hrefs[change["key"]] = row[0]
+        conn.close()
+
+    print(f"{len(changes)} lần đổi giá trong {days:g} ngày ({history.listing_count()} tin có lịch sử giá)")
+    for change in changes:
+        changed_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(change["changed_at"]))
+        print(f"  {changed_at}  {change['old_price']:>15,.0f} -> {change['new_price']:>15,.0f}  "
+              f"{hrefs.get(change['key'], change['key'])}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
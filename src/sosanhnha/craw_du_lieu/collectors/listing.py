@@ -7,6 +7,8 @@ from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 
+from ..seen_index import CARD_UNCHANGED, check_card
+
 
 def _scroll_listing(driver, steps: int):
     try:
@@ -27,6 +29,8 @@ def collect_list_items(
 ) -> Tuple[list[dict], int, int, int]:
     """
     Return (items, total_cards, skipped_pid, skipped_href).
+    Card đã crawl mà giá/diện tích/ngày đăng/tiêu đề không đổi thì bỏ qua (tính vào skipped_href),
+    card đã đổi được trả về với card_status = "changed" để runner lấy lại detail.
     """
     _scroll_listing(driver, scroll_steps)
 
@@ -59,19 +63,7 @@ def collect_list_items(
             except:
                 continue  # nếu không có href thì bỏ qua
 
-            if href in scraped_hrefs:
-                skipped_href += 1
-                continue
-
-            # ==============================
-            # Thumbnail (ảnh lớn)
-            # ==============================
-            try:
-                img = el.find_element(By.CSS_SELECTOR, "a.picture img")
-                thumbnail = img.get_attribute("src")
-            except:
-                thumbnail = ""
-
+            # Giá, diện tích, thời gian lấy trước để so card với lần crawl trước (check_card)
             # ==============================
             # Giá & diện tích
             # ==============================
@@ -86,26 +78,40 @@ def collect_list_items(
                 area = ""
 
             # ==============================
-            # Vị trí
+            # Thời gian (posted_date)
             # ==============================
             try:
-                location = el.find_element(
+                posted_date = el.find_element(
                     By.CSS_SELECTOR,
-                    "div.text-gray-700.line-clamp-1"
+                    "span.text-xs.text-gray-700"
                 ).text.strip()
             except:
-                location = ""
+                posted_date = ""
+
+            card_status, digest = check_card(scraped_hrefs, href, title, price, area, posted_date)
+            if card_status == CARD_UNCHANGED:
+                skipped_href += 1
+                continue
 
             # ==============================
-            # Thời gian (posted_date)
+            # Thumbnail (ảnh lớn)
             # ==============================
             try:
-                posted_date = el.find_element(
+                img = el.find_element(By.CSS_SELECTOR, "a.picture img")
+                thumbnail = img.get_attribute("src")
+            except:
+                thumbnail = ""
+
+            # ==============================
+            # Vị trí
+            # ==============================
+            try:
+                location = el.find_element(
                     By.CSS_SELECTOR,
-                    "span.text-xs.text-gray-700"
+                    "div.text-gray-700.line-clamp-1"
                 ).text.strip()
             except:
-                posted_date = ""
+                location = ""
 
             # ==============================
             # Push vào output
@@ -128,7 +134,9 @@ def collect_list_items(
                     "config": {},
                     "map_coords": "",
                     "map_link": "",
-                    "map_dms": ""
+                    "map_dms": "",
+                    "card_digest": digest,
+                    "card_status": card_status,
                 }
             )
 
@@ -137,7 +145,7 @@ def collect_list_items(
 
     if not out:
         print(
-            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} by href."
+            f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} unchanged."
         )
         
     return out[:max_items], len(els), 0, skipped_href
@@ -0,0 +1,263 @@
+"""
+Gazetteer địa chỉ: tìm tỉnh -> quận/huyện -> phường/xã của một location trong một lượt.
+
+Dựng một lần từ sheet province_id của map.xlsx và output/district_mapping.json,
+output/ward_mapping.json (cùng nguồn ID với get_mapping / find_ward_key_loose). Mỗi cấp là một dict
+tên -> ID trong phạm vi cấp cha: tỉnh -> các quận/huyện của tỉnh -> các phường/xã của quận/huyện.
+
+Tên được bỏ dấu như normalize_text, mở rộng viết tắt ("TP.", "TX.", "TT.", "Q.", "P.", "H.", "Q1", "P12"),
+bỏ số 0 đầu ("Phường 01") và tra theo cả tên đầy đủ lẫn tên bỏ tiền tố hành chính ("Quận 1" / "1").
+Mỗi cấp thử khớp nguyên tên trên mọi phần trước; không phần nào khớp thì mới khớp gần đúng
+(gõ sai, xem fuzzy.py) trong phạm vi cấp cha. Không khớp "chứa": phần không tìm được trả về None
+để transform tra tiếp bằng get_mapping / find_ward_key_loose như trước.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from .. import config
+from .fuzzy import BKTree
+from .mapping import _json_mapping_path, get_all_mappings
+from .utils import normalize_text
+
+_ABBREVIATIONS = (
+    (re.compile(r"\btp\b\.?"), " thanh pho "),
+    (re.compile(r"\btx\b\.?"), " thi xa "),
+    (re.compile(r"\btt\b\.?"), " thi tran "),
+    (re.compile(r"\bq(?:\.|(?=\d))"), " quan "),
+    (re.compile(r"\bp(?:\.|(?=\d))"), " phuong "),
+    (re.compile(r"\bh\."), " huyen "),
+)
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_LEADING_ZEROS = re.compile(r"\b0+(?=\d)")
+
+# Tiền tố hành chính theo cấp (tên đầy đủ đã chuẩn hoá); "thanh pho" có ở cả cấp tỉnh và cấp huyện
+_PROVINCE, _DISTRICT, _WARD = "province", "district", "ward"
+_PREFIXES = {
+    "thanh pho": {_PROVINCE, _DISTRICT},
+    "tinh": {_PROVINCE},
+    "quan": {_DISTRICT},
+    "huyen": {_DISTRICT},
+    "thi xa": {_DISTRICT},
+    "thi tran": {_WARD},
+    "phuong": {_WARD},
+    "xa": {_WARD},
+}
+
+# Cách viết tắt tên tỉnh hay gặp (sau khi đã bỏ tiền tố)
+_PROVINCE_ALIASES = {
+    "hcm": "ho chi minh",
+    "tphcm": "ho chi minh",
+    "sai gon": "ho chi minh",
+    "hn": "ha noi",
+}
+
+
+@functools.lru_cache(maxsize=config.MAPPING_CACHE_SIZE)
+def _fold(text: str) -> str:
+    """Bỏ dấu, mở rộng viết tắt, chỉ giữ chữ/số cách nhau một khoảng trắng (nhớ theo chuỗi)."""
+    text = normalize_text(text)
+    for pattern, replacement in _ABBREVIATIONS:
+        text = pattern.sub(replacement, text)
+    text = _NON_ALNUM.sub(" ", text)
+    return _LEADING_ZEROS.sub("", text).strip()
+
+
+def _split_prefix(name: str) -> Tuple[Optional[str], str]:
+    """("quan", "1") cho "quan 1"; (None, name) nếu không có tiền tố (hoặc chỉ có tiền tố)."""
+    for prefix in _PREFIXES:
+        if name.startswith(prefix + " "):
+            return prefix, name[len(prefix) + 1:]
+    return None, name
+
+
+# Số kết quả khớp gần đúng nhớ lại trong mỗi phạm vi (đầy thì xoá hết)
+_FUZZY_MEMO_SIZE = 1024
+
+
+class _Scope:
+    """Tên -> ID của một cấp trong phạm vi cấp cha, và BK-tree tên bỏ tiền tố (dựng lần đầu cần)."""
+
+    __slots__ = ("names", "cores", "_tree", "_fuzzy")
+
+    def __init__(self, entries: list):
+        # Tên đầy đủ trước rồi tên bỏ tiền tố; trùng tên thì giữ dòng đầu
+        self.names: Dict[str, Any] = {}
+        self.cores: list = []
+        folded = [(_fold(str(name)), value) for name, value in entries]
+        for name, value in folded:
+            if name:
+                self.names.setdefault(name, value)
+        for name, value in folded:
+            core = _split_prefix(name)[1]
+            if core:
+                self.names.setdefault(core, value)
+                self.cores.append((core, value))
+        self._tree: Optional[BKTree] = None
+        self._fuzzy: Dict[str, Any] = {}
+
+    def tree(self) -> BKTree:
+        if self._tree is None:
+            self._tree = BKTree(self.cores)
+        return self._tree
+
+    def fuzzy(self, core: str) -> Optional[Tuple[Any, float]]:
+        """(ID, điểm) của tên gần core nhất (xem BKTree.best), nhớ theo core."""
+        if core in self._fuzzy:
+            return self._fuzzy[core]
+        if len(self._fuzzy) >= _FUZZY_MEMO_SIZE:
+            self._fuzzy.clear()
+        match = self._fuzzy[core] = self.tree().best(core)
+        return match
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Gazetteer:
+    """
+    Gazetteer(provinces, districts, wards, fuzzy=True):
+    - provinces: sheet province_id ({key: {"id": ...}}) như get_mapping dùng
+    - districts: nội dung district_mapping.json ({key: {"name", "province_id"}})
+    - wards: nội dung ward_mapping.json ({key: {"name", "province_id", "district_id"}})
+    - fuzzy: khớp gần đúng khi không phần nào khớp nguyên tên
+    Thiếu districts thì phường/xã được tìm trong cả tỉnh.
+    """
+
+    def __init__(
+        self,
+        provinces: Optional[Dict[str, Any]],
+        districts: Optional[Dict[str, Any]],
+        wards: Optional[Dict[str, Any]],
+        fuzzy: bool = True,
+    ):
+        self.fuzzy = fuzzy
+        self.provinces = _Scope([
+            (key.replace("-", " "), entry["id"])
+            for key, entry in (provinces or {}).items()
+            if isinstance(entry, dict) and entry.get("id") is not None
+        ])
+
+        grouped: Dict[Any, list] = {}
+        for key, value in (districts or {}).items():
+            try:
+                grouped.setdefault(value.get("province_id"), []).append((value.get("name", ""), int(key)))
+            except (AttributeError, TypeError, ValueError):
+                continue
+        self.districts: Dict[Any, _Scope] = {
+            province_id: _Scope(entries) for province_id, entries in grouped.items()
+        }
+
+        # Phường/xã theo (province_id, district_id) và theo (province_id, None) như _LooseIndex
+        grouped = {}
+        for key, value in (wards or {}).items():
+            try:
+                entry = (value.get("name", ""), int(key))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            province_id = value.get("province_id")
+            grouped.setdefault((province_id, None), []).append(entry)
+            district_id = _as_float(value.get("district_id"))
+            if district_id is not None:
+                grouped.setdefault((province_id, district_id), []).append(entry)
+        self.wards: Dict[tuple, _Scope] = {group: _Scope(entries) for group, entries in grouped.items()}
+
+    @staticmethod
+    def _core(part: str, level: str, aliases: Optional[Dict[str, str]]) -> Optional[str]:
+        """Tên bỏ tiền tố, chỉ khi tiền tố (nếu có) đúng cấp: "Phường 1" không dùng được cho cấp quận."""
+        prefix, core = _split_prefix(part)
+        if prefix is not None and level not in _PREFIXES[prefix]:
+            return None
+        return aliases.get(core, core) if aliases else core
+
+    def _find(
+        self,
+        scope: Optional[_Scope],
+        parts: list,
+        pos: int,
+        level: str,
+        aliases: Optional[Dict[str, str]] = None,
+    ) -> Tuple[Any, int, bool]:
+        """
+        (ID, vị trí phần khớp, khớp nguyên tên?) khi duyệt parts[pos], parts[pos - 1], ...;
+        (None, -1, False) nếu không có.
+        """
+        if scope is None:
+            return None, -1, False
+        for part_pos in range(pos, -1, -1):
+            part = parts[part_pos]
+            found = scope.names.get(part)
+            if found is None:
+                core = self._core(part, level, aliases)
+                found = scope.names.get(core) if core else None
+            if found is not None:
+                return found, part_pos, True
+        if self.fuzzy:
+            for part_pos in range(pos, -1, -1):
+                core = self._core(parts[part_pos], level, aliases)
+                match = scope.fuzzy(core) if core else None
+                if match is not None:
+                    return match[0], part_pos, False
+        return None, -1, False
+
+    def resolve(self, location: Any) -> Tuple[Any, Optional[int], Optional[int]]:
+        """
+        (province_id, district_id, ward_id) của location dạng "..., Phường/Xã, Quận/Huyện, Tỉnh/TP".
+
+        Duyệt các phần từ phải sang trái: tỉnh, rồi quận/huyện của tỉnh ở các phần phía trước,
+        rồi phường/xã của quận/huyện (hoặc của tỉnh nếu không thấy quận/huyện, hay quận/huyện chỉ
+        khớp gần đúng: khớp nhầm quận thì không được che mất phường đúng trong tỉnh).
+        """
+        parts = [_fold(part) for part in str(location or "").split(",")]
+        parts = [part for part in parts if part]
+
+        province_id, pos, _ = self._find(self.provinces, parts, len(parts) - 1, _PROVINCE, _PROVINCE_ALIASES)
+        if province_id is None:
+            return None, None, None
+
+        district_id, district_pos, exact = self._find(self.districts.get(province_id), parts, pos - 1, _DISTRICT)
+        if district_id is not None:
+            pos = district_pos
+
+        scope = float(district_id) if district_id is not None and exact else None
+        ward_id, _, _ = self._find(self.wards.get((province_id, scope)), parts, pos - 1, _WARD)
+        return province_id, district_id, ward_id
+
+
+def _read_json_mapping(json_file: str) -> Dict[str, Any]:
+    path = _json_mapping_path(json_file)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# (sheet province_id đã dùng để dựng, Gazetteer); dựng lại khi mapping được load lại
+_gazetteer: Optional[tuple] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    provinces = get_all_mappings().get("province_id")
+    if _gazetteer is None or _gazetteer[0] is not provinces:
+        gazetteer = Gazetteer(
+            provinces,
+            _read_json_mapping("district_mapping.json"),
+            _read_json_mapping("ward_mapping.json"),
+        )
+        _gazetteer = (provinces, gazetteer)
+    return _gazetteer[1]
+
+
+def resolve_location(location: Any) -> Tuple[Any, Optional[int], Optional[int]]:
+    """(province_id, district_id, ward_id) của location; cấp nào không tìm được là None."""
+    if not location:
+        return None, None, None
+    return get_gazetteer().resolve(location)
@@ -0,0 +1,257 @@
+"""
+Parse giá, diện tích và số phòng/tầng từ chữ hiển thị trên các trang tin.
+
+Mỗi chuỗi chỉ được quét một lần bằng một regex compile sẵn (_TOKEN), tách thành các token:
+số, đơn vị (tỷ, triệu, nghìn, đ, m², ha...), "/m²" / "/tháng", "x" (kích thước) và "thỏa thuận".
+Ghép token thành giá trị:
+- số "5,2" / "2.5" / "1.200" / "1.200.000": dấu chấm/phẩy là phần thập phân hay phân cách nghìn tuỳ
+  số chữ số phía sau và đơn vị (xem _number),
+- giá nhiều phần "3 tỷ 200 triệu", "2 tỷ 5" (= 2,5 tỷ),
+- khoảng "2-3 tỷ", "từ 50 đến 60 m²": lấy đầu dưới, với đơn vị của đầu trên,
+- diện tích "1,2 ha", "5 x 20m" (khi không ghi m²).
+Chuỗi giống nhau lặp lại nhiều giữa các tin ("Thỏa thuận", "5,2 tỷ") nên kết quả parse chuỗi được nhớ
+bằng LRU; Price trả về dùng chung giữa các lần gọi, không sửa.
+"""
+from __future__ import annotations
+
+import functools
+import re
+from typing import Any, Optional
+
+from .. import config
+
+# Hệ số của đơn vị tiền (quy về đồng) và đơn vị diện tích (quy về m²); "m" là mét (kích thước)
+_MONEY_UNITS = {
+    "tỷ": 1e9, "tỉ": 1e9, "ty": 1e9,
+    "triệu": 1e6, "trieu": 1e6, "tr": 1e6,
+    "nghìn": 1e3, "nghin": 1e3, "ngàn": 1e3, "ngan": 1e3, "k": 1e3,
+    "đồng": 1, "đ": 1, "vnđ": 1, "vnd": 1,
+}
+_AREA_UNITS = {"m²": 1, "m2": 1, "km²": 1e6, "km2": 1e6, "ha": 1e4, "hecta": 1e4}
+_LENGTH_UNITS = {"m": 1}
+_PER_M2 = ("m²", "m2")
+_PER_MONTH = ("tháng", "thang", "th")
+# Ký tự có thể đứng sau số lẻ cuối giá ("2 tỷ 5", "2 tỷ 5/tháng", "2 tỷ 5 (TL)")
+_PRICE_END = ("", "/", "(", ",", ";", "-")
+# Chữ nối hai đầu của khoảng giá/diện tích (không phải token: nằm giữa hai số)
+_RANGE_SEPARATORS = ("-", "–", "—", "~", "đến", "den", "tới", "toi")
+_NEGOTIABLE = ("thỏa thuận", "thoả thuận", "thoa thuan", "liên hệ", "lien he", "thương lượng", "thuong luong")
+
+
+def _alternatives(words) -> str:
+    # Dài trước để "triệu" không bị khớp thành "tr", "m²" thành "m"
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+# Đơn vị/từ khoá chỉ khớp nguyên từ: trước không phải chữ cái (được là số: "5tỷ"), sau không phải chữ/số
+_TOKEN = re.compile(
+    r"(?P<num>\d+(?:[.,]\d+)*)"
+    r"|/\s*(?P<per>" + _alternatives(_PER_M2 + _PER_MONTH) + r")(?!\w)"
+    r"|(?<![^\W\d_])(?P<unit>" + _alternatives([*_MONEY_UNITS, *_AREA_UNITS, *_LENGTH_UNITS]) + r")(?!\w)"
+    r"|(?<=[\d\s])(?P<x>[x×*])(?=\s*\d)"
+    r"|(?<!\w)(?P<neg>" + _alternatives(_NEGOTIABLE) + r")(?!\w)",
+    re.IGNORECASE,
+)
+
+# Số viết bằng chữ trong số phòng / số tầng (bỏ dạng không dấu dễ nhầm: nam, sau, bay, tam)
+_NUMBER_WORDS = {
+    "một": 1, "mot": 1, "hai": 2, "ba": 3, "bốn": 4, "bon": 4, "năm": 5, "sáu": 6,
+    "bảy": 7, "tám": 8, "chín": 9, "chin": 9, "mười": 10,
+}
+_COUNT = re.compile(r"(\d+)|(?<!\w)(" + _alternatives(_NUMBER_WORDS) + r")(?!\w)", re.IGNORECASE)
+
+
+class Price:
+    """
+    Giá đã parse: value (đồng, None nếu không có số), per_m2 / per_month (giá theo m² / theo tháng),
+    negotiable (có chữ "thỏa thuận", "liên hệ"...).
+    """
+
+    __slots__ = ("value", "per_m2", "per_month", "negotiable")
+
+    def __init__(self, value: Optional[float] = None, per_m2: bool = False, per_month: bool = False,
+                 negotiable: bool = False):
+        self.value = value
+        self.per_m2 = per_m2
+        self.per_month = per_month
+        self.negotiable = negotiable
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Price):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Price({fields})"
+
+
+def _tokens(text: str) -> list[tuple[str, str, int, int]]:
+    """[(loại, chuỗi, vị trí bắt đầu, vị trí kết thúc)] theo thứ tự trong text; chữ đã lowercase."""
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        raw = match.group(kind)
+        tokens.append((kind, raw if kind == "num" else raw.lower(), match.start(), match.end()))
+    return tokens
+
+
+def _number(raw: str, multiplier: float = 1) -> float:
+    """
+    Số từ "5,2" / "2.5" / "1.200" / "1.200.000" / "1.200,5".
+    Một dấu chấm/phẩy với đúng 3 chữ số sau là phân cách nghìn ("1.200 m²", "500,000 đ"),
+    trừ khi đơn vị là nghìn/triệu/tỷ ("2,125 tỷ" = 2.125 tỷ).
+    """
+    dots, commas = raw.count("."), raw.count(",")
+    if dots and commas:
+        decimal = "." if raw.rfind(".") > raw.rfind(",") else ","
+        thousands = "," if decimal == "." else "."
+        return float(raw.replace(thousands, "").replace(decimal, "."))
+    if not dots and not commas:
+        return float(raw)
+    separator = "." if dots else ","
+    if dots + commas > 1:
+        return float(raw.replace(separator, ""))
+    whole, fraction = raw.split(separator)
+    if len(fraction) == 3 and multiplier < 1e3:
+        return float(whole + fraction)
+    return float(f"{whole}.{fraction}")
+
+
+def _range_unit(text: str, tokens: list, pos: int, units: dict) -> Optional[tuple[float, int]]:
+    """
+    tokens[pos] là số không có đơn vị; nếu sau nó là chữ nối khoảng rồi một số có đơn vị trong units
+    ("2-3 tỷ", "từ 2 đến 3 tỷ") thì trả về (hệ số của đơn vị đó, vị trí token đơn vị), không thì None.
+    """
+    if pos + 2 >= len(tokens):
+        return None
+    (_, _, _, num_end), (kind, _, start, end), (unit_kind, unit, unit_start, _) = tokens[pos:pos + 3]
+    if kind != "num" or unit_kind != "unit" or unit not in units or text[end:unit_start].strip():
+        return None
+    if text[num_end:start].strip().lower() not in _RANGE_SEPARATORS:
+        return None
+    return units[unit], pos + 2
+
+
+def _parse_price(text: str) -> Price:
+    tokens = _tokens(text)
+    price = Price(negotiable=any(token[0] == "neg" for token in tokens))
+    pos = next((pos for pos, token in enumerate(tokens) if token[0] == "num"), len(tokens))
+
+    def adjacent(start: int) -> bool:
+        # Giữa phần trước và token chỉ có khoảng trắng
+        return not text[end:start].strip()
+
+    value = last_multiplier = None
+    end = 0
+    while pos < len(tokens) and tokens[pos][0] == "num":
+        _, raw, start, num_end = tokens[pos]
+        if value is not None and not adjacent(start):
+            break
+        multiplier = None
+        end = num_end
+        unit = tokens[pos + 1] if pos + 1 < len(tokens) else None
+        if unit and unit[0] == "unit" and unit[1] in _MONEY_UNITS and adjacent(unit[2]):
+            multiplier = _MONEY_UNITS[unit[1]]
+
+        if value is None and multiplier is None:
+            span = _range_unit(text, tokens, pos, _MONEY_UNITS)
+            if span is not None:
+                # "2-3 tỷ" = 2 tỷ (đầu dưới), đơn vị lấy từ đầu trên
+                multiplier, unit_pos = span
+                value = _number(raw, multiplier) * multiplier
+                end = tokens[unit_pos][3]
+                pos = unit_pos + 1
+                break
+
+        if value is None:
+            value = _number(raw, multiplier or 1) * (multiplier or 1)
+        elif multiplier is not None and last_multiplier is not None and multiplier < last_multiplier:
+            # "3 tỷ 200 triệu"
+            value += _number(raw, multiplier) * multiplier
+        elif (multiplier is None and last_multiplier and last_multiplier >= 1e6 and raw.isdigit()
+              and text[num_end:].lstrip()[:1] in _PRICE_END):
+            # "2 tỷ 5" = 2,5 tỷ; "1 tỷ 250" = 1,25 tỷ (số lẻ đứng cuối giá, không phải "12 triệu 1 tháng")
+            value += int(raw) * last_multiplier / 10 ** len(raw)
+            pos += 1
+            break
+        else:
+            break
+        last_multiplier = multiplier
+        pos += 1
+        if multiplier is not None:
+            end = unit[3]
+            pos += 1
+
+    # Qualifier ngay sau giá: "80 triệu/m²", "800 nghìn/m²/tháng"
+    while value is not None and pos < len(tokens) and tokens[pos][0] == "per" and adjacent(tokens[pos][2]):
+        price.per_m2 = price.per_m2 or tokens[pos][1] in _PER_M2
+        price.per_month = price.per_month or tokens[pos][1] in _PER_MONTH
+        end = tokens[pos][3]
+        pos += 1
+    price.value = value
+    return price
+
+
+_parse_price_cached = functools.lru_cache(maxsize=config.MAPPING_CACHE_SIZE)(_parse_price)
+
+
+def parse_price(text: Any) -> Price:
+    """
+    Giá từ chữ hiển thị: "5,2 tỷ", "2 tỷ 750 triệu", "850 triệu", "12.500.000 đ/tháng",
+    "80 triệu/m²", "Thỏa thuận"... Qualifier "/m²", "/tháng" chỉ tính khi đi ngay sau giá.
+    """
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return Price(float(text))
+    if not text or not isinstance(text, str):
+        return Price()
+    return _parse_price_cached(text)
+
+
+def _parse_area(text: str) -> Optional[float]:
+    tokens = _tokens(text)
+    first = dimensions = None
+    for pos, (kind, raw, _, _) in enumerate(tokens):
+        if kind != "num":
+            continue
+        unit = tokens[pos + 1][1] if pos + 1 < len(tokens) and tokens[pos + 1][0] == "unit" else None
+        if unit in _AREA_UNITS:
+            return _number(raw) * _AREA_UNITS[unit]
+        span = _range_unit(text, tokens, pos, _AREA_UNITS) if unit is None else None
+        if span is not None:
+            # "50-60 m²": đầu dưới của khoảng
+            return _number(raw) * span[0]
+        if first is None:
+            first = _number(raw)
+        if dimensions is None and pos >= 2 and tokens[pos - 1][0] == "x" and tokens[pos - 2][0] == "num":
+            dimensions = _number(tokens[pos - 2][1]) * _number(raw)
+    return dimensions if dimensions is not None else first
+
+
+_parse_area_cached = functools.lru_cache(maxsize=config.MAPPING_CACHE_SIZE)(_parse_area)
+
+
+def parse_area(text: Any) -> Optional[float]:
+    """
+    Diện tích (m²) từ "120 m²", "1.200 m2", "8,8 m²", "1,2 ha", "5 x 20m", "Dt: 100m² (5x20)".
+    Ưu tiên số có đơn vị diện tích, rồi kích thước "a x b", cuối cùng là số đầu tiên.
+    """
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return float(text)
+    if not text:
+        return None
+    if isinstance(text, str):
+        return _parse_area_cached(text)
+    return _parse_area(str(text))
+
+
+def parse_count(text: Any) -> Optional[int]:
+    """Số phòng/số tầng: số đầu tiên ("3 PN", "Trệt + 2 lầu") hoặc số viết bằng chữ ("Ba phòng")."""
+    if text is None:
+        return None
+    match = _COUNT.search(str(text))
+    if not match:
+        return None
+    if match.group(1):
+        return int(match.group(1))
+    return _NUMBER_WORDS[match.group(2).lower()]
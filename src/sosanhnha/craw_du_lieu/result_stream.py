@@ -0,0 +1,198 @@
+"""
+Đọc file kết quả theo kiểu streaming: từng item một, bộ nhớ không phụ thuộc kích thước file.
+
+Nguồn có thể là file thường, file nén .gz hoặc một file nằm trong archive tháng (zipfile.Path).
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import re
+import zipfile
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO, Union
+
+ResultSource = Union[str, Path, zipfile.Path]
+
+_CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+# "href": "..." chỉ có thể là key thật (trong chuỗi JSON dấu " luôn bị escape thành \")
+_HREF_RE = re.compile(r'"href"\s*:\s*"((?:[^"\\]|\\.)*)"')
+# Phần cuối buffer giữ lại giữa hai chunk để không cắt đôi một cặp "href": "..."
+_HREF_TAIL = 8192
+
+
+def source_name(source: ResultSource) -> str:
+    return source.name if isinstance(source, (Path, zipfile.Path)) else Path(source).name
+
+
+def result_file_kind(name: str) -> tuple[str, Optional[str]]:
+    """
+    Tách tên file kết quả thành (phần tên, loại): "2025-10-01.json.gz" -> ("2025-10-01", "json"),
+    "2025-10-01.jsonl" -> ("2025-10-01", "jsonl"); loại là None nếu không phải file kết quả.
+    """
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for kind in ("jsonl", "json"):
+        if name.endswith("." + kind):
+            return name[:-len(kind) - 1], kind
+    return name, None
+
+
+@contextmanager
+def open_text(source: ResultSource) -> Iterator[TextIO]:
+    """Mở nguồn kết quả ở dạng text UTF-8, tự giải nén nếu tên kết thúc bằng .gz."""
+    with ExitStack() as stack:
+        if isinstance(source, zipfile.Path):
+            raw = stack.enter_context(source.open("rb"))
+        else:
+            raw = stack.enter_context(open(source, "rb"))
+        if source_name(source).endswith(".gz"):
+            raw = stack.enter_context(gzip.GzipFile(fileobj=raw, mode="rb"))
+        yield stack.enter_context(io.TextIOWrapper(raw, encoding="utf-8"))
+
+
+class _JsonStream:
+    """Tokenizer tối giản trên một file text: chỉ giữ trong RAM phần chưa đọc của chunk hiện tại."""
+
+    def __init__(self, f: TextIO):
+        self._f = f
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_size: int = _CHUNK_SIZE) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(max(min_size, _CHUNK_SIZE))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Ký tự kế tiếp (bỏ qua khoảng trắng), "" nếu hết file."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> None:
+        if self.peek() != expected:
+            raise ValueError(f"Expected {expected!r} at offset {self._pos}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode một giá trị JSON, đọc thêm dữ liệu nếu giá trị nằm vắt qua nhiều chunk."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Chưa đủ dữ liệu: đọc thêm (gấp đôi phần đang giữ để tránh parse lại quá nhiều lần)
+                if not self._fill(len(self._buf) - self._pos):
+                    raise
+                continue
+            # Số/literal ở cuối buffer có thể còn tiếp ở chunk sau
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return obj
+
+    def array_items(self) -> Iterator[Any]:
+        """Duyệt các phần tử của mảng, con trỏ đang đứng ở '['."""
+        self.take("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            sep = self.peek()
+            self._pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError(f"Expected ',' or ']' at offset {self._pos - 1}")
+
+
+def _iter_jsonl(f: TextIO) -> Iterator[dict[str, Any]]:
+    """Journal .jsonl: mỗi dòng một record, bỏ qua dòng hỏng (ví dụ dòng cuối bị ghi dở khi crash)."""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(item, dict):
+            yield item
+
+
+def iter_results(source: ResultSource) -> Iterator[dict[str, Any]]:
+    """
+    Duyệt từng item trong file kết quả mà không load cả file:
+    - format cũ: [ {...}, ... ]
+    - format mới: {"data": [ {...}, ... ], ...}
+    - journal .jsonl
+    (kể cả bản nén .gz hoặc file trong archive tháng)
+    """
+    with open_text(source) as f:
+        if result_file_kind(source_name(source))[1] == "jsonl":
+            yield from _iter_jsonl(f)
+            return
+
+        stream = _JsonStream(f)
+        first = stream.peek()
+        if first == "[":
+            for item in stream.array_items():
+                if isinstance(item, dict):
+                    yield item
+            return
+        if first != "{":
+            return
+
+        stream.take("{")
+        while stream.peek() not in ("}", ""):
+            key = stream.value()
+            stream.take(":")
+            if key == "data" and stream.peek() == "[":
+                for item in stream.array_items():
+                    if isinstance(item, dict):
+                        yield item
+            else:
+                stream.value()
+            if stream.peek() == ",":
+                stream.take(",")
+
+
+def iter_result_hrefs(source: ResultSource) -> Iterator[str]:
+    """
+    Fast path chỉ lấy href (root level hoặc trong other_info): quét text bằng regex theo chunk,
+    không decode item nào.
+    """
+    with open_text(source) as f:
+        tail = ""
+        while True:
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            buf = tail + chunk
+            last_end = 0
+            for match in _HREF_RE.finditer(buf):
+                href = match.group(1)
+                if "\\" in href:
+                    href = json.loads(f'"{href}"')
+                if href:
+                    yield href
+                last_end = match.end()
+            tail = buf[max(last_end, len(buf) - _HREF_TAIL):]
@@ -8,6 +8,8 @@ from typing import List, Tuple
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.by import By
 
+from ..seen_index import CARD_UNCHANGED, check_card
+
 
 def _scroll_listing(driver, steps: int):
     try:
@@ -22,6 +24,8 @@ def _scroll_listing(driver, steps: int):
 def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_steps: int) -> Tuple[List[dict], int, int, int]:
     """
     Return (items, total_cards, skipped_pid, skipped_href).
+    Card đã crawl mà giá/diện tích/ngày đăng/tiêu đề không đổi thì bỏ qua (tính vào skipped_href),
+    card đã đổi được trả về với card_status = "changed" để runner lấy lại detail.
     """
     # Hàm scroll listing (bạn tự định nghĩa)
     _scroll_listing(driver, scroll_steps)
@@ -50,19 +54,7 @@ def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_s
             except:
                 continue  # nếu không có href thì bỏ qua
 
-            if href in scraped_hrefs:
-                skipped_href += 1
-                continue
-
-            # ==============================
-            # Thumbnail (ảnh lớn)
-            # ==============================
-            try:
-                img = el.find_element(By.CSS_SELECTOR, "a.img img")
-                thumbnail = img.get_attribute("src")
-            except:
-                thumbnail = ""
-
+            # Giá, diện tích, thời gian lấy trước để so card với lần crawl trước (check_card)
             # ==============================
             # Giá & diện tích & location
             # ==============================
@@ -91,6 +83,20 @@ def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_s
             except:
                 posted_date = ""
 
+            card_status, digest = check_card(scraped_hrefs, href, title, price, area, posted_date)
+            if card_status == CARD_UNCHANGED:
+                skipped_href += 1
+                continue
+
+            # ==============================
+            # Thumbnail (ảnh lớn)
+            # ==============================
+            try:
+                img = el.find_element(By.CSS_SELECTOR, "a.img img")
+                thumbnail = img.get_attribute("src")
+            except:
+                thumbnail = ""
+
             # ==============================
             # Push vào output
             # ==============================
@@ -112,7 +118,9 @@ def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_s
                     "config": {},
                     "map_coords": "",
                     "map_link": "",
-                    "map_dms": ""
+                    "map_dms": "",
+                    "card_digest": digest,
+                    "card_status": card_status,
                 }
             )
 
@@ -120,6 +128,6 @@ def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_s
             continue
 
     if not out:
-        print(f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} by href.")
+        print(f"[collect_list_items] Found {len(els)} cards but skipped {skipped_href} unchanged.")
 
     return out[:max_items], len(els), 0, skipped_href
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Khớp gần đúng tên địa danh (gõ sai, thiếu dấu) bằng BK-tree theo khoảng cách Levenshtein.
+
+BK-tree chỉ tính khoảng cách với các node mà bất đẳng thức tam giác chưa loại được, nên tra một
+tên trong vài trăm tên của một tỉnh/quận chỉ tốn vài chục phép so chuỗi thay vì quét hết.
+
+Hai chặn để không khớp nhầm:
+- số trong tên phải giống hệt ("phuong 1" không bao giờ khớp "phuong 10"),
+- nếu nhiều ID khác nhau cùng khoảng cách tốt nhất thì coi là không chắc, trả về None.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_NUMBER = re.compile(r"\d+")
+
+
+def _pattern_masks(pattern: str) -> Dict[str, int]:
+    """Ký tự -> bitmask các vị trí của nó trong pattern (cho levenshtein)."""
+    masks: Dict[str, int] = {}
+    for pos, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << pos)
+    return masks
+
+
+def levenshtein(a: str, b: str, masks: Optional[Dict[str, int]] = None) -> int:
+    """
+    Số phép thêm/xoá/thay ký tự ít nhất để biến a thành b.
+
+    Thuật toán bit-parallel của Myers: mỗi ký tự của b chỉ tốn vài phép toán trên số nguyên thay vì
+    cả một dòng bảng quy hoạch động. masks = _pattern_masks(a), truyền vào khi so a với nhiều chuỗi.
+    """
+    if not a or not b:
+        return len(a) + len(b)
+    if masks is None:
+        masks = _pattern_masks(a)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    plus, minus, distance = full, 0, len(a)
+    for char in b:
+        eq = masks.get(char, 0)
+        vertical = eq | minus
+        horizontal = (((eq & plus) + plus) ^ plus) | eq
+        h_plus = minus | (~(horizontal | plus) & full)
+        h_minus = plus & horizontal
+        if h_plus & last:
+            distance += 1
+        elif h_minus & last:
+            distance -= 1
+        h_plus = ((h_plus << 1) | 1) & full
+        h_minus = (h_minus << 1) & full
+        plus = h_minus | (~(vertical | h_plus) & full)
+        minus = h_plus & vertical
+    return distance
+
+
+def max_distance(name: str) -> int:
+    """Số lỗi cho phép theo độ dài tên: tên ngắn không khớp gần đúng, tên dài cho phép 2 lỗi."""
+    length = len(name.replace(" ", ""))
+    if length < 4:
+        return 0
+    return 1 if length <= 8 else 2
+
+
+class BKTree:
+    """
+    BKTree(items): items là các cặp (tên, giá trị). Tên trùng nhau giữ giá trị của cặp đầu tiên.
+
+    Mỗi node là [tên, giá trị, thứ tự thêm, {khoảng cách: node con}].
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Any]] = ()):
+        self._root: Optional[list] = None
+        self._size = 0
+        for name, value in items:
+            self.add(name, value)
+
+    def add(self, name: str, value: Any) -> None:
+        node = [name, value, self._size, {}]
+        if self._root is None:
+            self._root = node
+            self._size += 1
+            return
+        current = self._root
+        while True:
+            distance = levenshtein(name, current[0])
+            if distance == 0:
+                return
+            child = current[3].get(distance)
+            if child is None:
+                current[3][distance] = node
+                self._size += 1
+                return
+            current = child
+
+    def search(self, query: str, limit: int) -> list[tuple[int, int, str, Any]]:
+        """Các (khoảng cách, thứ tự thêm, tên, giá trị) cách query không quá limit, gần nhất trước."""
+        found = []
+        masks = _pattern_masks(query)
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            name, value, order, children = stack.pop()
+            distance = levenshtein(query, name, masks)
+            if distance <= limit:
+                found.append((distance, order, name, value))
+            for child_distance, child in children.items():
+                if distance - limit <= child_distance <= distance + limit:
+                    stack.append(child)
+        found.sort(key=lambda match: (match[0], match[1]))
+        return found
+
+    def best(self, query: str, limit: Optional[int] = None) -> Optional[Tuple[Any, float]]:
+        """
+        (giá trị, điểm) của tên gần query nhất, điểm = 1 - khoảng cách / độ dài tên dài hơn.
+        limit mặc định theo max_distance(query); None nếu không có hoặc không chắc chắn.
+        """
+        if limit is None:
+            limit = max_distance(query)
+        numbers = _NUMBER.findall(query)
+        matches = [m for m in self.search(query, limit) if _NUMBER.findall(m[2]) == numbers]
+        if not matches:
+            return None
+        distance, _, name, value = matches[0]
+        if any(m[0] == distance and m[3] != value for m in matches[1:]):
+            return None
+        return value, 1 - distance / max(len(query), len(name), 1)
+
+    def __len__(self) -> int:
+        return self._size
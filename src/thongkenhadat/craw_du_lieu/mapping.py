@@ -1,108 +1,159 @@
 """Module để load và sử dụng mapping từ file xlsx."""
+import functools
+import hashlib
 import os
+import tempfile
 from pathlib import Path
 from typing import Dict, Any, Optional
+from .. import config
+from .matcher import MIN_PATTERNS, KeywordMatcher
 from .utils import normalize_text
 import json
 # Cache cho mappings
 _mappings_cache: Dict[str, Dict[str, Any]] = {}
-     # thư mục của file .py
 
+# Bản dịch sẵn của map.xlsx (output/map.compiled.json): đọc lại trong vài ms thay vì parse xlsx
+# mỗi lần khởi động. Tăng version khi đổi cách parse/normalize key để file cũ tự build lại.
+_COMPILED_VERSION = 2
+_COMPILED_FILENAME = "map.compiled.json"
+
+
+def _xlsx_path() -> Path:
+    project_root = Path(__file__).resolve().parents[1]
+    return project_root / "output" / "map.xlsx"
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_compiled(xlsx_path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Mapping từ file compiled nếu còn khớp với xlsx (size + mtime, hoặc sha256), ngược lại None."""
+    compiled_path = xlsx_path.with_name(_COMPILED_FILENAME)
+    try:
+        with open(compiled_path, "r", encoding="utf-8") as f:
+            compiled = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if compiled.get("version") != _COMPILED_VERSION:
+        return None
+
+    stat = xlsx_path.stat()
+    source = compiled.get("source") or {}
+    if source.get("size") != stat.st_size or source.get("mtime_ns") != stat.st_mtime_ns:
+        # mtime đổi (copy, checkout lại...) nhưng nội dung như cũ thì vẫn dùng được
+        if source.get("sha256") != _file_sha256(xlsx_path):
+            return None
+
+    mappings = {}
+    for sheet_name, sheet in compiled.get("sheets", {}).items():
+        values = sheet["values"]
+        mappings[sheet_name] = {key: values[idx] for key, idx in sheet["keys"].items()}
+    return mappings
+
+
+def _write_compiled(xlsx_path: Path, mappings: Dict[str, Dict[str, Any]]) -> None:
+    """Ghi file compiled; mỗi entry chỉ lưu một lần (các key của cùng một dòng trỏ tới cùng entry)."""
+    sheets = {}
+    for sheet_name, mapping in mappings.items():
+        values: list = []
+        positions: Dict[int, int] = {}
+        keys = {}
+        for key, value in mapping.items():
+            idx = positions.get(id(value))
+            if idx is None:
+                idx = positions[id(value)] = len(values)
+                values.append(value)
+            keys[key] = idx
+        sheets[sheet_name] = {"values": values, "keys": keys}
+
+    stat = xlsx_path.stat()
+    compiled = {
+        "version": _COMPILED_VERSION,
+        "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _file_sha256(xlsx_path)},
+        "sheets": sheets,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=str(xlsx_path.parent), prefix=".map.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(compiled, f, ensure_ascii=False)
+        os.replace(tmp_path, xlsx_path.with_name(_COMPILED_FILENAME))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _parse_workbook(xlsx_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Đọc tất cả sheet của map.xlsx (read-only, duyệt từng dòng) thành {sheet: {key: entry}}."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    mappings: Dict[str, Dict[str, Any]] = {}
+
+    def get_safe_int(v):
+        if v is None:
+            return None
+        try:
+            if isinstance(v, float):
+                return int(v) if v.is_integer() else v
+            if isinstance(v, str) and v.replace('.', '').isdigit():
+                f = float(v)
+                return int(f) if f.is_integer() else f
+            return int(v)
+        except:
+            return None
 
-def _load_mappings():
-    """Load tất cả mappings từ file xlsx và cache lại."""
-    global _mappings_cache
-    
-    if _mappings_cache:
-        return _mappings_cache
-    
     try:
-        from openpyxl import load_workbook
-        from pathlib import Path
-        
-        # Tìm file xlsx
-        project_root = Path(__file__).resolve().parents[1]
-        xlsx_path = project_root / "output" / "map.xlsx"
-        
-        if not xlsx_path.exists():
-            print(f"[Mapping] File {xlsx_path} không tồn tại")
-            return {}
-        
-        wb = load_workbook(xlsx_path, data_only=True)
-
-        def get_safe_int(v):
-            if v is None:
-                return None
-            try:
-                if isinstance(v, float):
-                    return int(v) if v.is_integer() else v
-                if isinstance(v, str) and v.replace('.', '').isdigit():
-                    f = float(v)
-                    return int(f) if f.is_integer() else f
-                return int(v)
-            except:
-                return None
-        
         for sheet_name in wb.sheetnames:
             ws = wb[sheet_name]
             mapping = {}
-            
-            rows = list(ws.iter_rows(values_only=True))
-            if len(rows) < 2:
-                continue
-            
-            # Tìm header row
-            header_row_idx = None
-            for idx, row in enumerate(rows):
-                if row and any(cell and str(cell).upper() in ["ID", "VALUE", "SLUG"]
-                               for cell in row):
-                    header_row_idx = idx
-                    break
-            
-            if header_row_idx is None:
-                continue
-            
-            header_row = rows[header_row_idx]
-            col_mapping = {}
-            for col_idx, cell in enumerate(header_row):
-                if cell is not None:
-                    col_mapping[str(cell).upper().strip()] = col_idx
-            
-            if "ID" not in col_mapping or "VALUE" not in col_mapping:
-                print(f"[Mapping] Sheet '{sheet_name}' thiếu cột ID hoặc VALUE, bỏ qua.")
-                continue
-            
-            id_col_idx = col_mapping["ID"]
-            value_col_idx = col_mapping["VALUE"]
-            slug_col_idx = col_mapping.get("SLUG")
-
-            print(f"[Mapping] Sheet '{sheet_name}': ID@{id_col_idx+1}, "
-                  f"Value@{value_col_idx+1}, Slug@{slug_col_idx+1 if slug_col_idx else 'N/A'}")
-            
-            # Parse data rows
-            for row in rows[header_row_idx + 1:]:
+            col_mapping = None
+
+            for row in ws.iter_rows(values_only=True):
+                if col_mapping is None:
+                    # Tìm header row
+                    if row and any(cell and str(cell).upper() in ["ID", "VALUE", "SLUG"]
+                                   for cell in row):
+                        col_mapping = {}
+                        for col_idx, cell in enumerate(row):
+                            if cell is not None:
+                                col_mapping[str(cell).upper().strip()] = col_idx
+                        if "ID" not in col_mapping or "VALUE" not in col_mapping:
+                            print(f"[Mapping] Sheet '{sheet_name}' thiếu cột ID hoặc VALUE, bỏ qua.")
+                            break
+                        id_col_idx = col_mapping["ID"]
+                        value_col_idx = col_mapping["VALUE"]
+                        slug_col_idx = col_mapping.get("SLUG")
+                    continue
+
+                # Parse data rows
                 if not row or not any(row):
                     continue
-                
+
                 try:
                     # ID
                     id_cell = row[id_col_idx] if id_col_idx < len(row) else None
                     if id_cell is None:
                         continue
                     id_val = get_safe_int(id_cell)
-                    
+
                     # VALUE
                     value_cell = row[value_col_idx] if value_col_idx < len(row) else None
                     value = str(value_cell).strip() if value_cell else None
                     if not value:
                         continue
-                    
+
                     # SLUG optional
                     slug = None
                     if slug_col_idx is not None and slug_col_idx < len(row):
                         slug_cell = row[slug_col_idx]
                         slug = str(slug_cell).strip() if slug_cell else None
-                    
+
                     # --------- TẠO ENTRY MỞ RỘNG -----------
                     entry = {"id": id_val}
 
@@ -120,15 +171,15 @@ def _load_mappings():
                         if "PROVINCE_ID" in col_mapping:
                             pidx = col_mapping["PROVINCE_ID"]
                             entry["province_id"] = get_safe_int(row[pidx]) if pidx < len(row) else None
-                    
+
                     # --------- LƯU MAPPING THEO NHIỀU KEY -----------
                     def store_key(k):
                         if k:
                             mapping[k] = entry
-                    
+
                     value_lower = value.lower()
                     normalized_value = normalize_text(value)
-                    
+
                     store_key(value_lower)
                     store_key(normalized_value)
 
@@ -137,18 +188,38 @@ def _load_mappings():
                         normalized_slug = normalize_text(slug)
                         store_key(slug_lower)
                         store_key(normalized_slug)
-                
+
                 except Exception as e:
                     print(f"[Mapping] Lỗi parse row trong sheet '{sheet_name}': {e}")
                     continue
-            
+
             if mapping:
-                _mappings_cache[sheet_name] = mapping
-                print(f"[Mapping] Loaded {len(mapping)} entries from sheet '{sheet_name}'")
-        
+                mappings[sheet_name] = mapping
+    finally:
         wb.close()
+    return mappings
+
+
+def _load_mappings():
+    """Load tất cả mappings (từ file compiled, hoặc parse map.xlsx rồi compile) và cache lại."""
+    global _mappings_cache
+    
+    if _mappings_cache:
         return _mappings_cache
     
+    xlsx_path = _xlsx_path()
+    if not xlsx_path.exists():
+        print(f"[Mapping] File {xlsx_path} không tồn tại")
+        return {}
+
+    mappings = _read_compiled(xlsx_path)
+    if mappings is not None:
+        _mappings_cache.update(mappings)
+        _clear_lookup_caches()
+        return _mappings_cache
+
+    try:
+        mappings = _parse_workbook(xlsx_path)
     except ImportError:
         print("[Mapping] openpyxl chưa được cài đặt, không thể load mappings")
         return {}
@@ -156,32 +227,82 @@ def _load_mappings():
         print(f"[Mapping] Lỗi khi load mappings: {e}")
         return {}
 
+    _mappings_cache.update(mappings)
+    _clear_lookup_caches()
+    try:
+        _write_compiled(xlsx_path, mappings)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[Mapping] Không ghi được {_COMPILED_FILENAME}: {e}")
+    print(
+        f"[Mapping] Compiled {len(mappings)} sheets "
+        f"({sum(len(m) for m in mappings.values())} keys) từ {xlsx_path.name}"
+    )
+    return _mappings_cache
 
 
-def find_ward_key_loose(json_file = "", name = "", province_id=None, district_id=None):
-    project_root = Path(__file__).resolve().parents[1]
-    json_path = project_root / "output" / json_file
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    name_norm = name.strip().lower()
-
-    for key, value in data.items():
-        if district_id:
-            if (
-                value.get("province_id") == province_id
-                and float(value.get("district_id")) == float(district_id)
-                and name_norm in value.get("name", "").lower()
-            ):
-                return int(key)
-        else:
-            if (
-                value.get("province_id") == province_id
-                and name_norm in value.get("name", "").lower()
-            ):
-                return int(key)            
 
-    return None
+# Index của ward_mapping.json / district_mapping.json cho find_ward_key_loose, load một lần mỗi file
+_loose_indexes: Dict[str, "_LooseIndex"] = {}
+
+
+def _json_mapping_path(json_file: str) -> Path:
+    """Đường dẫn file mapping JSON (ward_mapping.json, district_mapping.json) trong output/."""
+    return Path(__file__).resolve().parents[1] / "output" / json_file
+
+
+def _loose_name(name: Any) -> str:
+    """Chữ thường, gộp khoảng trắng (giữ dấu, giống cách so tên trước đây)."""
+    return " ".join(str(name or "").lower().split())
+
+
+class _LooseIndex:
+    """
+    Các dòng của file mapping JSON nhóm theo (province_id, district_id) và theo (province_id, None),
+    giữ thứ tự trong file. Mỗi nhóm có thêm dict tên -> key để tra khớp chính xác trước.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.groups: Dict[tuple, list] = {}
+        self.exact: Dict[tuple, Dict[str, int]] = {}
+        for key, value in data.items():
+            try:
+                key_int = int(key)
+            except (TypeError, ValueError):
+                continue
+            name = _loose_name(value.get("name", ""))
+            province_id = value.get("province_id")
+            groups = [(province_id, None)]
+            try:
+                groups.append((province_id, float(value.get("district_id"))))
+            except (TypeError, ValueError):
+                pass
+            for group in groups:
+                self.groups.setdefault(group, []).append((name, key_int))
+                self.exact.setdefault(group, {}).setdefault(name, key_int)
+
+    def find(self, name: Any, province_id: Any, district_id: Any) -> Optional[int]:
+        group = (province_id, float(district_id) if district_id else None)
+        name_norm = _loose_name(name)
+        key = self.exact.get(group, {}).get(name_norm)
+        if key is not None:
+            return key
+        for candidate, key in self.groups.get(group, ()):
+            if name_norm in candidate:
+                return key
+        return None
+
+
+@functools.lru_cache(maxsize=config.MAPPING_CACHE_SIZE)
+def find_ward_key_loose(json_file = "", name = "", province_id=None, district_id=None):
+    """
+    Key (int) của ward/district trong json_file thuộc province_id (và district_id nếu có):
+    tên khớp chính xác trước, nếu không có thì tên đầu tiên (theo thứ tự file) chứa `name`.
+    """
+    index = _loose_indexes.get(json_file)
+    if index is None:
+        with open(_json_mapping_path(json_file), 'r', encoding='utf-8') as f:
+            index = _loose_indexes[json_file] = _LooseIndex(json.load(f))
+    return index.find(name, province_id, district_id)
 
 def partial_match(value_lower: str, key: str) -> bool:
     """Word-based partial match: Tất cả từ của value có trong key (split by space/-), hoặc ngược lại."""
@@ -189,12 +310,128 @@ def partial_match(value_lower: str, key: str) -> bool:
     key_words = set(key.replace('-', ' ').lower().split())
     return value_words.issubset(key_words) or key_words.issubset(value_words)
 
+# Sheet từ MIN_PATTERNS tới số key này tìm "key nằm trong value" bằng KeywordMatcher (một lần duyệt
+# value); sheet nhỏ hơn kiểm tra thẳng mọi key. Sheet lớn hơn (ward_id) dùng trigram hiếm nhất của key:
+# automaton cho hàng chục nghìn key tốn vài giây để dựng và hàng chục MB RAM.
+_CONTAINED_MATCHER_MAX_KEYS = 5000
+
+
+def _key_words(key: str) -> list:
+    """Các từ của key như partial_match tách (gạch ngang = khoảng trắng)."""
+    return key.replace('-', ' ').lower().split()
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _SheetIndex:
+    """
+    Inverted index của một sheet cho bước 2 (partial) và bước 3 (contains) của get_mapping.
+
+    Chỉ thu hẹp ứng viên: get_mapping vẫn chạy đúng các điều kiện cũ trên ứng viên theo thứ tự
+    key trong sheet, nên kết quả giống hệt quét toàn bộ.
+    - words / grams: từ (trigram) -> vị trí các key chứa nó, cho "value nằm trong key".
+    - word_anchor: mỗi key chỉ nằm ở danh sách của từ hiếm nhất của nó, cho "key nằm trong value"
+      ở bước 2: mọi từ của key đều có trong value nên từ hiếm nhất cũng vậy.
+    - contained (KeywordMatcher của mọi key) cho "key nằm trong value" ở bước 3; sheet lớn dùng
+      gram_anchor (trigram hiếm nhất của key) như word_anchor, sheet nhỏ trả về mọi key.
+    """
+
+    def __init__(self, sheet_mapping: Dict[str, Any]):
+        self.items = list(sheet_mapping.items())
+        self.words: Dict[str, list] = {}
+        self.grams: Dict[str, list] = {}
+        key_words, key_grams = [], []
+        for pos, (key, _) in enumerate(self.items):
+            words, grams = set(_key_words(key)), _trigrams(key)
+            key_words.append(words)
+            key_grams.append(grams)
+            for word in words:
+                self.words.setdefault(word, []).append(pos)
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(pos)
+
+        # Key không có từ nào / ngắn hơn 3 ký tự: luôn là ứng viên
+        self.word_anchor: Dict[str, list] = {}
+        self.no_words: list = []
+        word_count = {word: len(positions) for word, positions in self.words.items()}
+        for pos, words in enumerate(key_words):
+            if words:
+                self.word_anchor.setdefault(min(words, key=word_count.__getitem__), []).append(pos)
+            else:
+                self.no_words.append(pos)
+
+        self.contained: Optional[KeywordMatcher] = None
+        self.gram_anchor: Dict[str, list] = {}
+        self.short_keys: list = []
+        if len(self.items) < MIN_PATTERNS:
+            return
+        if len(self.items) <= _CONTAINED_MATCHER_MAX_KEYS:
+            self.contained = KeywordMatcher(key for key, _ in self.items)
+            return
+        gram_count = {gram: len(positions) for gram, positions in self.grams.items()}
+        for pos, grams in enumerate(key_grams):
+            if grams:
+                self.gram_anchor.setdefault(min(grams, key=gram_count.__getitem__), []).append(pos)
+            else:
+                self.short_keys.append(pos)
+
+    def partial_candidates(self, value_norm: str):
+        """Vị trí (tăng dần) các key có thể thoả partial_match(value_norm, key)."""
+        value_words = set(value_norm.split())
+        if not value_words:
+            return range(len(self.items))
+        # value ⊆ key: key phải chứa cả từ hiếm nhất của value
+        candidates = set(min((self.words.get(w, ()) for w in value_words), key=len))
+        # key ⊆ value
+        for word in value_words:
+            candidates.update(self.word_anchor.get(word, ()))
+        candidates.update(self.no_words)
+        return sorted(candidates)
+
+    def contains_candidates(self, value_norm: str):
+        """Vị trí (tăng dần) các key có thể chứa value_norm hoặc nằm trong value_norm."""
+        if len(value_norm) < 3 or len(self.items) < MIN_PATTERNS:
+            return range(len(self.items))
+        grams = _trigrams(value_norm)
+        candidates = set(min((self.grams.get(g, ()) for g in grams), key=len))
+        if self.contained is not None:
+            candidates.update(self.contained.search(value_norm))
+        else:
+            for gram in grams:
+                candidates.update(self.gram_anchor.get(gram, ()))
+            candidates.update(self.short_keys)
+        return sorted(candidates)
+
+
+# sheet_name -> (sheet mapping, index); dựng lần đầu sheet cần tới bước 2/3
+_sheet_indexes: Dict[str, tuple] = {}
+
+
+def _sheet_index(sheet_name: str, sheet_mapping: Dict[str, Any]) -> _SheetIndex:
+    cached = _sheet_indexes.get(sheet_name)
+    if cached is None or cached[0] is not sheet_mapping:
+        cached = _sheet_indexes[sheet_name] = (sheet_mapping, _SheetIndex(sheet_mapping))
+    return cached[1]
+
+
 def get_mapping(sheet_name: str, value: str, filter_slug_parts: Optional[list[str]] = None, return_entry: bool = False) -> Optional[Any]:
     """
     Nâng cấp: Cho phép match ward/district/province theo kiểu chứa (contains),
     không cần có từ 'phường/xã/thị trấn'.
+
+    Kết quả được nhớ (LRU, config.MAPPING_CACHE_SIZE) theo sheet, value, filter_slug_parts và
+    return_entry; bị xoá khi mapping được load lại (xem clear_mapping_caches).
     """
+    # Chưa load được mapping (thiếu map.xlsx, lỗi đọc): không nhớ kết quả, lần tra sau load lại
+    if not _load_mappings():
+        return None
+    return _get_mapping_cached(sheet_name, value, tuple(filter_slug_parts) if filter_slug_parts else None, return_entry)
 
+
+@functools.lru_cache(maxsize=config.MAPPING_CACHE_SIZE)
+def _get_mapping_cached(sheet_name: str, value: str, filter_slug_parts: Optional[tuple], return_entry: bool) -> Optional[Any]:
     mappings = _load_mappings()
     sheet_mapping = mappings.get(sheet_name) or mappings.get(sheet_name.strip(), {})
     if not sheet_mapping or not value:
@@ -216,11 +453,13 @@ def get_mapping(sheet_name: str, value: str, filter_slug_parts: Optional[list[st
             if part:
                 filter_words.update(normalize_text(part).split())
 
+    index = _sheet_index(sheet_name, sheet_mapping)
+
     # ---------------------------------
     # 2. PARTIAL MATCH (word-based)
     # ---------------------------------
-    for key, entry in sheet_mapping.items():
-        key_norm = key
+    for pos in index.partial_candidates(value_norm):
+        key_norm, entry = index.items[pos]
         key_words = set(key_norm.split())
 
         if not partial_match(value_norm, key_norm):
@@ -256,8 +495,8 @@ def get_mapping(sheet_name: str, value: str, filter_slug_parts: Optional[list[st
     #    Với ward, district, province:
     #    Nếu value nằm trong key hoặc key nằm trong value → cho phép match
     # ---------------------------------
-    for key, entry in sheet_mapping.items():
-        key_norm = key
+    for pos in index.contains_candidates(value_norm):
+        key_norm, entry = index.items[pos]
 
         if value_norm in key_norm or key_norm in value_norm:
             # Context filter
@@ -282,6 +521,28 @@ def get_mapping(sheet_name: str, value: str, filter_slug_parts: Optional[list[st
 
 
 
+def _clear_lookup_caches() -> None:
+    _sheet_indexes.clear()
+    _get_mapping_cached.cache_clear()
+
+
+def clear_mapping_caches() -> None:
+    """Bỏ mapping, index và kết quả đã nhớ; lần tra sau load lại map.xlsx và các file JSON."""
+    _mappings_cache.clear()
+    _loose_indexes.clear()
+    _clear_lookup_caches()
+    find_ward_key_loose.cache_clear()
+
+
+def mapping_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Số lần trúng/trượt LRU (tính cả các lần get_mapping gọi lồng nhau) và số kết quả đang nhớ."""
+    stats = {}
+    for name, cached in (("get_mapping", _get_mapping_cached), ("find_ward_key_loose", find_ward_key_loose)):
+        info = cached.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
+
+
 def get_all_mappings() -> Dict[str, Dict[str, Any]]:
     """Lấy tất cả mappings đã load."""
     return _load_mappings()
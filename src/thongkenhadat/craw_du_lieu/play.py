@@ -27,6 +27,22 @@ def main():
     print(f"\n{'='*60}")
     print(f"Hoàn thành! Đã scrape {result['total_items']} items")
     print(f"Kết quả lưu tại: {result['results_file']}")
+    cache = result["transform_cache"]
+    print(f"Transform cache: {cache['hits']} hit / {cache['misses']} miss")
+    cards = result["cards"]
+    print(f"Cards: {cards['new']} mới / {cards['changed']} đổi / {cards['unchanged']} bỏ qua")
+    sink = result["sink"]
+    print(f"Ghi nền: {sink['items']} items / {sink['batches']} batch / {sink['saves']} lần ghi, "
+          f"queue tối đa {sink['max_queue']}, {sink['errors']} lỗi")
+    for name, stats in result["mapping_cache"].items():
+        lookups = stats["hits"] + stats["misses"]
+        if lookups:
+            print(f"Mapping cache {name}: {stats['hits']}/{lookups} hit ({stats['hits'] / lookups:.0%}), "
+                  f"đang nhớ {stats['size']}")
+    for stats in result["workers"]:
+        opened = stats["items"] + stats["errors"]
+        print(f"Worker {stats['address']}: {stats['items']} tin / {stats['errors']} lỗi"
+              + (f", {stats['seconds'] / opened:.1f}s / tin" if opened else ""))
     print(f"{'='*60}")
 
 
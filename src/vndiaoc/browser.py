@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+import os
+import socket
+import subprocess
+import time
+
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 
@@ -84,3 +89,48 @@ def init_driver(
         pass
 
     return driver, wait
+
+
+def free_port() -> int:
+    """Một cổng TCP đang trống trên máy (để mở Chrome với --remote-debugging-port)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def launch_browser(
+    binary: str,
+    profile_dir,
+    port: int | None = None,
+    startup_timeout: float = 30,
+):
+    """
+    Tự mở một Chrome với cổng debug riêng và profile riêng (profile_dir) để init_driver gắn vào.
+    Chờ tới khi cổng debug nhận kết nối; trả về (process, debugger_address).
+    """
+    port = port or free_port()
+    os.makedirs(profile_dir, exist_ok=True)
+    process = subprocess.Popen(
+        [
+            binary,
+            f"--remote-debugging-port={port}",
+            f"--user-data-dir={profile_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Chrome ({binary}) thoát ngay khi mở, mã {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return process, f"127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.5)
+
+    process.terminate()
+    raise TimeoutError(f"Chrome không mở cổng debug {port} sau {startup_timeout}s")
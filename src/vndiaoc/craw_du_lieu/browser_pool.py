@@ -0,0 +1,163 @@
+"""
+Pool trình duyệt và các worker mở trang chi tiết song song.
+
+BrowserPool gắn vào các Chrome trong config.DEBUGGER_ADDRESSES và tự mở thêm config.LAUNCH_BROWSERS
+Chrome (profile riêng). Trình duyệt đầu tiên dùng cho trang list (producer); các trình duyệt còn lại
+mở trang chi tiết: mỗi trình duyệt một thread DetailWorkers lấy item từ queue và gọi
+open_detail_and_extract. Pool chỉ có một trình duyệt thì item được mở tuần tự ngay trên trình duyệt
+list như trước.
+
+Mỗi driver chỉ được dùng trong một thread. Kết quả trả về thread gọi (vòng scrape) nên lọc ngày,
+fingerprint, all_results và scraped_hrefs vẫn chỉ được sửa ở một thread.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from .. import config
+from ..browser import init_driver, launch_browser
+from .collectors.detail import open_detail_and_extract
+from .utils import human_sleep
+
+# (item, kết quả của open_detail_and_extract hoặc None nếu lỗi, lỗi hoặc None)
+DetailResult = Tuple[dict, Optional[dict], Optional[Exception]]
+
+
+class BrowserPool:
+    """
+    BrowserPool(addresses, launch): gắn vào từng debugger address trong addresses rồi tự mở thêm
+    launch Chrome. drivers là các (address, driver, wait) theo thứ tự đó.
+    """
+
+    def __init__(self, addresses: Iterable[str], launch: int = 0):
+        self.drivers: list[tuple[str, Any, Any]] = []
+        self._processes: list = []
+        try:
+            for address in addresses:
+                self._attach(address)
+            for index in range(launch):
+                process, address = launch_browser(config.CHROME_BINARY, config.CHROME_PROFILE_DIR / str(index))
+                self._processes.append(process)
+                self._attach(address)
+        except Exception:
+            self.close()
+            raise
+        if not self.drivers:
+            raise ValueError("Pool trình duyệt rỗng: cần DEBUGGER_ADDRESSES hoặc LAUNCH_BROWSERS > 0")
+
+    def _attach(self, address: str) -> None:
+        driver, wait = init_driver(address, config.PAGE_LOAD_TIMEOUT, config.WAIT_TIMEOUT)
+        self.drivers.append((address, driver, wait))
+        print(f"[Pool] Đã gắn trình duyệt {address}")
+
+    @property
+    def listing(self) -> tuple[Any, Any]:
+        """(driver, wait) cho trang list."""
+        _, driver, wait = self.drivers[0]
+        return driver, wait
+
+    @property
+    def detail(self) -> list[tuple[str, Any, Any]]:
+        """Các trình duyệt mở trang chi tiết: tất cả trừ trình duyệt list, hoặc chính nó nếu chỉ có một."""
+        return self.drivers[1:] or self.drivers[:1]
+
+    def close(self) -> None:
+        for _, driver, _ in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        for process in self._processes:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except Exception:
+                process.kill()
+        self.drivers, self._processes = [], []
+
+
+class DetailWorkers:
+    """
+    DetailWorkers(drivers, threaded): drivers là các (address, driver, wait) của BrowserPool.detail.
+    threaded=False: mở từng item ngay trong thread gọi (dùng chung trình duyệt với trang list).
+    stats: mỗi worker {"address", "items", "errors", "seconds"}, chỉ worker đó cập nhật.
+    """
+
+    def __init__(self, drivers: list[tuple[str, Any, Any]], threaded: bool):
+        self._drivers = drivers
+        self.stats = [{"address": address, "items": 0, "errors": 0, "seconds": 0.0} for address, _, _ in drivers]
+        self._tasks: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        if threaded:
+            for index in range(len(drivers)):
+                thread = threading.Thread(target=self._loop, args=(index,), name=f"detail-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _extract(self, index: int, item: dict, current_list_url: str) -> DetailResult:
+        _, driver, wait = self._drivers[index]
+        stats = self.stats[index]
+        start = time.perf_counter()
+        human_sleep(2, 5)
+        try:
+            full = open_detail_and_extract(
+                driver,
+                wait,
+                item,
+                current_list_url=current_list_url,
+                screenshot_dir=config.SCREENSHOT_DIR,
+                detail_scroll_steps=config.DETAIL_SCROLL_STEPS,
+                human_sleep=human_sleep,
+            )
+            result = (item, full, None)
+            stats["items"] += 1
+        except Exception as e:
+            result = (item, None, e)
+            stats["errors"] += 1
+        human_sleep(1, 3)
+        stats["seconds"] += time.perf_counter() - start
+        return result
+
+    def _loop(self, index: int) -> None:
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            item, current_list_url, results = task
+            results.put(self._extract(index, item, current_list_url))
+
+    def _drop_pending(self) -> None:
+        while True:
+            try:
+                self._tasks.get_nowait()
+            except queue.Empty:
+                return
+
+    def run(self, items: list[dict], current_list_url: str) -> Iterator[DetailResult]:
+        """Mở trang chi tiết của các item, trả về kết quả theo thứ tự xong (song song nếu threaded)."""
+        if not self._threads:
+            for item in items:
+                yield self._extract(0, item, current_list_url)
+            return
+
+        # Mỗi lần run một queue kết quả riêng: item bị bỏ dở (lỗi, Ctrl+C) không lẫn sang trang sau
+        results: queue.Queue = queue.Queue()
+        for item in items:
+            self._tasks.put((item, current_list_url, results))
+        try:
+            for _ in items:
+                yield results.get()
+        finally:
+            self._drop_pending()
+
+    def close(self) -> None:
+        """Bỏ các item chưa mở và chờ các worker xong item đang mở."""
+        self._drop_pending()
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout=config.PAGE_LOAD_TIMEOUT)
+        self._threads = []
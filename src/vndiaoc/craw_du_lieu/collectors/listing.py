@@ -6,6 +6,8 @@ from typing import List, Tuple
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.by import By
 
+from ..seen_index import CARD_UNCHANGED, check_card
+
 
 def _scroll_listing(driver, steps: int):
     try:
@@ -21,6 +23,7 @@ def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_s
     """
     Crawl danh sách sản phẩm, trả về list dict template.
     Chỉ update href, title, price, thumbnail nếu có.
+    Card đã crawl mà tiêu đề/giá không đổi thì bỏ qua; card đã đổi có card_status = "changed".
     """
     _scroll_listing(driver, scroll_steps)
 
@@ -70,9 +73,23 @@ def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_s
             except:
                 pass
 
-            if item["href"] in scraped_hrefs:
+            # ==============================
+            # Price (nếu rỗng = "0")
+            # ==============================
+            try:
+                price_el = el.find_element(By.CSS_SELECTOR, ".price")
+                price_text = price_el.text.strip()
+                item["price"] = price_text if price_text else "0"
+            except:
+                item["price"] = "0"
+
+            # Card chỉ có tiêu đề và giá để so với lần crawl trước
+            card_status, digest = check_card(scraped_hrefs, item["href"], item["title"], item["price"])
+            if card_status == CARD_UNCHANGED:
                 skipped_href += 1
                 continue
+            item["card_digest"] = digest
+            item["card_status"] = card_status
 
             # ==============================
             # Thumbnail
@@ -85,16 +102,6 @@ def collect_list_items(driver, scraped_hrefs: set[str], max_items: int, scroll_s
             except:
                 pass
 
-            # ==============================
-            # Price (nếu rỗng = "0")
-            # ==============================
-            try:
-                price_el = el.find_element(By.CSS_SELECTOR, ".price")
-                price_text = price_el.text.strip()
-                item["price"] = price_text if price_text else "0"
-            except:
-                item["price"] = "0"
-
             # Push vào output
             out.append(item)
 
@@ -0,0 +1,218 @@
+"""
+Reverse geocode offline: map_coords (lat,lng) -> province_id / district_id / ward_id.
+
+Tâm các phường/xã đọc từ output/<config.WARD_CENTROIDS_FILENAME>:
+    {"<ward_id>": {"lat": 10.77, "lng": 106.70, "province_id": 2, "district_id": 77}, ...}
+(cùng nguồn ID với output của transform). Các tâm được chia vào lưới ô _CELL_DEGREES độ; tra một
+điểm chỉ xét các ô trong phạm vi config.GEO_MAX_DISTANCE_KM quanh nó và lấy phường có tâm gần nhất.
+
+Tâm gần nhất không chắc là phường chứa điểm (phường to/nhỏ khác nhau), nên transform chỉ dùng
+kết quả khi địa chỉ chữ không tìm được và không mâu thuẫn với cấp đã tìm được.
+
+geocode_items(items) tra một lần cả batch (bỏ điểm trùng, gom theo ô lưới) trước khi transform;
+kết quả được nhớ theo toạ độ làm tròn nên transform từng item chỉ còn tra dict.
+"""
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .. import config
+from .mapping import _json_mapping_path
+
+# Ô lưới ~3.3km, cỡ GEO_MAX_DISTANCE_KM: mỗi lần tra xét khoảng 3x3 ô
+_CELL_DEGREES = 0.03
+_KM_PER_DEGREE = 111.32
+# Làm tròn toạ độ khi nhớ kết quả (~1m)
+_ROUND_DIGITS = 5
+
+Location = Tuple[Any, Optional[int], Optional[int]]
+
+
+def parse_coords(value: Any) -> Optional[Tuple[float, float]]:
+    """(lat, lng) từ chuỗi "lat,lng"; None nếu không hợp lệ hoặc nằm ngoài khoảng toạ độ."""
+    if not value or not isinstance(value, str) or "," not in value:
+        return None
+    parts = value.split(",")
+    if len(parts) != 2:
+        return None
+    try:
+        lat, lng = float(parts[0].strip()), float(parts[1].strip())
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (lat == 0 and lng == 0):
+        return None
+    return lat, lng
+
+
+def _distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Khoảng cách xấp xỉ (equirectangular theo vĩ độ điểm 1), đủ chính xác trong vài chục km."""
+    x = (lng2 - lng1) * math.cos(math.radians(lat1))
+    return _KM_PER_DEGREE * math.hypot(lat2 - lat1, x)
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class WardGrid:
+    """
+    WardGrid(centroids, max_km): centroids là nội dung file tâm phường/xã (xem đầu file).
+    nearest() / nearest_many() trả về (province_id, district_id, ward_id) của phường gần nhất.
+    """
+
+    def __init__(self, centroids: Optional[Dict[str, Any]], max_km: Optional[float] = None):
+        self.max_km = config.GEO_MAX_DISTANCE_KM if max_km is None else max_km
+        self.cells: Dict[Tuple[int, int], list] = {}
+        self.size = 0
+        for key, value in (centroids or {}).items():
+            try:
+                lat, lng = float(value["lat"]), float(value["lng"])
+                ward_id = int(key)
+            except (KeyError, TypeError, ValueError):
+                continue
+            location = (value.get("province_id"), _as_int(value.get("district_id")), ward_id)
+            self.cells.setdefault(self._cell(lat, lng), []).append((lat, lng, location))
+            self.size += 1
+
+    @staticmethod
+    def _cell(lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / _CELL_DEGREES), math.floor(lng / _CELL_DEGREES)
+
+    def _candidates(self, row: int, col: int, lat: float) -> list:
+        """
+        Các tâm trong những ô có thể cách một điểm của ô (row, col) không quá max_km.
+        lat quyết định số cột cần xét (1 độ kinh tuyến ngắn lại khi xa xích đạo).
+        """
+        rows = math.ceil(self.max_km / _KM_PER_DEGREE / _CELL_DEGREES)
+        lng_km = _KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        cols = math.ceil(self.max_km / lng_km / _CELL_DEGREES)
+        found = []
+        for r in range(row - rows, row + rows + 1):
+            for c in range(col - cols, col + cols + 1):
+                cell = self.cells.get((r, c))
+                if cell:
+                    found.extend(cell)
+        return found
+
+    def _closest(self, lat: float, lng: float, candidates: list) -> Optional[Location]:
+        # Như _distance_km nhưng so bình phương khoảng cách theo độ, khỏi tính cos/hypot mỗi ứng viên
+        scale = math.cos(math.radians(lat))
+        best, best_distance = None, (self.max_km / _KM_PER_DEGREE) ** 2
+        for c_lat, c_lng, location in candidates:
+            d_lat = c_lat - lat
+            d_lng = (c_lng - lng) * scale
+            distance = d_lat * d_lat + d_lng * d_lng
+            if distance <= best_distance:
+                best, best_distance = location, distance
+        return best
+
+    def nearest(self, lat: float, lng: float) -> Optional[Location]:
+        if not self.cells:
+            return None
+        return self._closest(lat, lng, self._candidates(*self._cell(lat, lng), lat))
+
+    def nearest_many(self, points: Iterable[Tuple[float, float]]) -> Dict[Tuple[float, float], Optional[Location]]:
+        """Kết quả cho mỗi điểm (khác nhau); các điểm cùng ô dùng chung một danh sách ứng viên."""
+        by_cell: Dict[Tuple[int, int], set] = {}
+        for point in points:
+            by_cell.setdefault(self._cell(*point), set()).add(point)
+        results: Dict[Tuple[float, float], Optional[Location]] = {}
+        for (row, col), cell_points in by_cell.items():
+            candidates = []
+            if self.cells:
+                # Cạnh ô xa xích đạo hơn: nhiều cột nhất trong các điểm của ô
+                edge = max(abs(row * _CELL_DEGREES), abs((row + 1) * _CELL_DEGREES))
+                candidates = self._candidates(row, col, edge)
+            for point in cell_points:
+                results[point] = self._closest(point[0], point[1], candidates)
+        return results
+
+
+_grid: Optional[WardGrid] = None
+# (lat, lng) làm tròn -> kết quả reverse geocode
+_memo: Dict[Tuple[float, float], Optional[Location]] = {}
+
+
+def get_ward_grid() -> WardGrid:
+    """Lưới tâm phường/xã, load một lần; không có file thì lưới rỗng (không tra được gì)."""
+    global _grid
+    if _grid is None:
+        path = _json_mapping_path(config.WARD_CENTROIDS_FILENAME)
+        centroids = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                centroids = json.load(f)
+        _grid = WardGrid(centroids)
+    return _grid
+
+
+def clear_geo_cache() -> None:
+    """Bỏ lưới và kết quả đã nhớ; lần tra sau load lại file tâm phường/xã."""
+    global _grid
+    _grid = None
+    _memo.clear()
+
+
+def _remember(point: Tuple[float, float], location: Optional[Location]) -> None:
+    if len(_memo) >= config.MAPPING_CACHE_SIZE:
+        _memo.clear()
+    _memo[point] = location
+
+
+def _rounded(lat: float, lng: float) -> Tuple[float, float]:
+    return round(lat, _ROUND_DIGITS), round(lng, _ROUND_DIGITS)
+
+
+def reverse_geocode(lat: float, lng: float) -> Optional[Location]:
+    """(province_id, district_id, ward_id) của phường có tâm gần (lat, lng) nhất; None nếu quá xa."""
+    point = _rounded(lat, lng)
+    if point in _memo:
+        return _memo[point]
+    location = get_ward_grid().nearest(*point)
+    _remember(point, location)
+    return location
+
+
+def geocode_items(items: Iterable[dict[str, Any]]) -> int:
+    """Reverse geocode trước map_coords của cả batch item raw (một lần, gom theo ô). Trả về số điểm mới tra."""
+    points = set()
+    for item in items:
+        coords = parse_coords(item.get("map_coords"))
+        if coords is not None:
+            point = _rounded(*coords)
+            if point not in _memo:
+                points.add(point)
+    if not points:
+        return 0
+    for point, location in get_ward_grid().nearest_many(points).items():
+        _remember(point, location)
+    return len(points)
+
+
+def _same(a: Any, b: Any) -> bool:
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return a == b
+
+
+def fill_location(lat_long: Any, province_id: Any, district_id: Any, ward_id: Any) -> Location:
+    """
+    Bổ sung các cấp còn thiếu từ map_coords. Không dùng kết quả nếu tỉnh (hoặc quận/huyện) đã tìm
+    được từ địa chỉ chữ khác với của phường gần nhất.
+    """
+    coords = parse_coords(lat_long)
+    location = reverse_geocode(*coords) if coords is not None else None
+    if location is None:
+        return province_id, district_id, ward_id
+    geo_province, geo_district, geo_ward = location
+    if province_id and not _same(province_id, geo_province):
+        return province_id, district_id, ward_id
+    if district_id and geo_district is not None and not _same(district_id, geo_district):
+        return province_id or geo_province, district_id, ward_id
+    return province_id or geo_province, district_id or geo_district, ward_id or geo_ward
@@ -0,0 +1,361 @@
+"""
+Nơi ghi kết quả (sink) và thread ghi nền (write-behind).
+
+Có ba sink dựng sẵn, chọn bằng config.RESULT_SINKS (một lần chạy có thể ghi vào nhiều sink):
+- JsonFileSink: file ngày YYYY-MM-DD.json (format example.json) qua save_results, như trước.
+- SqliteSink: bảng results trong SQLite, upsert theo tin (chỉ ghi lại khi nội dung đổi).
+- HttpSink: POST các chunk JSON nén gzip tới service ingest, có retry.
+
+Vòng scrape chỉ đẩy các item mới của mỗi trang vào queue có giới hạn rồi chạy tiếp; thread ghi
+đưa batch cho từng sink. Checkpoint cũng đi qua cùng queue và chỉ được ghi sau khi các item trước
+nó đã vào mọi sink, nên checkpoint không bao giờ "đi trước" dữ liệu đã lưu.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import requests
+
+from .. import config
+from .storage import (
+    _item_digest,
+    _item_href,
+    _item_key,
+    _update_sets_from_items,
+    save_results,
+    transform_cached_many,
+)
+
+_SAVE = "save"
+_CALL = "call"
+_STOP = "stop"
+
+
+class ResultSink:
+    """
+    Giao diện sink. write() và close() luôn được gọi từ cùng một thread (thread ghi).
+
+    write(batch, results): batch là các item raw mới từ lần write trước, results là toàn bộ item
+    của ngày (sink ghi lại cả file như JsonFileSink cần). Lỗi thì raise: batch được ghi lại cùng
+    batch sau, nên write() phải idempotent theo tin.
+    """
+
+    name = "sink"
+
+    def write(self, batch: list[dict[str, Any]], results: list[dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class JsonFileSink(ResultSink):
+    name = "json"
+
+    def __init__(self, results_file: str):
+        self.results_file = results_file
+
+    def write(self, batch: list[dict[str, Any]], results: list[dict[str, Any]]) -> None:
+        # Journal chỉ cần append batch; các mode khác ghi lại cả file ngày từ toàn bộ kết quả
+        save_results(batch if config.SAVE_MODE == "journal" else results, self.results_file, None)
+
+
+class SqliteSink(ResultSink):
+    """Bảng results (site, key) -> record đã transform (JSON); record không đổi thì không ghi lại."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str | Path, site: str = config.SITE_NAME):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.site = site
+        self.stats = {"upserts": 0}
+        # Mở trên thread chính, dùng trên thread ghi
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " site TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " href TEXT,"
+                " data TEXT NOT NULL,"
+                " hash TEXT NOT NULL,"
+                " first_seen TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL,"
+                " PRIMARY KEY (site, key)"
+                ")"
+            )
+
+    def write(self, batch: list[dict[str, Any]], results: list[dict[str, Any]]) -> None:
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = []
+        for item, record in zip(batch, transform_cached_many(batch)):
+            rows.append((
+                self.site,
+                _item_key(item),
+                _item_href(record),
+                json.dumps(record, ensure_ascii=False),
+                _item_digest(record),
+                now,
+                now,
+            ))
+        with self._conn:
+            cursor = self._conn.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(site, key) DO UPDATE SET"
+                " href = excluded.href, data = excluded.data, hash = excluded.hash, updated_at = excluded.updated_at"
+                " WHERE results.hash != excluded.hash",
+                rows,
+            )
+        # Xung đột với record không đổi bị WHERE bỏ qua, không tính vào rowcount
+        self.stats["upserts"] += cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class HttpSink(ResultSink):
+    """
+    POST record đã transform theo chunk (tối đa batch_size record/request):
+    body {"site": ..., "data": [...]} nén gzip (Content-Encoding: gzip).
+
+    Lỗi mạng, 408, 429 và 5xx được thử lại với backoff (tôn trọng Retry-After); 4xx khác thì dừng ngay.
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        url: str,
+        site: str = config.SITE_NAME,
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        token: Optional[str] = None,
+        backoff: float = 1.0,
+    ):
+        if not url:
+            raise ValueError("HttpSink cần config.HTTP_SINK_URL (hoặc biến môi trường CRAW_INGEST_URL)")
+        self.url = url
+        self.site = site
+        self.batch_size = batch_size or config.HTTP_SINK_BATCH_SIZE
+        self.max_retries = config.HTTP_SINK_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or config.HTTP_SINK_TIMEOUT
+        self.backoff = backoff
+        self.headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        token = config.HTTP_SINK_TOKEN if token is None else token
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self.stats = {"requests": 0, "records": 0, "bytes": 0, "retries": 0}
+        self._session = requests.Session()
+
+    def write(self, batch: list[dict[str, Any]], results: list[dict[str, Any]]) -> None:
+        records = transform_cached_many(batch)
+        for start in range(0, len(records), self.batch_size):
+            self._post(records[start:start + self.batch_size])
+
+    def _post(self, records: list[dict[str, Any]]) -> None:
+        body = gzip.compress(
+            json.dumps({"site": self.site, "data": records}, ensure_ascii=False).encode("utf-8"),
+            compresslevel=config.COMPRESS_LEVEL,
+        )
+        error: Any = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self._session.post(self.url, data=body, headers=self.headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = e
+            else:
+                if response.status_code < 300:
+                    self.stats["requests"] += 1
+                    self.stats["records"] += len(records)
+                    self.stats["bytes"] += len(body)
+                    return
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code < 500 and response.status_code not in (408, 429):
+                    break
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = int(retry_after)
+            if attempt < self.max_retries:
+                time.sleep(min(delay, 60))
+        raise RuntimeError(f"POST {self.url} thất bại ({len(records)} record): {error}")
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def build_sinks(results_file: str, names: Optional[Iterable[str]] = None) -> list[ResultSink]:
+    """Tạo các sink theo config.RESULT_SINKS (hoặc `names`)."""
+    sinks: list[ResultSink] = []
+    for name in names or config.RESULT_SINKS:
+        if name == "json":
+            sinks.append(JsonFileSink(results_file))
+        elif name == "sqlite":
+            sinks.append(SqliteSink(Path(config.OUTPUT_DIR) / config.SQLITE_SINK_FILENAME))
+        elif name == "http":
+            sinks.append(HttpSink(config.HTTP_SINK_URL))
+        else:
+            raise ValueError(f"Sink không hợp lệ: {name!r} (json, sqlite, http)")
+    return sinks
+
+
+class WriteBehindSink:
+    """
+    Thread ghi kết quả với queue có giới hạn (config.WRITE_BEHIND_QUEUE_SIZE batch), ghi mỗi batch
+    vào mọi sink rồi cập nhật seen index và index fingerprint (chỉ khi tất cả sink ghi thành công).
+
+    - submit(all_results): đẩy các item thêm vào all_results từ lần submit trước.
+    - call(fn, ...): chạy fn (ví dụ save_checkpoint) trên thread ghi, sau các batch đã submit.
+    - close(): ghi nốt mọi thứ trong queue, dừng thread và đóng các sink; luôn gọi trong `finally`.
+
+    Lỗi của sink.write chỉ giữ batch lại để ghi sau. Lỗi khác trên thread ghi (cập nhật seen index...)
+    không dừng thread (close() vẫn trả về); nó được raise lại ở lần submit()/call() kế tiếp.
+
+    threaded=False: ghi đồng bộ ngay trong submit()/call() (như trước khi có write-behind).
+    """
+
+    def __init__(
+        self,
+        sinks: list[ResultSink],
+        scraped_hrefs: Any,
+        all_results: Optional[list[dict[str, Any]]] = None,
+        maxsize: Optional[int] = None,
+        threaded: bool = True,
+        fingerprint_index: Any = None,
+    ):
+        self.sinks = sinks
+        self.scraped_hrefs = scraped_hrefs
+        self.fingerprint_index = fingerprint_index
+        # Danh sách riêng của thread ghi (runner vẫn append vào all_results của nó)
+        self._results = list(all_results or [])
+        self._submitted = len(self._results)
+        # Batch ghi lỗi, ghi lại cùng batch kế tiếp
+        self._unsaved: list[dict[str, Any]] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize or config.WRITE_BEHIND_QUEUE_SIZE)
+        self._closed = False
+        # Lỗi trên thread ghi chưa báo cho thread scrape
+        self._error: Optional[BaseException] = None
+        self.stats = {"batches": 0, "items": 0, "saves": 0, "errors": 0, "max_queue": 0}
+
+        self._thread = None
+        if threaded:
+            self._thread = threading.Thread(target=self._run, name="result-sink", daemon=True)
+            self._thread.start()
+
+    def submit(self, all_results: list[dict[str, Any]]) -> None:
+        self._check()
+        batch = all_results[self._submitted:]
+        self._submitted = len(all_results)
+        if batch:
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+            self._put((_SAVE, batch))
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self._put((_CALL, (fn, args, kwargs)))
+
+    def _check(self) -> None:
+        if self._closed:
+            raise RuntimeError("WriteBehindSink đã đóng")
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Thread ghi kết quả bị lỗi") from error
+
+    def _put(self, task: tuple[str, Any]) -> None:
+        self._check()
+        if self._thread is None:
+            self._process([task])
+            return
+        self._queue.put(task)
+        self.stats["max_queue"] = max(self.stats["max_queue"], self._queue.qsize())
+
+    def _run(self) -> None:
+        while True:
+            tasks = [self._queue.get()]
+            # Gom mọi task đang chờ: nhiều batch -> một lần ghi vào mỗi sink
+            while True:
+                try:
+                    tasks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process([task for task in tasks if task[0] != _STOP])
+            except Exception as e:
+                # Không để thread chết: các task sau vẫn được lấy ra, flush()/close() không bị treo
+                self.stats["errors"] += 1
+                self._error = e
+                print(f"[Sink] Lỗi trên thread ghi: {e}")
+            finally:
+                for _ in tasks:
+                    self._queue.task_done()
+            if any(task[0] == _STOP for task in tasks):
+                return
+
+    def _process(self, tasks: list[tuple[str, Any]]) -> None:
+        new_items = [item for kind, payload in tasks if kind == _SAVE for item in payload]
+        self._results.extend(new_items)
+        # Batch lỗi trước đó được ghi lại ngay cả khi không có item mới (ví dụ chỉ có checkpoint):
+        # checkpoint chỉ chạy khi mọi item trước nó đã vào các sink
+        batch = self._unsaved + new_items
+        if batch:
+            failed = False
+            # Sink lỗi không chặn các sink khác
+            for sink in self.sinks:
+                try:
+                    sink.write(batch, self._results)
+                except Exception as e:
+                    failed = True
+                    print(f"[Sink] Lỗi ghi kết quả ({sink.name}): {e}")
+            if failed:
+                # Không ghi seen index và checkpoint đi kèm: nếu đến cuối lần chạy vẫn lỗi,
+                # lần chạy sau lấy lại các tin này
+                self.stats["errors"] += 1
+                self._unsaved = batch
+                return
+            self._unsaved = []
+            _update_sets_from_items(batch, self.scraped_hrefs)
+            if self.fingerprint_index is not None:
+                self.fingerprint_index.add_items(batch)
+            self.stats["saves"] += 1
+
+        for kind, payload in tasks:
+            if kind != _CALL:
+                continue
+            fn, args, kwargs = payload
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[Sink] Lỗi khi chạy {getattr(fn, '__name__', fn)}: {e}")
+
+    def flush(self) -> None:
+        """Chờ thread ghi xử lý hết các batch đã submit."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        if self._thread is not None:
+            self._queue.put((_STOP, None))
+            self._thread.join()
+        self._closed = True
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"[Sink] Lỗi khi đóng {sink.name}: {e}")
@@ -1,99 +1,529 @@
 from __future__ import annotations
 
+import gzip
+import hashlib
+import io
 import json
 import os
-import re
+import shutil
+import tempfile
+import zipfile
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable, Tuple
+from typing import Any, Callable, Iterable, Iterator, Tuple
 import requests
 from urllib.parse import urlparse
 from .. import config
+from .listing_ids import listing_key
+from .matcher import KeywordMatcher
+from .parsers import Price, parse_area, parse_count, parse_price
+from .price_history import PRICE_HISTORY_FILENAME, PriceHistory
+from .result_stream import iter_result_hrefs, iter_results, result_file_kind
+from .seen_index import SeenIndex
+
+def _item_href(item: dict[str, Any]) -> str | None:
+    # Format cũ: pid và href ở root level
+    href = item.get("href")
+
+    # Format mới: real_estate_code (từ pid) và href trong other_info
+    if not href:
+        other_info = item.get("other_info", {})
+        if isinstance(other_info, dict):
+            href = other_info.get("href")
+
+    return str(href) if href else None
+
 
 def _update_sets_from_items(
     items: Iterable[dict[str, Any]],
     scraped_hrefs: set[str],
 ) -> None:
     """Update sets từ items, hỗ trợ cả format cũ và format mới (example.json)."""
+    hrefs = []
+    card_digests = {}
     for it in items:
-        # Format cũ: pid và href ở root level
-        href = it.get("href")
-        
-        # Format mới: real_estate_code (từ pid) và href trong other_info
-        if not href:
-            other_info = it.get("other_info", {})
-            if isinstance(other_info, dict):
-                href = other_info.get("href")
-        
+        href = _item_href(it)
         if href:
-            scraped_hrefs.add(str(href))
+            hrefs.append(href)
+            if it.get("card_digest"):
+                card_digests[href] = it["card_digest"]
 
+    # Một lần update cho cả batch (SeenIndex ghi xuống đĩa trong một transaction)
+    if isinstance(scraped_hrefs, SeenIndex):
+        scraped_hrefs.update(hrefs, card_digests=card_digests)
+    else:
+        scraped_hrefs.update(hrefs)
 
-def load_previous_results(
-    output_dir: str,
-    today: datetime,
-) -> Tuple[set[str], set[str], list[dict[str, Any]]]:
-    scraped_hrefs = set()
-    all_results = []
 
+SEEN_INDEX_FILENAME = "seen_index.sqlite"
+MANIFEST_FILENAME = "_manifest.jsonl"
+
+
+def _item_key(item: dict[str, Any]) -> str:
+    """Key unique của item, hỗ trợ cả format cũ và format mới (example.json)."""
+    key = None
+
+    # Format cũ: pid hoặc href ở root level
+    if "pid" in item:
+        key = item.get("pid")
+    elif "href" in item:
+        key = item.get("href")
+
+    # Format mới: real_estate_code hoặc href trong other_info
+    if not key:
+        key = item.get("real_estate_code")
+    if not key:
+        other_info = item.get("other_info", {})
+        if isinstance(other_info, dict):
+            key = other_info.get("href") or other_info.get("pid")
+
+    if not key:
+        # fallback to object id to avoid overwriting
+        key = f"tmp-{id(item)}"
+
+    return str(key)
+
+
+def _dump_json(binary: Any, data: Any, indent: int | None) -> None:
+    f = io.TextIOWrapper(binary, encoding="utf-8")
+    json.dump(data, f, ensure_ascii=False, indent=indent)
+    f.flush()
+    f.detach()
+
+
+def _atomic_write_json(file_path: str | Path, data: Any) -> None:
+    """
+    Ghi JSON ra file tạm cùng thư mục rồi os.replace, crash giữa chừng không làm hỏng file cũ.
+    File .gz được ghi nén và không indent (indent chỉ để người đọc file thường).
+    """
+    file_path = Path(file_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".tmp", dir=file_path.parent)
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            if file_path.name.endswith(".gz"):
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=config.COMPRESS_LEVEL, mtime=0) as gz:
+                    _dump_json(gz, data, indent=None)
+            else:
+                _dump_json(raw, data, indent=2)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _results_base(results_file: str | Path) -> Path:
+    """File kết quả bỏ đuôi .json / .json.gz, ví dụ output/2025-10/2025-10-01."""
+    path = Path(results_file)
+    return path.with_name(result_file_kind(path.name)[0])
+
+
+def _journal_path(results_file: str | Path) -> Path:
+    """
+    File journal (.jsonl) đi kèm file kết quả trong ngày.
+    Journal luôn là file thường (append từng dòng), chỉ file đã gộp mới được nén.
+    """
+    base = _results_base(results_file)
+    return base.with_name(base.name + ".jsonl")
+
+
+def _other_variant(results_file: str | Path) -> Path:
+    """Bản .json <-> .json.gz còn lại của cùng ngày (khi COMPRESS_OUTPUT bị đổi giữa hai lần chạy)."""
+    base = _results_base(results_file)
+    if str(results_file).endswith(".gz"):
+        return base.with_name(base.name + ".json")
+    return base.with_name(base.name + ".json.gz")
+
+
+def _today_sources(results_file: str | Path) -> list[Path]:
+    """Các file đang có của ngày, theo thứ tự ghi đè: bản còn lại, file kết quả, journal."""
+    paths = [_other_variant(results_file), Path(results_file), _journal_path(results_file)]
+    return [p for p in paths if p.exists()]
+
+
+def _remove_other_variant(results_file: str | Path) -> None:
+    """Xoá bản .json / .json.gz cũ của ngày sau khi dữ liệu đã được gộp vào results_file."""
+    try:
+        _other_variant(results_file).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _result_file_date(name: str) -> datetime | None:
+    """Ngày của file kết quả (YYYY-MM-DD.json / .json.gz / .jsonl), None nếu không phải."""
+    stem, kind = result_file_kind(name)
+    if kind is None:
+        return None
+    try:
+        return datetime.strptime(stem, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _iter_previous_files(output_dir: str, today: datetime) -> Iterable[Path | zipfile.Path]:
+    """
+    Các file kết quả (.json / .jsonl, thường hoặc .gz) theo ngày trong output_dir, không sau ngày `today`,
+    kể cả các file nằm trong archive tháng YYYY-MM.zip (trả về zipfile.Path).
+    """
     for root, dirs, files in os.walk(output_dir):
         for file in files:
-            if not file.endswith(".json"):
+            file_path = Path(root) / file
+
+            if file.endswith(".zip"):
+                try:
+                    with zipfile.ZipFile(file_path) as archive:
+                        for name in archive.namelist():
+                            file_date = _result_file_date(name)
+                            if file_date is not None and file_date <= today:
+                                yield zipfile.Path(archive, at=name)
+                except zipfile.BadZipFile:
+                    continue
+                continue
+
+            file_date = _result_file_date(file)
+            if file_date is None or file_date > today:
                 continue
 
-            file_path = os.path.join(root, file)
-            file_date_str = file[:-5]
+            yield file_path
+
+
+def _month_archive_path(month_dir: Path) -> Path:
+    return month_dir.with_name(month_dir.name + ".zip")
+
+
+def seal_past_months(output_dir: str | Path, today: datetime) -> list[Path]:
+    """
+    Đóng gói các folder tháng đã qua (output_dir/YYYY-MM, trước tháng của `today`) thành
+    output_dir/YYYY-MM.zip rồi xoá folder. File .json được deflate, file đã là .gz thì giữ nguyên.
+    Nếu archive của tháng đã có (folder được tạo lại sau khi seal), file trong folder ghi đè member cùng tên.
+    Journal còn sót được gộp trước (compact_past_journals). Các loader đọc thẳng từ archive nên không
+    cần giải nén. Trả về danh sách archive đã ghi.
+    """
+    output_dir = Path(output_dir)
+    if not output_dir.is_dir():
+        return []
 
+    compact_past_journals(output_dir, today)
+    current_month = today.strftime("%Y-%m")
+    sealed = []
+    for month_dir in sorted(output_dir.iterdir()):
+        if not month_dir.is_dir() or month_dir.name >= current_month:
+            continue
+        try:
+            datetime.strptime(month_dir.name, "%Y-%m")
+        except ValueError:
+            continue
+
+        _ensure_manifest(month_dir)
+        files = {p.name: p for p in sorted(month_dir.iterdir()) if p.is_file() and not p.name.startswith(".")}
+        archive_path = _month_archive_path(month_dir)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{archive_path.name}.", suffix=".tmp", dir=output_dir)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp_path, "w") as archive:
+                old_manifest = b""
+                if archive_path.exists():
+                    with zipfile.ZipFile(archive_path) as old:
+                        for info in old.infolist():
+                            if info.filename == MANIFEST_FILENAME:
+                                old_manifest = old.read(info)
+                            elif info.filename not in files:
+                                archive.writestr(info, old.read(info))
+                for name, file_path in files.items():
+                    if name == MANIFEST_FILENAME:
+                        # Manifest là log append: nối thêm vào manifest đã seal, không ghi đè
+                        archive.writestr(name, old_manifest + file_path.read_bytes(), compress_type=zipfile.ZIP_DEFLATED)
+                        continue
+                    compress_type = zipfile.ZIP_STORED if name.endswith(".gz") else zipfile.ZIP_DEFLATED
+                    archive.write(file_path, arcname=name, compress_type=compress_type)
+            with zipfile.ZipFile(tmp_path) as archive:
+                bad = archive.testzip()
+            if bad is not None:
+                raise zipfile.BadZipFile(f"CRC mismatch for {bad}")
+            os.replace(tmp_path, archive_path)
+        except Exception as e:
             try:
-                file_date = datetime.strptime(file_date_str, "%Y-%m-%d")
-            except ValueError:
-                continue
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            print(f"[Seal] Không đóng gói được {month_dir}: {e}")
+            continue
 
-            if file_date > today:
-                continue
+        shutil.rmtree(month_dir)
+        sealed.append(archive_path)
+        print(f"[Seal] {month_dir} -> {archive_path} ({len(files)} files)")
+    return sealed
+
+
+# Manifest tháng: output/YYYY-MM/_manifest.jsonl, mỗi dòng {"key", "href", "hash", "date"} của một record
+# đã lưu (dòng sau cùng của một key là mới nhất). Đọc manifest thay cho việc parse lại toàn bộ file ngày.
+
+# Trạng thái manifest đang mở: key -> (record đã ghi gần nhất, hash), để không hash lại record không đổi.
+# Giữ chính object (so bằng `is`) thay vì id(): id của object đã bị thu hồi có thể được cấp lại.
+_manifest_state: dict[str, dict[str, tuple[Any, str]]] = {}
+
+
+def _manifest_entry(record: dict[str, Any], digest: str, date: str) -> dict[str, Any]:
+    key = _item_key(record)
+    if key.startswith("tmp-"):
+        # Record không có pid/href: key theo nội dung để manifest không phình ra sau mỗi lần lưu
+        key = f"hash-{digest}"
+    return {"key": key, "href": _item_href(record), "hash": digest, "date": date}
+
+
+def _iter_entries_from_sources(sources: Iterable[Any]) -> Iterator[dict[str, Any]]:
+    """Dựng entry manifest từ các file kết quả (dùng khi folder/archive chưa có manifest)."""
+    for source in sources:
+        date = result_file_kind(source.name)[0][:10]
+        try:
+            for record in iter_results(source):
+                yield _manifest_entry(record, _item_digest(record), date)
+        except Exception:
+            continue
 
+
+def _iter_href_entries(sources: Iterable[Any]) -> Iterator[dict[str, Any]]:
+    """Entry chỉ có {"href", "date"} của các file kết quả, quét href không decode record."""
+    for source in sources:
+        date = result_file_kind(source.name)[0][:10]
+        try:
+            for href in iter_result_hrefs(source):
+                yield {"href": href, "date": date}
+        except Exception:
+            continue
+
+
+def _write_jsonl(file_path: Path, rows: Iterable[dict[str, Any]]) -> None:
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".tmp", dir=file_path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _ensure_manifest(month_dir: str | Path) -> Path:
+    """Tạo manifest cho folder từ các file ngày đang có (một lần), để manifest luôn phủ đủ cả folder."""
+    month_dir = Path(month_dir)
+    manifest_file = month_dir / MANIFEST_FILENAME
+    if not manifest_file.exists():
+        day_files = sorted(
+            (p for p in month_dir.iterdir() if p.is_file() and _result_file_date(p.name) is not None),
+            key=lambda p: (_result_file_date(p.name), result_file_kind(p.name)[1] == "jsonl"),
+        )
+        _write_jsonl(manifest_file, _iter_entries_from_sources(day_files))
+        _manifest_state.pop(str(manifest_file), None)
+    return manifest_file
+
+
+def rebuild_manifest(month_dir: str | Path) -> Path:
+    """Dựng lại manifest của folder từ đầu (khi file ngày bị sửa ngoài save_results)."""
+    manifest_file = Path(month_dir) / MANIFEST_FILENAME
+    try:
+        manifest_file.unlink()
+    except FileNotFoundError:
+        pass
+    return _ensure_manifest(month_dir)
+
+
+def _get_manifest_state(manifest_file: Path) -> dict[str, tuple[Any, str]]:
+    cache_key = str(manifest_file)
+    if cache_key not in _manifest_state:
+        _ensure_manifest(manifest_file.parent)
+        _manifest_state[cache_key] = {
+            entry["key"]: (None, entry["hash"])
+            for entry in iter_results(manifest_file)
+            if "key" in entry and "hash" in entry
+        }
+    return _manifest_state[cache_key]
+
+
+def update_manifest(records: Iterable[dict[str, Any]], results_file: str | Path) -> int:
+    """
+    Ghi vào manifest của folder tháng các record (đã transform) mới hoặc đã đổi nội dung
+    so với manifest. Trả về số dòng đã append.
+    """
+    if _result_file_date(Path(results_file).name) is None:
+        # File có filter (YYYY-MM-DD_<filter>.json) không thuộc lịch sử dedup, giống _iter_previous_files
+        return 0
+
+    manifest_file = Path(results_file).parent / MANIFEST_FILENAME
+    state = _get_manifest_state(manifest_file)
+    date = _results_base(results_file).name[:10]
+
+    lines = []
+    for record in records:
+        key = _item_key(record)
+        previous = state.get(key)
+        # Cùng object record với lần trước (lấy từ cache transform) -> không đổi, khỏi hash lại
+        if previous and previous[0] is record:
+            continue
+        digest = _item_digest(record)
+        state[key] = (record, digest)
+        if previous and previous[1] == digest:
+            continue
+        lines.append(json.dumps(_manifest_entry(record, digest, date), ensure_ascii=False))
+
+    if lines:
+        with open(manifest_file, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    return len(lines)
+
+
+_price_history: PriceHistory | None = None
+
+
+def get_price_history() -> PriceHistory:
+    """Lịch sử giá dùng chung cho mọi file kết quả của site (config.OUTPUT_DIR/price_history.bin)."""
+    global _price_history
+    path = Path(config.OUTPUT_DIR) / PRICE_HISTORY_FILENAME
+    if _price_history is None or _price_history.path != path:
+        _price_history = PriceHistory(path)
+    return _price_history
+
+
+def update_price_history(records: Iterable[dict[str, Any]]) -> int:
+    """Ghi giá của các record (đã transform) vào lịch sử giá; chỉ giá mới/đã đổi mới được append."""
+    rows = []
+    for record in records:
+        href = _item_href(record)
+        price = record.get("price")
+        if not href or not price or not isinstance(price, (int, float)):
+            # Giá thỏa thuận (price = 0) không có gì để theo dõi
+            continue
+        rows.append((listing_key(href), price, record.get("price_unit"), record.get("province_id")))
+    return get_price_history().record_many(rows)
+
+
+def iter_manifest_entries(
+    output_dir: str,
+    today: datetime,
+    hrefs_only: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """
+    Duyệt entry manifest của mọi folder tháng (và archive YYYY-MM.zip) trong output_dir, ngày không sau `today`.
+    Folder chưa có manifest được dựng manifest một lần; archive cũ không có manifest thì đọc thẳng file ngày
+    (hrefs_only=True: chỉ quét href, entry của các archive đó không có "key"/"hash").
+    """
+    today_str = today.strftime("%Y-%m-%d")
+    for root, dirs, files in os.walk(output_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.endswith(".zip"):
+                continue
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                # Hỗ trợ cả format cũ (list) và format mới (object với key "data")
-                if isinstance(data, list):
-                    _update_sets_from_items(data, scraped_hrefs)
-                    all_results.extend(data)
-                elif isinstance(data, dict) and "data" in data:
-                    items = data["data"]
-                    if isinstance(items, list):
-                        _update_sets_from_items(items, scraped_hrefs)
-                        all_results.extend(items)
-            except:
+                with zipfile.ZipFile(Path(root) / file) as archive:
+                    names = archive.namelist()
+                    if MANIFEST_FILENAME in names:
+                        entries = iter_results(zipfile.Path(archive, at=MANIFEST_FILENAME))
+                    else:
+                        day_files = [zipfile.Path(archive, at=name) for name in sorted(names) if _result_file_date(name)]
+                        if hrefs_only:
+                            entries = _iter_href_entries(day_files)
+                        else:
+                            entries = _iter_entries_from_sources(day_files)
+                    for entry in entries:
+                        if entry.get("date", "") <= today_str:
+                            yield entry
+            except zipfile.BadZipFile:
                 continue
 
+        if MANIFEST_FILENAME in files or any(_result_file_date(file) for file in files):
+            manifest_file = _ensure_manifest(root)
+            for entry in iter_results(manifest_file):
+                if entry.get("date", "") <= today_str:
+                    yield entry
+
+
+def load_manifest(output_dir: str, today: datetime) -> dict[str, dict[str, Any]]:
+    """Entry mới nhất theo key của tất cả record đã lưu (chỉ đọc manifest)."""
+    return {entry["key"]: entry for entry in iter_manifest_entries(output_dir, today) if "key" in entry}
+
+
+def load_previous_results(
+    output_dir: str,
+    today: datetime,
+    full_records: bool = True,
+) -> Tuple[set[str], list[dict[str, Any]]]:
+    """
+    full_records=True: đọc toàn bộ record từ các file kết quả cũ.
+    full_records=False: chỉ đọc manifest, trả về entry {"key", "href", "hash", "date"} thay cho record.
+    """
+    if not full_records:
+        entries = list(load_manifest(output_dir, today).values())
+        return {entry["href"] for entry in entries if entry.get("href")}, entries
+
+    scraped_hrefs = set()
+    all_results = []
+
+    for file_path in _iter_previous_files(output_dir, today):
+        try:
+            items = list(iter_results(file_path))
+            _update_sets_from_items(items, scraped_hrefs)
+            all_results.extend(items)
+        except:
+            continue
+
     return scraped_hrefs, all_results
 
 
+def load_previous_hrefs(output_dir: str, today: datetime) -> set[str]:
+    """
+    Chỉ lấy href của các record đã lưu, đọc từ manifest tháng (không parse file ngày);
+    archive cũ chưa có manifest thì quét href bằng iter_result_hrefs.
+    """
+    return {entry["href"] for entry in iter_manifest_entries(output_dir, today, hrefs_only=True) if entry.get("href")}
+
+
+def open_seen_index(output_dir: str, today: datetime, persist: bool = True) -> SeenIndex:
+    """
+    Mở index href đã crawl của site (output_dir/seen_index.sqlite).
+    Lần đầu tiên index được dựng từ các file kết quả cũ bằng load_previous_hrefs,
+    các lần sau chỉ mở file SQLite, không đọc lại lịch sử.
+
+    persist=False (lần chạy có filter): vẫn bỏ qua các tin đã có trong output chính, nhưng href
+    của lần chạy không được ghi vào index, như khi file _<filter>.json không thuộc lịch sử crawl.
+    """
+    index = SeenIndex(Path(output_dir) / SEEN_INDEX_FILENAME)
+    if index.get_meta("bootstrapped_at") is None:
+        scraped_hrefs = load_previous_hrefs(output_dir, today)
+        index.update(scraped_hrefs)
+        index.set_meta("bootstrapped_at", today.strftime("%Y-%m-%d %H:%M:%S"))
+        print(f"[SeenIndex] Built index with {len(scraped_hrefs)} hrefs from {output_dir}")
+    index.persist = persist
+    return index
 
 
 def load_today_results(
     results_file: str,
     scraped_hrefs: set[str],
 ) -> list[dict[str, Any]]:
-    if not os.path.exists(results_file):
-        return []
-    try:
-        with open(results_file, "r", encoding="utf-8") as f:
-            today_data = json.load(f)
-            # Hỗ trợ cả format cũ (list) và format mới (object với key "data")
-            if isinstance(today_data, list):
-                _update_sets_from_items(today_data, scraped_hrefs)
-                return today_data
-            elif isinstance(today_data, dict) and "data" in today_data:
-                items = today_data["data"]
-                if isinstance(items, list):
-                    _update_sets_from_items(items, scraped_hrefs)
-                    return items
-    except Exception:
-        pass
-    return []
+    """Đọc kết quả trong ngày: file .json (.json.gz) đã gộp + các record còn trong journal."""
+    merged: dict[str, dict[str, Any]] = {}
+    for file_path in _today_sources(results_file):
+        try:
+            for item in iter_results(file_path):
+                merged[_item_key(item)] = item
+        except Exception:
+            continue
+
+    items = list(merged.values())
+    _update_sets_from_items(items, scraped_hrefs)
+    return items
 
 def convert_paths(obj):
     if isinstance(obj, Path):
@@ -105,108 +535,41 @@ def convert_paths(obj):
     return obj
 
 
-def _parse_number_from_text(text: str) -> float | None:
-    """Parse số từ text (ví dụ: '100 m²' -> 100.0, '5 tỷ' -> 5000000000)."""
-    if not text or not isinstance(text, str):
-        return None
-    
-    # Loại bỏ dấu phẩy, chấm (trừ dấu chấm thập phân)
-    text_clean = text.replace(",", "").strip()
-    
-    # Tìm số
-    match = re.search(r'(\d+(?:\.\d+)?)', text_clean)
-    if not match:
-        return None
-    
-    number = float(match.group(1))
-    
-    # Xử lý đơn vị (tỷ, triệu)
-    if 'tỷ' in text_clean.lower() or 'ty' in text_clean.lower():
-        number *= 1000000000
-    elif 'triệu' in text_clean.lower() or 'trieu' in text_clean.lower():
-        number *= 1000000
-    
-    return number
+# Tên spec/config -> trường số phòng/tầng, xét theo thứ tự (chỉ lấy trường đầu tiên khớp)
+_COUNT_KEYS = (
+    ("bedroom", ("phòng ngủ", "phong ngu", "bedroom")),
+    ("bathroom", ("phòng tắm", "phong tam", "bathroom", "wc", "toilet", "vệ sinh", "ve sinh")),
+    ("floor", ("số tầng", "so tang", "lầu", "lau", "floor")),
+)
 
 
-def _extract_area_number(area_text: str) -> float | None:
-    if not area_text:
-        return None
-
-    text = str(area_text).strip()
-
-    # Trường hợp có dấu chấm phân tách nghìn (ví dụ VN)
-    if re.search(r'\d+\.\d{3}\b', text):  # match kiểu 8.800 hoặc 12.500, 120.000
-        clean = text.replace('.', '').replace(',', '.')
-        match = re.search(r'(\d+(?:\.\d+)?)', clean)
-        return float(match.group(1)) if match else None
-
-    # Trường hợp số thập phân: 8.8 hoặc 8,8
-    text = text.replace(',', '.')
-    match = re.search(r'(\d+(?:\.\d+)?)', text)
-    return float(match.group(1)) if match else None
-
-
-
-def _extract_bedroom_bathroom_floor(specs: dict, config: dict) -> tuple[int | None, int | None, int | None]:
-    """Extract số phòng ngủ, phòng tắm, số tầng từ specs và config."""
-
-    def _parse_int_from_text(text: Any) -> int | None:
-        if text is None:
-            return None
-        value_str = str(text)
-        match = re.search(r'(\d+)', value_str)
-        if match:
-            return int(match.group(1))
-        value_lower = value_str.lower()
-        word_map = {
-            "một": 1,
-            "mot": 1,
-            "hai": 2,
-            "ba": 3,
-            "bốn": 4,
-            "bon": 4,
-            "năm": 5,
-            "nam": 5,
-            "sáu": 6,
-            "sau": 6,
-            "bảy": 7,
-            "bay": 7,
-            "tám": 8,
-            "tam": 8,
-            "chín": 9,
-            "chin": 9
-        }
-        for word, num in word_map.items():
-            if word in value_lower:
-                return num
-        return None
-
-    bedroom = None
-    bathroom = None
-    floor = None
+def _count_field(key: Any) -> str | None:
+    key_lower = str(key).lower()
+    for field, words in _COUNT_KEYS:
+        if any(word in key_lower for word in words):
+            return field
+    return None
 
-    def _update_counts(key: str, value: Any, allow_override: bool = False):
-        nonlocal bedroom, bathroom, floor
-        key_lower = str(key).lower()
-        num = _parse_int_from_text(value)
-        if num is None:
-            return
 
-        if ('số phòng ngủ' in key_lower or 'so phong ngu' in key_lower or 'bedroom' in key_lower) and (bedroom is None or allow_override):
-            bedroom = num
-        elif ('số phòng tắm' in key_lower or 'phong tam' in key_lower or 'bathroom' in key_lower or 'wc' in key_lower or "số phòng vệ sinh") and (bathroom is None or allow_override):
-            bathroom = num
-        elif ('tổng số tầng' in key_lower or 'lau' in key_lower or 'lầu' in key_lower or 'floor' in key_lower) and (floor is None or allow_override):
-            floor = num
-
-    for key, value in specs.items():
-        _update_counts(key, value, allow_override=False)
-
-    for key, value in config.items():
-        _update_counts(key, value, allow_override=True)
-
-    return bedroom, bathroom, floor
+def _extract_bedroom_bathroom_floor(
+    specs: dict,
+    config: dict,
+    parse_int: Callable[[Any], int | None] = parse_count,
+) -> tuple[int | None, int | None, int | None]:
+    """
+    Extract số phòng ngủ, phòng tắm, số tầng từ specs và config (parse_int: parse số từ giá trị).
+    Chỉ parse giá trị của các key khớp _COUNT_KEYS; config ghi đè specs.
+    """
+    counts: dict[str, int | None] = {"bedroom": None, "bathroom": None, "floor": None}
+    for source, allow_override in ((specs, False), (config, True)):
+        for key, value in source.items():
+            field = _count_field(key)
+            if field is None or (counts[field] is not None and not allow_override):
+                continue
+            num = parse_int(value)
+            if num is not None:
+                counts[field] = num
+    return counts["bedroom"], counts["bathroom"], counts["floor"]
 
 
 def _determine_sale_type(href: str) -> str:
@@ -219,6 +582,178 @@ def _determine_sale_type(href: str) -> str:
     return "sell"
 
 
+# Bảng từ khoá của transform_to_example_format. Bảng nhỏ được kiểm tra `in` từng từ khoá (so chuỗi
+# bằng C nhanh hơn automaton, xem bench matcher); chỉ _SPEC_KEY_GROUPS đủ lớn để dùng KeywordMatcher.
+_REAL_ESTATE_TYPE_SLUGS = (
+    "nha-mat-pho-mat-tien", "nha-ngo-hem", "nha-biet-thu", "nha-pho-lien-ke", "nha-vuon",
+    "nha-thanh-ly", "nha-o-xa-hoi", "can-ho-chung-cu", "can-ho-duplex", "can-ho-penthouse", "can-ho-tap-the-cu-xa", 'dat-nen-dat-tho-cu',
+    "dat-nen-du-an", "dat-nong-nghiep", "dat-cong-nghiep", "dat-thuong-mai-dich-vu", "dat-thanh-ly",
+    "condotel", "homestay", "farmstay", "khach-san", "resort", "van-phong", "shophouse",
+    "kho-nha-xuong","phong-tro", "mat-bang-kinh-doanh"
+)
+_REAL_ESTATE_TYPE_TITLE_WORDS = (
+    "chung cư", "căn hộ", "nhà riêng", "biệt thự", "nhà mặt phố",
+    "shophouse", "đất", "condotel", "kho", "nhà xưởng", "trang trại"
+)
+# Nhóm của tên trường trong specs/config -> trường infomation_* / land_info_* tương ứng
+_SPEC_KEY_GROUPS = KeywordMatcher.from_groups({
+    "legal_docs": ["giấy tờ", "pháp lý", "sổ đỏ", "sổ hồng", "phap ly", "giay to", "Đã có sổ", "da co so", "đang chờ sổ", "dang cho so", "Hợp đồng", "hop dong", "mua bán"],
+    "hourse_status": ["tình trạng", "tinh trang"],
+    "usage_condition": ["điều kiện", "dieu kien", "sử dụng", "su dung"],
+    "location_type": ["vị trí", "vi tri", "loại", "loai"],
+    "utilities": ["tiện ích", "tien ich", "tiện nghi", "tien nghi"],
+    "security": ["an ninh", "an ninh", "bảo vệ", "bao ve"],
+    "road_type": ["đường", "duong", "mặt tiền", "mat tien"],
+})
+# Giấy tờ pháp lý theo giá trị (ID 18=Sổ đỏ, 19=Sổ hồng, 20=Đang chờ sổ, 21=Hợp đồng mua bán),
+# nhóm đứng trước được ưu tiên
+_LEGAL_DOCS_VALUES = {
+    18: ("sổ đỏ", "so do", "đã có sổ", "da co so"),
+    19: ("sổ hồng", "so hong"),
+    20: ("đang chờ sổ", "dang cho so", "chờ sổ"),
+    21: ("hợp đồng", "hop dong", "mua bán"),
+}
+
+
+def _resolve_location_ids(location: Any, lat_long: Any) -> tuple[Any, Any, Any]:
+    """(province_id, district_id, ward_id) của location (lat_long đã chuẩn hoá hoặc None)."""
+    from .mapping import get_mapping, find_ward_key_loose
+    from .gazetteer import resolve_location
+    from .geo import fill_location
+
+    province_id = None
+    district_id = None
+    ward_id = None
+    
+    if location:
+        # Gazetteer: tỉnh, quận/huyện, phường/xã trong một lượt (khớp nguyên tên).
+        # Cấp nào chưa tìm được thì tra tiếp theo từng phần như dưới.
+        province_id, district_id, ward_id = resolve_location(location)
+
+        location_parts = [part.strip() for part in location.split(",") if part.strip()]
+        # Thường format: "Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
+        # Hoặc: "Đường, Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
+        
+        # Tìm từ cuối lên (tỉnh/thành phố thường ở cuối)
+        for part in reversed(location_parts):
+            part_clean = part.strip()
+            if not province_id:
+                province_id = get_mapping("province_id", part_clean)
+
+        if not district_id and len(location_parts) >=2:
+            district_id = find_ward_key_loose("district_mapping.json", name = location_parts[-2].replace("TP.","Thành phố").strip(), province_id=province_id)
+
+        if len(location_parts) >=3:
+            if not ward_id and district_id and province_id:
+                ward_id = find_ward_key_loose("ward_mapping.json",name = location_parts[-3].strip(), province_id=province_id, district_id=district_id)
+
+    # Địa chỉ chữ không đủ: bổ sung từ phường/xã gần map_coords nhất (geo.py)
+    if lat_long and (not province_id or not ward_id):
+        province_id, district_id, ward_id = fill_location(lat_long, province_id, district_id, ward_id)
+    return province_id, district_id, ward_id
+
+
+def _spec_pair_ids(key_lower: str, value_str: str) -> tuple[tuple[str, Any], ...]:
+    """
+    Các (nhóm, ID) mà một cặp tên/giá trị trong specs/config cho các trường infomation_* / land_info_*:
+    nhóm lấy theo tên trường (_SPEC_KEY_GROUPS), ID tra theo giá trị.
+    Transform lấy ID khác rỗng đầu tiên của mỗi nhóm theo thứ tự các cặp.
+    """
+    from .mapping import get_mapping
+
+    key_groups = _SPEC_KEY_GROUPS.labels_in(key_lower)
+    if not key_groups:
+        return ()
+    found = []
+
+    # Map giấy tờ pháp lý (ID 18=Sổ đỏ, 19=Sổ hồng, 20=Đang chờ sổ, 21=Hợp đồng mua bán)
+    if "legal_docs" in key_groups:
+        # Thử map từ mapping file trước
+        mapped_id = get_mapping("infomation_legal_docs_id ", value_str) or get_mapping("infomation_legal_docs_id", value_str)
+        if mapped_id:
+            found.append(("legal_docs", mapped_id))
+        else:
+            # Map trực tiếp từ giá trị
+            for doc_id, keywords in _LEGAL_DOCS_VALUES.items():
+                if any(kw in value_str for kw in keywords):
+                    found.append(("legal_docs", doc_id))
+                    break
+
+    # Map tình trạng nhà
+    if "hourse_status" in key_groups:
+        found.append(("hourse_status", get_mapping("infomation_hourse_status_id ", value_str) or get_mapping("infomation_hourse_status_id", value_str)))
+
+    # Map điều kiện sử dụng
+    if "usage_condition" in key_groups:
+        found.append(("usage_condition", get_mapping("infomation_usage_condition_id", value_str)))
+
+    # Map loại vị trí
+    if "location_type" in key_groups:
+        found.append(("location_type", get_mapping("infomation_location_type_id ", value_str) or get_mapping("infomation_location_type_id", value_str)))
+
+    # Map tiện ích
+    if "utilities" in key_groups:
+        found.append(("utilities", get_mapping("land_info_utilities_id", value_str)))
+
+    # Map an ninh
+    if "security" in key_groups:
+        found.append(("security", get_mapping("land_info_security_id", value_str)))
+
+    # Map loại đường
+    if "road_type" in key_groups:
+        found.append(("road_type", get_mapping("land_info_road_type_id", value_str)))
+
+    return tuple(found)
+
+
+def _memoised(memo: dict, fn: Any, *args: Any) -> Any:
+    try:
+        return memo[args]
+    except KeyError:
+        value = memo[args] = fn(*args)
+        return value
+    except TypeError:
+        # Giá trị không hash được (list, dict...): tính thẳng
+        return fn(*args)
+
+
+class _TransformLookups:
+    """
+    Kết quả tra cứu dùng chung cho các item của một lần transform: mỗi location (cùng lat_long),
+    cặp tên/giá trị spec, chuỗi giá, diện tích và số phòng/tầng khác nhau chỉ được xử lý một lần.
+    Các hàm được gọi đều chỉ phụ thuộc tham số (và mapping đã load) nên kết quả y như gọi từng lần.
+    """
+
+    def __init__(self):
+        self._locations: dict = {}
+        self._spec_pairs: dict = {}
+        self._prices: dict = {}
+        self._areas: dict = {}
+        self._ints: dict = {}
+
+    def location_ids(self, location: Any, lat_long: Any) -> tuple[Any, Any, Any]:
+        return _memoised(self._locations, _resolve_location_ids, location, lat_long)
+
+    def spec_pair_ids(self, key_lower: str, value_str: str) -> tuple[tuple[str, Any], ...]:
+        return _memoised(self._spec_pairs, _spec_pair_ids, key_lower, value_str)
+
+    # Giá/diện tích chỉ nhớ theo chuỗi: 1, 1.0 và True là cùng một key dict nhưng parse khác nhau
+    def price(self, text: Any) -> Price:
+        if not isinstance(text, str):
+            return parse_price(text)
+        return _memoised(self._prices, parse_price, text)
+
+    def area(self, text: Any) -> float | None:
+        if not isinstance(text, str):
+            return parse_area(text)
+        return _memoised(self._areas, parse_area, text)
+
+    def int_value(self, text: Any) -> int | None:
+        if not isinstance(text, str):
+            return parse_count(text)
+        return _memoised(self._ints, parse_count, text)
+
+
 def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     """
     Transform item từ format hiện tại sang format example.json.
@@ -227,6 +762,24 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     Nếu item đã ở format mới (có real_estate_code và không có pid ở root), 
     trả về item đó mà không transform lại.
     """
+    return _transform_item(item, _TransformLookups())
+
+
+def transform_batch(items: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    transform_to_example_format cho cả batch, kết quả giống hệt transform từng item.
+    Các location / cặp spec / chuỗi giá, diện tích trùng nhau giữa các item chỉ tra một lần,
+    map_coords của cả batch được reverse geocode một lần (geo.geocode_items).
+    """
+    from .geo import geocode_items
+
+    items = list(items)
+    geocode_items(items)
+    lookups = _TransformLookups()
+    return [_transform_item(item, lookups) for item in items]
+
+
+def _transform_item(item: dict[str, Any], lookups: _TransformLookups) -> dict[str, Any]:
     # Kiểm tra xem item đã ở format mới chưa
     # Format mới có: real_estate_type_id, real_estate_code, sale_type, etc.
     # Format cũ có: pid, href ở root level
@@ -234,7 +787,7 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
         # Item đã ở format mới, không cần transform lại
         return item
     
-    from .mapping import get_mapping, find_ward_key_loose
+    from .mapping import get_mapping
     
     specs = item.get("specs", {})
     config = item.get("config", {})
@@ -243,9 +796,13 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     location = item.get("location", "")
     
     # Extract các giá trị
-    area_number = _extract_area_number(item.get("area", ""))
-    price_number = _parse_number_from_text(item.get("price", ""))
-    bedroom, bathroom, floor = _extract_bedroom_bathroom_floor(specs, config)
+    area_number = lookups.area(item.get("area", ""))
+    price = lookups.price(item.get("price", ""))
+    price_number = price.value
+    if price.per_m2:
+        # Giá theo m² ("80 triệu/m²") quy ra tổng giá theo diện tích; không có diện tích thì bỏ
+        price_number = price_number * area_number if price_number and area_number else None
+    bedroom, bathroom, floor = _extract_bedroom_bathroom_floor(specs, config, lookups.int_value)
     
     # lat_long sẽ là map_coords (format "lat,lng")
     lat_long = item.get("map_coords", "")
@@ -265,16 +822,13 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
         lat_long = None
     
     # Xác định price_unit (1 = tổng, 2 = theo tháng)
-    price_unit = 1
-    price_text = str(item.get("price", "")).lower()
-    if "tháng" in price_text or "/tháng" in price_text:
-        price_unit = 2
+    price_unit = 2 if price.per_month else 1
     
     # Tạo other_info chứa các trường không map được
     other_info = {}
     
     # Copy các trường không được map trực tiếp (comment lại các trường tạm thời không dùng)
-    for key in ["pid", "href"]:
+    for key in ["pid", "href", "duplicate_of"]:
         if key in item and item[key]:
             other_info[key] = item[key]
     
@@ -296,12 +850,7 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     title_lower = str(title).lower() if title else ""
     
     # Tìm trong URL trước
-    for key in ["nha-mat-pho-mat-tien", "nha-ngo-hem", "nha-biet-thu", "nha-pho-lien-ke", "nha-vuon", 
-                "nha-thanh-ly", "nha-o-xa-hoi", "can-ho-chung-cu", "can-ho-duplex", "can-ho-penthouse", "can-ho-tap-the-cu-xa", 'dat-nen-dat-tho-cu',
-                "dat-nen-du-an", "dat-nong-nghiep", "dat-cong-nghiep", "dat-thuong-mai-dich-vu", "dat-thanh-ly",
-                "condotel", "homestay", "farmstay", "khach-san", "resort", "van-phong", "shophouse",
-                "kho-nha-xuong","phong-tro", "mat-bang-kinh-doanh"
-                ]:
+    for key in _REAL_ESTATE_TYPE_SLUGS:
         if key in href_lower:
             # Map từ slug
             real_estate_type_id = get_mapping("real_estate_type_id", key)
@@ -310,8 +859,7 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
     
     # Nếu không tìm thấy trong URL, tìm trong title
     if not real_estate_type_id:
-        for key in ["chung cư", "căn hộ", "nhà riêng", "biệt thự", "nhà mặt phố",
-                    "shophouse", "đất", "condotel", "kho", "nhà xưởng", "trang trại"]:
+        for key in _REAL_ESTATE_TYPE_TITLE_WORDS:
             if key in title_lower:
                 real_estate_type_id = get_mapping("real_estate_type_id", key)
                 if real_estate_type_id:
@@ -324,84 +872,26 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
         # Mặc định: 1 = bán, 2 = cho thuê
         demand_id = 1 if sale_type == "sell" else 2
     
-    # Parse location để lấy province_id, district_id, ward_id
-    province_id = None
-    district_id = None
-    ward_id = None
+    # Parse location để lấy province_id, district_id, ward_id (mỗi location khác nhau tra một lần)
+    province_id, district_id, ward_id = lookups.location_ids(location, lat_long)
     
-    if location:
-        location_parts = [part.strip() for part in location.split(",") if part.strip()]
-        # Thường format: "Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
-        # Hoặc: "Đường, Phường/Xã, Quận/Huyện, Tỉnh/Thành phố"
-        
-        # Tìm từ cuối lên (tỉnh/thành phố thường ở cuối)
-        for part in reversed(location_parts):
-            part_clean = part.strip()
-            if not province_id:
-                province_id = get_mapping("province_id", part_clean)
+    # Map các infomation_* từ specs và config: mỗi nhóm lấy ID khác rỗng đầu tiên (xem _spec_pair_ids)
+    spec_ids = dict.fromkeys(("legal_docs", "hourse_status", "usage_condition", "location_type",
+                              "utilities", "security", "road_type"))
 
-        if not district_id and len(location_parts) >=2:
-            district_id = find_ward_key_loose("district_mapping.json", name = location_parts[-2].replace("TP.","Thành phố").strip(), province_id=province_id)
-
-        if len(location_parts) >=3:
-            if not ward_id and district_id and province_id:
-                ward_id = find_ward_key_loose("ward_mapping.json",name = location_parts[-3].strip(), province_id=province_id, district_id=district_id)
-    
-    # Map các infomation_* từ specs và config
-    infomation_legal_docs_id = None
-    infomation_hourse_status_id = None
-    infomation_usage_condition_id = None
-    infomation_location_type_id = None
-    land_info_utilities_id = None
-    land_info_security_id = None
-    land_info_road_type_id = None
-    
     # Tìm trong specs và config
     all_specs = {**specs, **config}
     for key, value in all_specs.items():
-        key_lower = str(key).lower()
-        value_str = str(value).lower()
-        
-        # Map giấy tờ pháp lý (ID 18=Sổ đỏ, 19=Sổ hồng, 20=Đang chờ sổ, 21=Hợp đồng mua bán)
-        if not infomation_legal_docs_id and any(kw in key_lower for kw in ["giấy tờ", "pháp lý", "sổ đỏ", "sổ hồng", "phap ly", "giay to", "Đã có sổ", "da co so", "đang chờ sổ", "dang cho so", "Hợp đồng", "hop dong", "mua bán"]):
-            # Thử map từ mapping file trước
-            mapped_id = get_mapping("infomation_legal_docs_id ", value_str) or get_mapping("infomation_legal_docs_id", value_str)
-            if mapped_id:
-                infomation_legal_docs_id = mapped_id
-            else:
-                # Map trực tiếp từ giá trị
-                if "sổ đỏ" in value_str or "so do" in value_str or "đã có sổ" in value_str or "da co so" in value_str:
-                    infomation_legal_docs_id = 18
-                elif "sổ hồng" in value_str or "so hong" in value_str:
-                    infomation_legal_docs_id = 19
-                elif "đang chờ sổ" in value_str or "dang cho so" in value_str or "chờ sổ" in value_str:
-                    infomation_legal_docs_id = 20
-                elif "hợp đồng" in value_str or "hop dong" in value_str or "mua bán" in value_str:
-                    infomation_legal_docs_id = 21
-        
-        # Map tình trạng nhà
-        if not infomation_hourse_status_id and any(kw in key_lower for kw in ["tình trạng", "tinh trang"]):
-            infomation_hourse_status_id = get_mapping("infomation_hourse_status_id ", value_str) or get_mapping("infomation_hourse_status_id", value_str)
-        
-        # Map điều kiện sử dụng
-        if not infomation_usage_condition_id and any(kw in key_lower for kw in ["điều kiện", "dieu kien", "sử dụng", "su dung"]):
-            infomation_usage_condition_id = get_mapping("infomation_usage_condition_id", value_str)
-        
-        # Map loại vị trí
-        if not infomation_location_type_id and any(kw in key_lower for kw in ["vị trí", "vi tri", "loại", "loai"]):
-            infomation_location_type_id = get_mapping("infomation_location_type_id ", value_str) or get_mapping("infomation_location_type_id", value_str)
-        
-        # Map tiện ích
-        if not land_info_utilities_id and any(kw in key_lower for kw in ["tiện ích", "tien ich", "tiện nghi", "tien nghi"]):
-            land_info_utilities_id = get_mapping("land_info_utilities_id", value_str)
-        
-        # Map an ninh
-        if not land_info_security_id and any(kw in key_lower for kw in ["an ninh", "an ninh", "bảo vệ", "bao ve"]):
-            land_info_security_id = get_mapping("land_info_security_id", value_str)
-        
-        # Map loại đường
-        if not land_info_road_type_id and any(kw in key_lower for kw in ["đường", "duong", "mặt tiền", "mat tien"]):
-            land_info_road_type_id = get_mapping("land_info_road_type_id", value_str)
+        for group, value_id in lookups.spec_pair_ids(str(key).lower(), str(value).lower()):
+            if not spec_ids[group]:
+                spec_ids[group] = value_id
+    infomation_legal_docs_id = spec_ids["legal_docs"]
+    infomation_hourse_status_id = spec_ids["hourse_status"]
+    infomation_usage_condition_id = spec_ids["usage_condition"]
+    infomation_location_type_id = spec_ids["location_type"]
+    land_info_utilities_id = spec_ids["utilities"]
+    land_info_security_id = spec_ids["security"]
+    land_info_road_type_id = spec_ids["road_type"]
     
     # Tạo output theo format example.json
     output = {
@@ -420,7 +910,7 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
         "area": area_number,
         "area_unit": "m2" if area_number else None,
         "price": int(price_number) if price_number else 0,
-        "price_unit": price_unit if price_unit and price_number > 0 else 3,
+        "price_unit": price_unit if price_unit and price_number and price_number > 0 else 3,
         "bedroom": bedroom,
         "bathroom": bathroom,
         "floor": floor,
@@ -471,47 +961,271 @@ def transform_to_example_format(item: dict[str, Any]) -> dict[str, Any]:
         cleaned_output.pop("other_info")
     return cleaned_output
 
+# Cache kết quả transform theo key item: (object raw, digest raw, record đã transform)
+_transform_cache: dict[str, tuple[dict[str, Any], str, dict[str, Any]]] = {}
+transform_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _item_digest(item: dict[str, Any]) -> str:
+    """Hash nội dung item raw để biết item có thay đổi so với lần transform trước hay không."""
+    raw = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _cache_lookup(key: str, item: dict[str, Any]) -> tuple[str, dict[str, Any] | None]:
+    """(digest, record đã transform trong cache); record là None nếu item mới hoặc đã thay đổi."""
+    cached = _transform_cache.get(key)
+
+    # Cùng một object trong all_results (runner không sửa item sau khi append) -> khỏi hash lại
+    if cached and cached[0] is item:
+        transform_cache_stats["hits"] += 1
+        return cached[1], cached[2]
+
+    digest = _item_digest(item)
+    if cached and cached[1] == digest:
+        transform_cache_stats["hits"] += 1
+        _transform_cache[key] = (item, digest, cached[2])
+        return digest, cached[2]
+    return digest, None
+
+
+def _transform_with_digest(item: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    key = _item_key(item)
+    digest, transformed = _cache_lookup(key, item)
+    if transformed is None:
+        transform_cache_stats["misses"] += 1
+        transformed = transform_to_example_format(item)
+        _transform_cache[key] = (item, digest, transformed)
+    return digest, transformed
+
+
+def _transform_many_with_digest(items: list[dict[str, Any]]) -> list[tuple[str, dict[str, Any]]]:
+    """Như _transform_with_digest cho cả list; các item không có trong cache được transform_batch chung."""
+    results = []
+    missing = []
+    for item in items:
+        key = _item_key(item)
+        digest, transformed = _cache_lookup(key, item)
+        if transformed is None:
+            missing.append((len(results), key, item))
+        results.append((digest, transformed))
+
+    if missing:
+        transform_cache_stats["misses"] += len(missing)
+        records = transform_batch([item for _, _, item in missing])
+        for (index, key, item), transformed in zip(missing, records):
+            digest = results[index][0]
+            _transform_cache[key] = (item, digest, transformed)
+            results[index] = (digest, transformed)
+    return results
+
+
+def transform_cached(item: dict[str, Any]) -> dict[str, Any]:
+    """transform_to_example_format có cache: chỉ transform item mới hoặc đã thay đổi."""
+    return _transform_with_digest(item)[1]
+
+
+def transform_cached_many(items: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """transform_cached cho cả list: item mới/đã thay đổi được transform chung một batch (transform_batch)."""
+    return [transformed for _, transformed in _transform_many_with_digest(list(items))]
+
+
+# Digest của các item đã có trong journal (theo từng file journal), để chỉ append item mới/đổi
+_journal_digests: dict[str, dict[str, str]] = {}
+
+
+def _get_journal_digests(results_file: str | Path) -> dict[str, str]:
+    journal_file = _journal_path(results_file)
+    cache_key = str(journal_file)
+    if cache_key not in _journal_digests:
+        digests = {}
+        for file_path in _today_sources(results_file):
+            try:
+                for item in iter_results(file_path):
+                    digests[_item_key(item)] = _item_digest(item)
+            except Exception:
+                continue
+        _journal_digests[cache_key] = digests
+    return _journal_digests[cache_key]
+
+
+def append_journal(
+    results: list[dict[str, Any]],
+    results_file: str,
+) -> list[dict[str, Any]]:
+    """
+    Append các item mới hoặc đã thay đổi vào journal (.jsonl) của ngày, mỗi dòng một record đã transform.
+    Trả về danh sách (item raw, record đã transform) vừa được ghi.
+    """
+    known = _get_journal_digests(results_file)
+
+    written = []
+    lines = []
+    for item, (digest, transformed) in zip(results, _transform_many_with_digest(results)):
+        key = _item_key(item)
+        if known.get(key) == digest:
+            continue
+        known[key] = digest
+        written.append((item, transformed))
+        lines.append(json.dumps(transformed, ensure_ascii=False))
+
+    if lines:
+        journal_file = _journal_path(results_file)
+        # Dòng cuối bị ghi dở (crash) thì xuống dòng trước, để record mới không dính vào dòng hỏng
+        prefix = ""
+        if journal_file.exists() and journal_file.stat().st_size > 0:
+            with open(journal_file, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    prefix = "\n"
+        with open(journal_file, "a", encoding="utf-8") as f:
+            f.write(prefix + "\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    return written
+
+
+def compact_journal(results_file: str) -> int:
+    """
+    Gộp journal (.jsonl) vào file {"data": [...]} của ngày rồi xoá journal.
+    Gọi ở cuối mỗi lần chạy hoặc khi cần file hoàn chỉnh. Trả về số item trong file.
+    """
+    journal_file = _journal_path(results_file)
+    if not journal_file.exists():
+        return 0
+
+    merged: dict[str, dict[str, Any]] = {}
+    for file_path in _today_sources(results_file):
+        if file_path == journal_file:
+            continue
+        try:
+            for item in iter_results(file_path):
+                merged[_item_key(item)] = item
+        except Exception:
+            pass
+    for item in iter_results(journal_file):
+        merged[_item_key(item)] = item
+
+    _atomic_write_json(results_file, {"data": list(merged.values())})
+    _remove_other_variant(results_file)
+
+    journal_file.unlink()
+    print(f"Compacted {len(merged)} items into {results_file}")
+    return len(merged)
+
+
+def compact_past_journals(output_dir: str | Path, today: datetime) -> int:
+    """
+    Gộp các journal (.jsonl) còn sót của những ngày trước `today` (lần chạy bị crash, không tới được
+    compact_journal ở cuối) vào file kết quả của ngày đó. Gọi lúc khởi động và trước khi seal tháng,
+    để archive không chứa journal thô. Trả về số journal đã gộp.
+    """
+    output_dir = Path(output_dir)
+    if not output_dir.is_dir():
+        return 0
+
+    today_name = today.strftime("%Y-%m-%d")
+    suffix = ".json.gz" if config.COMPRESS_OUTPUT else ".json"
+    compacted = 0
+    for journal_file in sorted(output_dir.glob("*/*.jsonl")):
+        if journal_file.name == MANIFEST_FILENAME:
+            continue
+        # Tên journal: YYYY-MM-DD.jsonl hoặc YYYY-MM-DD_<filter>.jsonl
+        stem = journal_file.name[:-len(".jsonl")]
+        try:
+            datetime.strptime(stem[:10], "%Y-%m-%d")
+        except ValueError:
+            continue
+        if stem[:10] >= today_name:
+            continue
+        try:
+            compact_journal(str(journal_file.with_name(stem + suffix)))
+            compacted += 1
+        except Exception as e:
+            print(f"[Journal] Không gộp được {journal_file}: {e}")
+    return compacted
+
+
+def _checkpoint_path(results_file: str | Path) -> Path:
+    base = _results_base(results_file)
+    return base.with_name(base.name + ".checkpoint.json")
+
+
+def load_checkpoint(results_file: str) -> dict[str, Any] | None:
+    """
+    Đọc checkpoint của lần chạy trước (nếu bị dừng giữa chừng):
+    {"base_url", "list_url", "page_idx", "pending": [item meta chưa lấy detail]}.
+    """
+    checkpoint_file = _checkpoint_path(results_file)
+    if not checkpoint_file.exists():
+        return None
+    try:
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(checkpoint, dict) or not checkpoint.get("base_url") or not checkpoint.get("list_url"):
+        return None
+    return checkpoint
+
+
+def save_checkpoint(
+    results_file: str,
+    base_url: str,
+    list_url: str,
+    page_idx: int,
+    pending: list[dict[str, Any]] | None = None,
+) -> None:
+    """Ghi checkpoint (atomic) để run_scraper có thể chạy tiếp từ trang list đang dở."""
+    _atomic_write_json(_checkpoint_path(results_file), {
+        "base_url": base_url,
+        "list_url": list_url,
+        "page_idx": page_idx,
+        "pending": convert_paths(pending or []),
+        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def clear_checkpoint(results_file: str) -> None:
+    try:
+        _checkpoint_path(results_file).unlink()
+    except FileNotFoundError:
+        pass
+
+
 def save_results(
     results: list[dict[str, Any]],
     results_file: str,
-    scraped_hrefs: set[str],
+    scraped_hrefs: set[str] | None,
 ) -> None:
+    """Ghi kết quả ra file ngày; scraped_hrefs = None khi bên gọi tự cập nhật seen index (WriteBehindSink)."""
+    if config.SAVE_MODE == "journal":
+        written = append_journal(results, results_file)
+        update_manifest([record for _, record in written], results_file)
+        update_price_history([record for _, record in written])
+        if scraped_hrefs is not None:
+            _update_sets_from_items([item for item, _ in written], scraped_hrefs)
+        print(f"Appended {len(written)} new items to {_journal_path(results_file)}")
+        return
+
     unique: dict[str, dict[str, Any]] = {}
     for item in results:
-        # Hỗ trợ cả format cũ và format mới để tạo key unique
-        key = None
-        
-        # Format cũ: pid hoặc href ở root level
-        if "pid" in item:
-            key = item.get("pid")
-        elif "href" in item:
-            key = item.get("href")
-        
-        # Format mới: real_estate_code hoặc href trong other_info
-        if not key:
-            key = item.get("real_estate_code")
-        if not key:
-            other_info = item.get("other_info", {})
-            if isinstance(other_info, dict):
-                key = other_info.get("href") or other_info.get("pid")
-        
-        if not key:
-            # fallback to object id to avoid overwriting
-            key = f"tmp-{id(item)}"
-        
-        unique[str(key)] = item
+        unique[_item_key(item)] = item
 
     final = list(unique.values())
     
-    # Transform sang format example.json
-    transformed_data = [transform_to_example_format(item) for item in final]
+    # Transform sang format example.json (item không đổi lấy từ cache)
+    transformed_data = transform_cached_many(final)
                
     # Wrap trong object với key "data"
     output = {"data": transformed_data}
     
-    with open(results_file, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
-
-    _update_sets_from_items(final, scraped_hrefs)
-    print(f"Saved {len(final)} items to {results_file}")
+    _atomic_write_json(results_file, output)
+    _remove_other_variant(results_file)
+    update_manifest(transformed_data, results_file)
+    update_price_history(transformed_data)
 
+    if scraped_hrefs is not None:
+        _update_sets_from_items(final, scraped_hrefs)
+    print(f"Saved {len(final)} items to {results_file}")
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Các test chạy lại trên từng package site (src/<package>/craw_du_lieu), package nằm trong src/."""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+
+import pytest
+
+PACKAGES = ("bds", "chotot", "mogi", "nhadat_cafeland", "sosanhnha", "thongkenhadat", "vndiaoc")
+
+
+@pytest.fixture(params=PACKAGES)
+def package(request, tmp_path, monkeypatch) -> str:
+    # Không để test ghi vào output/ thật của package
+    config = importlib.import_module(f"{request.param}.config")
+    monkeypatch.setattr(config, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(config, "OUTPUT_DIR_FILTER", tmp_path / "output_filtered")
+    return request.param
+
+
+def site_module(package: str, name: str):
+    """Module craw_du_lieu.<name> của package."""
+    return importlib.import_module(f"{package}.craw_du_lieu.{name}")
+
+
+def packages_with(name: str) -> list[str]:
+    """Các package có module ("gazetteer") hoặc hàm ("mapping.find_ward_key_loose") này."""
+    module_name, _, attr = name.partition(".")
+    found = []
+    for package in PACKAGES:
+        if importlib.util.find_spec(f"{package}.craw_du_lieu.{module_name}") is None:
+            continue
+        if attr and not hasattr(site_module(package, module_name), attr):
+            continue
+        found.append(package)
+    return found
+
+
+# (id, tên, slug, district_id, province_id) của map.xlsx dùng trong test
+PROVINCES = [(1, "Thành phố Hà Nội", "ha-noi"), (2, "Thành phố Hồ Chí Minh", "ho-chi-minh")]
+DISTRICTS = [
+    (1, "Quận Cầu Giấy", "cau-giay", 1),
+    (2, "Quận Ba Đình", "ba-dinh", 1),
+    (3, "Quận 1", "quan-1", 2),
+    (4, "Quận 10", "quan-10", 2),
+]
+WARDS = [
+    (1, "Phường Dịch Vọng", "dich-vong", 1, 1),
+    (2, "Phường Quan Hoa", "quan-hoa", 1, 1),
+    (3, "Phường Kim Mã", "kim-ma", 2, 1),
+    (4, "Phường Bến Nghé", "ben-nghe", 3, 2),
+    (5, "Phường 10", "phuong-10", 4, 2),
+    (6, "Phường 1", "phuong-1", 4, 2),
+]
+
+# Nội dung output/district_mapping.json, output/ward_mapping.json tương ứng
+DISTRICT_MAPPING = {str(key): {"name": name, "province_id": province_id} for key, name, _, province_id in DISTRICTS}
+WARD_MAPPING = {
+    str(key): {"name": name, "province_id": province_id, "district_id": float(district_id)}
+    for key, name, _, district_id, province_id in WARDS
+}
+
+
+def write_map_workbook(path, wards=WARDS):
+    """map.xlsx nhỏ theo format của output/map.xlsx (dòng tiêu đề, rồi header ID/Value/Slug...)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    sheet = workbook.create_sheet("province_id")
+    sheet.append(["Danh sách tỉnh"])
+    sheet.append(["ID", "Value", "Slug"])
+    for row in PROVINCES:
+        sheet.append(list(row))
+    sheet = workbook.create_sheet("district_id")
+    sheet.append(["ID", "Value", "Slug", "Province_ID"])
+    for row in DISTRICTS:
+        sheet.append(list(row))
+    sheet = workbook.create_sheet("ward_id")
+    sheet.append(["ID", "Value", "Slug", "District_ID", "Province_ID"])
+    for row in wards:
+        sheet.append(list(row))
+    workbook.save(path)
+    return path
+
+
+@pytest.fixture
+def mapping(package, tmp_path, monkeypatch):
+    """Module mapping của package, đọc map.xlsx dựng trong tmp_path."""
+    mapping = site_module(package, "mapping")
+    xlsx_path = write_map_workbook(tmp_path / "map.xlsx")
+    monkeypatch.setattr(mapping, "_xlsx_path", lambda: xlsx_path)
+    monkeypatch.setattr(mapping, "_mappings_cache", {})
+    yield mapping
+    # Không để kết quả tra trên map.xlsx của test nằm lại trong LRU
+    mapping.clear_mapping_caches()
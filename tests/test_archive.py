@@ -0,0 +1,78 @@
+"""File kết quả nén .json.gz (COMPRESS_OUTPUT) và archive tháng YYYY-MM.zip (seal_past_months)."""
+from __future__ import annotations
+
+import gzip
+import json
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from conftest import site_module
+
+TODAY = datetime(2025, 10, 18)
+
+
+@pytest.fixture
+def storage(package):
+    # conftest đã trỏ config.OUTPUT_DIR vào tmp_path
+    return site_module(package, "storage")
+
+
+def _day(href: str) -> dict:
+    return {"data": [{"other_info": {"href": href}}]}
+
+
+def test_compressed_day_reads_plain_file_and_compacts_to_gz(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage.config, "COMPRESS_OUTPUT", True)
+    monkeypatch.setattr(storage.config, "SAVE_MODE", "journal")
+    _, month_dir, results_file = storage.config.prepare_output_paths(TODAY)
+    assert results_file.name == "2025-10-18.json.gz"
+    assert storage._journal_path(results_file).name == "2025-10-18.jsonl"
+    assert storage._checkpoint_path(results_file).name == "2025-10-18.checkpoint.json"
+
+    # File .json thường ghi trước khi bật nén vẫn được đọc
+    plain = month_dir / "2025-10-18.json"
+    plain.write_text(json.dumps({"data": [{"title": "a", "price": "1 tỷ", "other_info": {"href": "https://x/1"}}]}))
+    seen: set = set()
+    items = storage.load_today_results(results_file, seen)
+    assert len(items) == 1 and "https://x/1" in seen
+
+    storage.save_results(items + [{"href": "https://x/2", "title": "b", "price": "5 tỷ"}], results_file, seen)
+    assert storage.compact_journal(results_file) == 2
+    assert not plain.exists()
+    with gzip.open(results_file, "rt", encoding="utf-8") as f:
+        assert len(json.load(f)["data"]) == 2
+
+
+def test_seal_past_months(storage, tmp_path):
+    for month, day in (("2025-08", "2025-08-03"), ("2025-09", "2025-09-01")):
+        (tmp_path / month).mkdir()
+        storage._atomic_write_json(tmp_path / month / f"{day}.json", _day(f"https://x/{day}"))
+    storage._atomic_write_json(tmp_path / "2025-09" / "2025-09-02.json.gz", _day("https://x/gz"))
+    (tmp_path / "2025-09" / "2025-09-03.jsonl").write_text(json.dumps({"href": "https://x/jl"}) + "\n")
+    (tmp_path / "2025-10").mkdir()
+
+    before = storage.load_previous_hrefs(str(tmp_path), TODAY)
+    sealed = storage.seal_past_months(tmp_path, TODAY)
+    assert [path.name for path in sealed] == ["2025-08.zip", "2025-09.zip"]
+    assert not (tmp_path / "2025-09").exists()
+    assert (tmp_path / "2025-10").is_dir()
+    # Loader đọc thẳng từ archive
+    assert storage.load_previous_hrefs(str(tmp_path), TODAY) == before
+    assert len(before) == 4
+    assert len(storage.load_previous_results(str(tmp_path), TODAY)[1]) == 4
+
+
+def test_reseal_merges_recreated_month(storage, tmp_path):
+    (tmp_path / "2025-09").mkdir()
+    storage._atomic_write_json(tmp_path / "2025-09" / "2025-09-01.json", _day("https://x/1"))
+    storage.seal_past_months(tmp_path, TODAY)
+
+    (tmp_path / "2025-09").mkdir()
+    storage._atomic_write_json(tmp_path / "2025-09" / "2025-09-30.json", _day("https://x/late"))
+    storage.seal_past_months(tmp_path, TODAY)
+
+    with zipfile.ZipFile(tmp_path / "2025-09.zip") as archive:
+        assert {"2025-09-01.json", "2025-09-30.json"} <= set(archive.namelist())
+    assert storage.load_previous_hrefs(str(tmp_path), TODAY) == {"https://x/1", "https://x/late"}
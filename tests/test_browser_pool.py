@@ -0,0 +1,89 @@
+"""BrowserPool / DetailWorkers với driver giả (không mở Chrome)."""
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from conftest import site_module
+
+
+class FakeDriver:
+    def __init__(self, address: str):
+        self.address = address
+        self.quit_called = False
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+@pytest.fixture
+def browser_pool(package, monkeypatch):
+    browser_pool = site_module(package, "browser_pool")
+    monkeypatch.setattr(browser_pool, "human_sleep", lambda a, b: None)
+    monkeypatch.setattr(browser_pool, "init_driver", lambda address, page_load, wait: (FakeDriver(address), "wait"))
+    return browser_pool
+
+
+@pytest.fixture
+def opened(browser_pool, monkeypatch):
+    """href -> các (address, thread) đã mở item; item có href kết thúc bằng 7 lỗi."""
+    opened: dict = {}
+    lock = threading.Lock()
+
+    def open_detail(driver, wait, item, **kwargs):
+        with lock:
+            opened.setdefault(item["href"], set()).add((driver.address, threading.current_thread().name))
+        if item["href"].endswith("7"):
+            raise RuntimeError("trang lỗi")
+        return dict(item, title="t")
+
+    monkeypatch.setattr(browser_pool, "open_detail_and_extract", open_detail)
+    return opened
+
+
+def test_pool_roles(browser_pool):
+    pool = browser_pool.BrowserPool(["a", "b", "c"])
+    assert pool.listing[0].address == "a"
+    assert [address for address, _, _ in pool.detail] == ["b", "c"]
+    drivers = [driver for _, driver, _ in pool.drivers]
+    pool.close()
+    assert all(driver.quit_called for driver in drivers)
+
+    single = browser_pool.BrowserPool(["a"])
+    assert [address for address, _, _ in single.detail] == ["a"]
+    with pytest.raises(ValueError):
+        browser_pool.BrowserPool([])
+
+
+def test_workers_spread_items_and_report_errors(browser_pool, opened):
+    pool = browser_pool.BrowserPool(["a", "b", "c", "d"])
+    workers = browser_pool.DetailWorkers(pool.detail, threaded=True)
+    items = [{"href": f"h{i}"} for i in range(40)]
+    results = list(workers.run(items, "list"))
+    workers.close()
+    pool.close()
+
+    assert sorted(item["href"] for item, _, _ in results) == sorted(item["href"] for item in items)
+    assert sum(1 for _, _, error in results if error is not None) == 4
+    assert {address for seen in opened.values() for address, _ in seen} <= {"b", "c", "d"}
+    assert sum(stats["items"] + stats["errors"] for stats in workers.stats) == 40
+
+
+def test_abandoned_run_does_not_leak_results(browser_pool, opened):
+    pool = browser_pool.BrowserPool(["a", "b", "c"])
+    workers = browser_pool.DetailWorkers(pool.detail, threaded=True)
+    run = workers.run([{"href": f"x{i}"} for i in range(30)], "list")
+    next(run)
+    run.close()
+    results = list(workers.run([{"href": f"y{i}"} for i in range(5)], "list"))
+    workers.close()
+    pool.close()
+    assert sorted(item["href"] for item, _, _ in results) == [f"y{i}" for i in range(5)]
+
+
+def test_single_browser_is_sequential(browser_pool, opened):
+    workers = browser_pool.DetailWorkers([("a", FakeDriver("a"), "wait")], threaded=False)
+    assert len(list(workers.run([{"href": f"h{i}"} for i in range(3)], "list"))) == 3
+    assert workers.stats[0]["items"] == 3
+    assert {thread for seen in opened.values() for _, thread in seen} == {threading.current_thread().name}
@@ -0,0 +1,58 @@
+"""Ghi atomic (file tạm + os.replace), journal sau crash và checkpoint trang list."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from conftest import site_module
+
+
+@pytest.fixture
+def storage(package):
+    return site_module(package, "storage")
+
+
+def test_atomic_write_keeps_old_file_on_error(storage, tmp_path):
+    target = tmp_path / "2025-10-01.json"
+    storage._atomic_write_json(target, {"data": [{"href": "a"}]})
+    with pytest.raises(TypeError):
+        storage._atomic_write_json(target, {"data": [object()]})
+    assert json.loads(target.read_text(encoding="utf-8")) == {"data": [{"href": "a"}]}
+    assert [p.name for p in tmp_path.iterdir()] == [target.name]
+
+
+def test_append_after_torn_journal_line(storage, tmp_path):
+    results_file = tmp_path / "2025-10-01.json"
+    storage.append_journal([{"href": "https://example.vn/a-20000001", "price": "1 tỷ"}], str(results_file))
+    # Crash giữa lúc ghi: dòng cuối không hoàn chỉnh, không có "\n"
+    with open(tmp_path / "2025-10-01.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"other_info": {"hre')
+    storage.append_journal([{"href": "https://example.vn/b-20000002", "price": "2 tỷ"}], str(results_file))
+
+    assert len(storage.load_today_results(str(results_file), set())) == 2
+    assert storage.compact_journal(str(results_file)) == 2
+
+
+def test_checkpoint_roundtrip(storage, tmp_path):
+    results_file = str(tmp_path / "2025-10-01.json")
+    assert storage.load_checkpoint(results_file) is None
+    storage.save_checkpoint(results_file, "https://example.vn/ban", "https://example.vn/ban?page=2", 2,
+                            [{"href": "https://example.vn/c-20000003", "image": Path("/tmp/a.jpg")}])
+
+    checkpoint = storage.load_checkpoint(results_file)
+    assert checkpoint["base_url"] == "https://example.vn/ban"
+    assert checkpoint["list_url"] == "https://example.vn/ban?page=2"
+    assert checkpoint["page_idx"] == 2
+    assert checkpoint["pending"] == [{"href": "https://example.vn/c-20000003", "image": "/tmp/a.jpg"}]
+
+    storage.clear_checkpoint(results_file)
+    storage.clear_checkpoint(results_file)
+    assert storage.load_checkpoint(results_file) is None
+
+
+def test_broken_checkpoint_is_ignored(storage, tmp_path):
+    results_file = tmp_path / "2025-10-01.json"
+    (tmp_path / "2025-10-01.checkpoint.json").write_text('{"base_url": "https://exa', encoding="utf-8")
+    assert storage.load_checkpoint(str(results_file)) is None
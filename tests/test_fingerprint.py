@@ -0,0 +1,67 @@
+"""Fingerprint nội dung (SimHash + attr key) và FingerprintIndex dùng chung giữa các site."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import site_module
+
+DESCRIPTION = (
+    "Bán nhà mặt tiền đường Nguyễn Trãi, Quận 5, sổ hồng chính chủ, hẻm xe hơi 6m, gần chợ, trường học, "
+    "khu dân cư an ninh. Nhà 1 trệt 3 lầu, 4 phòng ngủ, 5 WC, giá thương lượng."
+)
+ORIGINAL = {
+    "href": "https://bds.example/1", "title": "Bán nhà Q5", "description": DESCRIPTION,
+    "agent_phone": "+84 912 345 678", "area": "60 m²", "price": "5,2 tỷ",
+}
+# Cùng tin đăng lại trên site khác: dấu câu, số điện thoại, đơn vị viết khác
+REPOST = {
+    "href": "https://mogi.example/9", "title": "Bán nhà Q5", "description": DESCRIPTION + " Liên hệ ngay",
+    "agent_phone": "0912.345.678", "area": "60m2", "price": "5.2 tỷ",
+}
+OTHER = {
+    "href": "https://chotot.example/3", "title": "Cho thuê căn hộ",
+    "description": "Căn hộ 2 phòng ngủ view sông, nội thất đầy đủ, gần trung tâm thương mại, bảo vệ 24/7, giá rẻ",
+    "agent_phone": "0987654321", "area": "70 m²", "price": "12 triệu/tháng",
+}
+
+
+@pytest.fixture
+def fingerprint(package):
+    return site_module(package, "fingerprint")
+
+
+def test_fingerprint_item(fingerprint):
+    value, attr = fingerprint.fingerprint_item(ORIGINAL)
+    repost_value, repost_attr = fingerprint.fingerprint_item(REPOST)
+    assert attr == repost_attr == "0912345678|60|5.2e+09"
+    # Giá/diện tích qua parser chung với storage: viết khác nhau vẫn cùng attr key
+    assert fingerprint.attr_key(dict(REPOST, price="5 tỷ 200 triệu", area="5 x 12m")) == attr
+    assert fingerprint.attr_key(dict(REPOST, price=5.2e9, area=60)) == attr
+    other_value, _ = fingerprint.fingerprint_item(OTHER)
+    assert fingerprint.hamming(value, repost_value) < fingerprint.hamming(value, other_value)
+    assert fingerprint.simhash("quá ngắn") is None
+    assert fingerprint.normalize_phone("0912 xxx xxx") is None
+
+
+def test_index_finds_duplicate_across_sites(fingerprint, tmp_path):
+    db_path = tmp_path / "fingerprints.sqlite"
+    bds = fingerprint.FingerprintIndex(db_path, "bds")
+    mogi = fingerprint.FingerprintIndex(db_path, "mogi")
+    assert bds.lookup(ORIGINAL) is None
+    assert bds.add_items([ORIGINAL, {"href": "https://x/empty"}]) == 1
+    # Crawl lại cùng href trên cùng site không phải trùng
+    assert bds.lookup(ORIGINAL) is None
+
+    duplicate = mogi.lookup(REPOST)
+    assert duplicate["site"] == "bds" and duplicate["href"] == ORIGINAL["href"]
+    # lookup không ghi gì vào index
+    assert len(bds) == 1
+    mogi.add_items([REPOST, OTHER])
+    assert mogi.lookup(OTHER) is None
+
+    # Mô tả quá ngắn: chỉ so được attr key
+    short = dict(REPOST, href="https://x/5", title="Nhà", description="")
+    assert mogi.lookup(short)["distance"] == 64
+    assert len(bds) == 3
+    bds.close()
+    mogi.close()
@@ -0,0 +1,58 @@
+"""Levenshtein bit-parallel và BK-tree cho khớp gần đúng tên địa danh."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from conftest import packages_with, site_module
+
+pytestmark = pytest.mark.parametrize("package", packages_with("fuzzy"), indirect=True)
+
+
+@pytest.fixture
+def fuzzy(package):
+    return site_module(package, "fuzzy")
+
+
+def _levenshtein(a: str, b: str) -> int:
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, char_b in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (char_a != char_b))
+    return row[-1]
+
+
+def test_levenshtein(fuzzy):
+    rng = random.Random(0)
+    for alphabet in ("ab ", "abcdehilmnopqrstuy 0123"):
+        for _ in range(500):
+            a = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 14)))
+            b = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 14)))
+            assert fuzzy.levenshtein(a, b) == _levenshtein(a, b)
+
+
+def test_search_matches_brute_force(fuzzy):
+    rng = random.Random(1)
+    names = ["".join(rng.choice("abcde ") for _ in range(rng.randint(1, 10))) for _ in range(150)]
+    tree = fuzzy.BKTree((name, idx) for idx, name in enumerate(names))
+    assert len(tree) == len(set(names))
+    for _ in range(100):
+        query = "".join(rng.choice("abcde ") for _ in range(rng.randint(1, 10)))
+        limit = rng.randint(0, 3)
+        found = sorted((distance, name) for distance, _, name, _ in tree.search(query, limit))
+        expected = sorted((_levenshtein(query, name), name) for name in set(names) if _levenshtein(query, name) <= limit)
+        assert found == expected
+
+
+def test_best(fuzzy):
+    tree = fuzzy.BKTree([
+        ("phuong 10", 10), ("phuong 11", 11), ("an binh", 1), ("an binh", 2), ("tan binh", 3), ("an linh", 4),
+    ])
+    assert tree.best("phuong 10") == (10, 1.0)
+    # Số trong tên phải giống hệt
+    assert tree.best("phuong 1") is None
+    assert tree.best("an bihn", 2)[0] == 1
+    # "tan binh" và "an binh" cùng cách 1: không chắc
+    assert tree.best("xan binh", 1) is None
@@ -0,0 +1,52 @@
+"""Gazetteer: tỉnh -> quận/huyện -> phường/xã của location trong một lượt."""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from conftest import DISTRICT_MAPPING, WARD_MAPPING, packages_with, site_module
+
+pytestmark = pytest.mark.parametrize("package", packages_with("gazetteer"), indirect=True)
+
+
+@pytest.fixture
+def gazetteer(package, mapping, tmp_path, monkeypatch):
+    gazetteer = site_module(package, "gazetteer")
+    (tmp_path / "district_mapping.json").write_text(json.dumps(DISTRICT_MAPPING), encoding="utf-8")
+    (tmp_path / "ward_mapping.json").write_text(json.dumps(WARD_MAPPING), encoding="utf-8")
+    monkeypatch.setattr(gazetteer, "_json_mapping_path", lambda json_file: tmp_path / json_file)
+    monkeypatch.setattr(gazetteer, "_gazetteer", None)
+    return gazetteer
+
+
+@pytest.mark.parametrize(
+    "location, expected",
+    [
+        ("Số 5 Trần Thái Tông, P. Dịch Vọng, Q. Cầu Giấy, TP. Hà Nội", (1, 1, 1)),
+        ("Phường 01, Quận 10, TP.HCM", (2, 4, 6)),
+        ("P10, Q10, Hồ Chí Minh", (2, 4, 5)),
+        # Gõ không dấu: "Đình" -> "dinh"
+        ("Kim Ma, Ba Dinh, Ha Noi", (1, 2, 3)),
+        # Không có quận: tìm phường trong cả tỉnh
+        ("Bến Nghé, Hồ Chí Minh", (2, None, 4)),
+        # "Phường 1" không khớp "Quận 1", phường của tỉnh khác không được nhận
+        ("Phường 1, Hà Nội", (1, None, None)),
+        # Gõ sai một ký tự: khớp gần đúng trong phạm vi tỉnh/quận
+        ("P. Dịch Vọngg, Q. Cầu Giấyy, Hà Nội", (1, 1, 1)),
+        ("Phường 11, Quận 10, Hồ Chí Minh", (2, 4, None)),
+        # Quận chỉ khớp gần đúng: phường được tìm trong cả tỉnh, không chỉ trong quận đó
+        ("Kim Mã, Q. Cầu Giấyy, Hà Nội", (1, 1, 3)),
+        ("abc", (None, None, None)),
+        ("", (None, None, None)),
+    ],
+)
+def test_resolve_location(gazetteer, location, expected):
+    assert gazetteer.resolve_location(location) == expected
+
+
+def test_gazetteer_is_rebuilt_after_reload(gazetteer, mapping):
+    first = gazetteer.get_gazetteer()
+    assert gazetteer.get_gazetteer() is first
+    mapping.clear_mapping_caches()
+    assert gazetteer.get_gazetteer() is not first
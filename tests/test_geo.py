@@ -0,0 +1,81 @@
+"""Reverse geocode map_coords bằng lưới tâm phường/xã (geo.py)."""
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from conftest import site_module
+
+
+@pytest.fixture
+def geo(package, tmp_path, monkeypatch):
+    geo = site_module(package, "geo")
+    monkeypatch.setattr(geo, "_json_mapping_path", lambda json_file: tmp_path / json_file)
+    monkeypatch.setattr(geo, "_grid", None)
+    monkeypatch.setattr(geo, "_memo", {})
+    return geo
+
+
+def _centroids(rng: random.Random) -> dict:
+    centroids = {}
+    for province_id in range(1, 6):
+        lat, lng = rng.uniform(9, 22), rng.uniform(103, 109)
+        for i in range(200):
+            centroids[str(province_id * 1000 + i)] = {
+                "lat": lat + rng.uniform(-0.3, 0.3),
+                "lng": lng + rng.uniform(-0.3, 0.3),
+                "province_id": province_id,
+                "district_id": float(province_id * 10 + i % 7),
+            }
+    return centroids
+
+
+def test_grid_matches_brute_force(geo):
+    rng = random.Random(0)
+    centroids = _centroids(rng)
+    grid = geo.WardGrid(centroids, max_km=3.0)
+    assert grid.size == len(centroids)
+
+    def brute(lat, lng):
+        best = min(centroids.items(), key=lambda kv: geo._distance_km(lat, lng, kv[1]["lat"], kv[1]["lng"]))
+        return geo._distance_km(lat, lng, best[1]["lat"], best[1]["lng"])
+
+    points = []
+    for _ in range(300):
+        centroid = centroids[rng.choice(list(centroids))]
+        points.append((round(centroid["lat"] + rng.uniform(-0.03, 0.03), 5), round(centroid["lng"] + rng.uniform(-0.03, 0.03), 5)))
+    points += [(round(rng.uniform(8, 23), 5), round(rng.uniform(102, 110), 5)) for _ in range(50)]
+
+    batch = grid.nearest_many(points)
+    for point in points:
+        found = grid.nearest(*point)
+        assert batch[point] == found
+        distance = brute(*point)
+        if found is None:
+            assert distance > grid.max_km - 1e-6
+        else:
+            # Có thể khác ID khi hai tâm cách đều, nhưng khoảng cách phải là nhỏ nhất
+            centroid = centroids[str(found[2])]
+            assert geo._distance_km(*point, centroid["lat"], centroid["lng"]) == pytest.approx(distance, abs=1e-6)
+
+
+def test_parse_coords(geo):
+    assert geo.parse_coords("10.5, 106.1") == (10.5, 106.1)
+    for value in ("abc,def", "0,0", "1,2,3", "91,10", None, ""):
+        assert geo.parse_coords(value) is None
+
+
+def test_fill_location(geo, tmp_path):
+    centroids = {"77": {"lat": 10.77, "lng": 106.70, "province_id": 2, "district_id": 4}}
+    (tmp_path / geo.config.WARD_CENTROIDS_FILENAME).write_text(json.dumps(centroids), encoding="utf-8")
+    coords = "10.771,106.701"
+    assert geo.geocode_items([{"map_coords": coords}, {"map_coords": coords}, {}]) == 1
+    assert geo.fill_location(coords, None, None, None) == (2, 4, 77)
+    assert geo.fill_location(coords, 2, None, None) == (2, 4, 77)
+    # Mâu thuẫn với tỉnh / quận đã tìm được từ địa chỉ chữ: giữ nguyên
+    assert geo.fill_location(coords, 1, None, None) == (1, None, None)
+    assert geo.fill_location(coords, 2, 3, None) == (2, 3, None)
+    # Quá xa mọi tâm
+    assert geo.fill_location("10.9,106.7", None, None, None) == (None, None, None)
@@ -0,0 +1,102 @@
+"""Journal .jsonl của ngày: append item mới / đổi, gộp vào file kết quả (compact_journal),
+kể cả journal còn sót của ngày trước."""
+from __future__ import annotations
+
+import json
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from conftest import site_module
+
+
+@pytest.fixture
+def storage(package, monkeypatch):
+    storage = site_module(package, "storage")
+    monkeypatch.setattr(storage.config, "COMPRESS_OUTPUT", False)
+    return storage
+
+
+def _write_jsonl(path, records, tail: str = "") -> None:
+    path.write_text("".join(json.dumps(record) + "\n" for record in records) + tail, encoding="utf-8")
+
+
+def _hrefs(path) -> dict:
+    data = json.loads(path.read_text(encoding="utf-8"))["data"]
+    return {item["href"]: item for item in data}
+
+
+def test_compact_merges_journal_over_results(storage, tmp_path):
+    results_file = tmp_path / "2025-10-01.json"
+    results_file.write_text(json.dumps({"data": [{"href": "a", "v": 1}, {"href": "b", "v": 1}]}), encoding="utf-8")
+    # Dòng cuối bị ghi dở (crash) được bỏ qua
+    _write_jsonl(tmp_path / "2025-10-01.jsonl", [{"href": "b", "v": 2}, {"href": "c", "v": 2}], tail='{"href": "d"')
+
+    assert storage.compact_journal(str(results_file)) == 3
+    items = _hrefs(results_file)
+    assert {href: item["v"] for href, item in items.items()} == {"a": 1, "b": 2, "c": 2}
+    assert not (tmp_path / "2025-10-01.jsonl").exists()
+    assert storage.compact_journal(str(results_file)) == 0
+
+
+def test_append_then_compact(storage, tmp_path):
+    results_file = tmp_path / "2025-10-01.json"
+    item = {"href": "https://example.vn/ban-nha-rieng-pr20000001", "title": "Bán nhà", "price": "5 tỷ"}
+    assert len(storage.append_journal([item], str(results_file))) == 1
+    # Item không đổi thì không ghi lại
+    assert storage.append_journal([dict(item)], str(results_file)) == []
+
+    assert storage.compact_journal(str(results_file)) == 1
+    (record,) = json.loads(results_file.read_text(encoding="utf-8"))["data"]
+    assert record["price"] == 5e9
+
+
+def test_save_results_in_journal_mode(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage.config, "SAVE_MODE", "journal")
+    results_file = tmp_path / "2025-10-01.json"
+    items = [{"href": f"https://example.vn/ban-nha-pr2000000{i}", "title": str(i), "price": "1 tỷ"} for i in range(3)]
+    seen: set = set()
+    storage.save_results(items[:2], str(results_file), seen)
+    storage.save_results(items, str(results_file), seen)
+
+    journal = tmp_path / "2025-10-01.jsonl"
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 3
+    assert not results_file.exists()
+    assert {item["href"] for item in items} <= seen
+    assert len(storage.load_today_results(str(results_file), set())) == 3
+
+
+def test_compact_past_journals(storage, tmp_path):
+    past = tmp_path / "2025-09"
+    current = tmp_path / "2025-10"
+    past.mkdir()
+    current.mkdir()
+    _write_jsonl(past / "2025-09-30.jsonl", [{"href": "a"}])
+    _write_jsonl(past / "2025-09-29_location_ha-noi.jsonl", [{"href": "b"}])
+    _write_jsonl(current / "2025-10-01.jsonl", [{"href": "c"}])
+    _write_jsonl(current / "2025-10-02.jsonl", [{"href": "d"}])
+    (past / storage.MANIFEST_FILENAME).write_text("", encoding="utf-8")
+
+    assert storage.compact_past_journals(tmp_path, datetime(2025, 10, 2)) == 3
+    assert set(_hrefs(past / "2025-09-30.json")) == {"a"}
+    assert set(_hrefs(past / "2025-09-29_location_ha-noi.json")) == {"b"}
+    assert set(_hrefs(current / "2025-10-01.json")) == {"c"}
+    # Journal của hôm nay vẫn đang được ghi
+    assert (current / "2025-10-02.jsonl").exists()
+    assert (past / storage.MANIFEST_FILENAME).exists()
+
+
+def test_seal_compacts_journal_before_archiving(storage, tmp_path):
+    past = tmp_path / "2025-09"
+    past.mkdir()
+    (past / "2025-09-29.json").write_text(json.dumps({"data": [{"href": "a"}]}), encoding="utf-8")
+    _write_jsonl(past / "2025-09-30.jsonl", [{"href": "b"}])
+
+    (archive,) = storage.seal_past_months(tmp_path, datetime(2025, 10, 2))
+    with zipfile.ZipFile(archive) as zf:
+        names = set(zf.namelist())
+        assert {"2025-09-29.json", "2025-09-30.json"} <= names
+        assert not any(name.endswith(".jsonl") and name != storage.MANIFEST_FILENAME for name in names)
+        assert [item["href"] for item in json.loads(zf.read("2025-09-30.json"))["data"]] == ["b"]
+    assert not past.exists()
@@ -0,0 +1,67 @@
+"""Key số nguyên của tin (listing ID hoặc hash href) và CompactKeySet."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from conftest import site_module
+
+# URL chi tiết mẫu của các site có listing ID trong URL (config.LISTING_ID_PATTERN)
+LISTING_URLS = {
+    "bds": ("https://bds.com.vn/ban-dat-nen-quan-9-123456", 123456),
+    "chotot": ("https://www.nhatot.com/mua-ban-nha-dat-quan-7/123456789.htm", 123456789),
+    "mogi": ("https://mogi.vn/quan-7/mua-nha-hem-ngo/ban-nha-id22345678", 22345678),
+    "nhadat_cafeland": ("https://nhadat.cafeland.vn/ban-nha-quan-3-1234567.html", 1234567),
+}
+
+
+def test_extract_listing_id(package):
+    listing_ids = site_module(package, "listing_ids")
+    if package not in LISTING_URLS:
+        assert listing_ids.extract_listing_id("https://example.vn/ban-nha-123456") is None
+        return
+    href, listing_id = LISTING_URLS[package]
+    assert listing_ids.extract_listing_id(href) == listing_id
+    assert listing_ids.listing_key(href) == listing_id
+
+
+def test_listing_key_falls_back_to_href_hash(package):
+    listing_ids = site_module(package, "listing_ids")
+    href = "https://example.vn/ban-nha-rieng-duong-le-loi"
+    key = listing_ids.listing_key(href)
+    assert key < 0
+    assert listing_ids.listing_key(href + "/") == listing_ids.listing_key(href + "#anh") == key
+    assert listing_ids.listing_key(href + "-2") != key
+
+
+@pytest.mark.parametrize("n", [10, 5_000, 30_000])
+def test_compact_key_set_matches_set(package, n):
+    listing_ids = site_module(package, "listing_ids")
+    rng = random.Random(n)
+    keys = [rng.randrange(-(2 ** 63), 2 ** 63) for _ in range(n)]
+    keys += keys[: n // 3]  # trùng lặp
+
+    key_set = listing_ids.CompactKeySet(keys[: n // 4])
+    for key in keys[n // 4 : n // 2]:
+        key_set.add_key(key)
+    key_set.update(f"https://example.vn/tin-{i}" for i in range(n // 2))
+    key_set.update([])
+    expected = set(keys[: n // 2]) | {listing_ids.listing_key(f"https://example.vn/tin-{i}") for i in range(n // 2)}
+
+    assert len(key_set) == len(expected)
+    assert all(key_set.contains_key(key) for key in expected)
+    assert not any(key_set.contains_key(key) for key in keys[n // 2 :] if key not in expected)
+    assert list(key_set.keys()) == sorted(expected)
+    assert "https://example.vn/tin-0" in key_set and "https://example.vn/khac" not in key_set
+
+
+def test_compact_key_set_merges_small_batch_into_large_array(package):
+    listing_ids = site_module(package, "listing_ids")
+    key_set = listing_ids.CompactKeySet(range(0, 200_000, 2))
+    # Đủ để buffer được merge (bisect + slice): một nửa key mới, một nửa đã có
+    added = list(range(-3, 10_000, 1))
+    assert sum(key_set.add_key(key) for key in added) == 5_003
+    expected = set(range(0, 200_000, 2)) | set(added)
+    assert len(key_set) == len(expected)
+    assert list(key_set.keys()) == sorted(expected)
@@ -0,0 +1,93 @@
+"""Manifest tháng _manifest.jsonl: một dòng {key, href, hash, date} cho mỗi record lưu."""
+from __future__ import annotations
+
+import json
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from conftest import site_module
+
+TODAY = datetime(2025, 10, 18)
+
+
+@pytest.fixture
+def storage(package):
+    # conftest đã trỏ config.OUTPUT_DIR vào tmp_path
+    return site_module(package, "storage")
+
+
+def _history(storage, tmp_path):
+    """Lịch sử có sẵn trước khi có manifest: 3 ngày tháng 9 + 1 ngày tháng 10."""
+    (tmp_path / "2025-09").mkdir()
+    for day in range(1, 4):
+        items = [{"title": str(i), "other_info": {"href": f"https://x/9-{day}-{i}"}} for i in range(3)]
+        storage._atomic_write_json(tmp_path / "2025-09" / f"2025-09-0{day}.json", {"data": items})
+    _, month_dir, results_file = storage.config.prepare_output_paths(TODAY)
+    storage._atomic_write_json(month_dir / "2025-10-01.json", {"data": [{"other_info": {"href": "https://x/10-1"}}]})
+    return month_dir, results_file
+
+
+def test_manifest_is_backfilled_from_day_files(storage, tmp_path):
+    _history(storage, tmp_path)
+    full_hrefs, _ = storage.load_previous_results(str(tmp_path), TODAY)
+    hrefs = storage.load_previous_hrefs(str(tmp_path), TODAY)
+    assert hrefs == full_hrefs and len(hrefs) == 10
+    assert (tmp_path / "2025-09" / "_manifest.jsonl").exists()
+
+    manifest_hrefs, entries = storage.load_previous_results(str(tmp_path), TODAY, full_records=False)
+    assert manifest_hrefs == hrefs
+    assert all(set(entry) == {"key", "href", "hash", "date"} for entry in entries)
+    # Lọc theo ngày vẫn áp dụng trên manifest
+    assert len(storage.load_previous_hrefs(str(tmp_path), datetime(2025, 9, 2))) == 6
+
+
+@pytest.mark.parametrize("mode", ["journal", "rewrite"])
+def test_save_results_appends_only_new_or_changed(storage, tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(storage.config, "SAVE_MODE", mode)
+    month_dir, results_file = _history(storage, tmp_path)
+    manifest = month_dir / "_manifest.jsonl"
+    items = [{"href": f"https://x/new-{i}", "title": "t", "price": "1 tỷ"} for i in range(5)]
+    seen: set = set()
+    storage.save_results(items, results_file, seen)
+    storage.save_results(items, results_file, seen)
+    assert len(manifest.read_text(encoding="utf-8").splitlines()) == 6
+
+    items[0] = dict(items[0], price="2 tỷ")
+    storage.save_results(items, results_file, seen)
+    assert len(manifest.read_text(encoding="utf-8").splitlines()) == 7
+    assert len(storage.load_manifest(str(tmp_path), TODAY)) == 15
+    assert len(storage.load_previous_hrefs(str(tmp_path), TODAY)) == 15
+
+
+def test_seal_keeps_manifest_and_filtered_output_is_excluded(storage, tmp_path, monkeypatch):
+    _history(storage, tmp_path)
+    hrefs = storage.load_previous_hrefs(str(tmp_path), TODAY)
+    storage.seal_past_months(tmp_path, TODAY)
+    with zipfile.ZipFile(tmp_path / "2025-09.zip") as archive:
+        assert "_manifest.jsonl" in archive.namelist()
+    assert storage.load_previous_hrefs(str(tmp_path), TODAY) == hrefs
+
+    monkeypatch.setattr(storage.config, "SAVE_MODE", "rewrite")
+    _, filter_dir, filter_file = storage.config.prepare_output_paths(TODAY, {"loc": "hn"})
+    storage.save_results([{"href": "https://x/f", "price": "1 tỷ"}], filter_file, set())
+    assert not (filter_dir / "_manifest.jsonl").exists()
+    assert storage.load_previous_hrefs(str(tmp_path), TODAY) == hrefs
+
+
+def test_hrefs_of_archive_without_manifest_are_scanned(storage, tmp_path, monkeypatch):
+    # Archive tháng cũ, seal trước khi có manifest
+    with zipfile.ZipFile(tmp_path / "2025-08.zip", "w") as zf:
+        for day in (1, 2):
+            items = [{"title": str(i), "other_info": {"href": f"https://x/8-{day}-{i}"}} for i in range(3)]
+            zf.writestr(f"2025-08-0{day}.json", json.dumps({"data": items}))
+
+    entries = list(storage.iter_manifest_entries(str(tmp_path), TODAY))
+    assert len(entries) == 6 and all("hash" in entry for entry in entries)
+
+    # Chỉ cần href: không decode record, không hash
+    monkeypatch.setattr(storage, "_item_digest", None)
+    hrefs = storage.load_previous_hrefs(str(tmp_path), TODAY)
+    assert hrefs == {entry["href"] for entry in entries}
+    assert storage.load_previous_hrefs(str(tmp_path), datetime(2025, 8, 1)) == {f"https://x/8-1-{i}" for i in range(3)}
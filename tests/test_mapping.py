@@ -0,0 +1,56 @@
+"""Mapping từ map.xlsx: file compiled map.compiled.json đọc lại thay vì parse xlsx."""
+from __future__ import annotations
+
+import json
+import os
+
+from conftest import WARDS, write_map_workbook
+
+
+def _reload(mapping, monkeypatch):
+    """Load lại như một process mới; trả về số lần parse xlsx."""
+    calls = []
+    parse = mapping._parse_workbook
+    monkeypatch.setattr(mapping, "_parse_workbook", lambda path: calls.append(path) or parse(path))
+    mapping._mappings_cache.clear()
+    return mapping._load_mappings(), calls
+
+
+def test_get_mapping(mapping):
+    assert mapping.get_mapping("province_id", "Hà Nội") == 1
+    assert mapping.get_mapping("district_id", "quan-10") == 4
+    assert mapping.get_mapping("district_id", "") is None
+
+
+def test_compiled_sidecar_is_reused(mapping, monkeypatch):
+    xlsx_path = mapping._xlsx_path()
+    first = dict(mapping._load_mappings())
+    compiled_path = xlsx_path.with_name("map.compiled.json")
+    assert compiled_path.exists()
+
+    loaded, calls = _reload(mapping, monkeypatch)
+    assert loaded == first and calls == []
+    # Chỉ đổi mtime (copy, checkout lại): sha256 vẫn khớp
+    stat = xlsx_path.stat()
+    os.utime(xlsx_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    loaded, calls = _reload(mapping, monkeypatch)
+    assert loaded == first and calls == []
+
+    write_map_workbook(xlsx_path, wards=WARDS + [(7, "Phường Ngọc Khánh", "ngoc-khanh", 2, 1)])
+    loaded, calls = _reload(mapping, monkeypatch)
+    assert len(calls) == 1 and loaded != first
+    loaded, calls = _reload(mapping, monkeypatch)
+    assert calls == []
+
+
+def test_stale_or_broken_sidecar_is_rebuilt(mapping, monkeypatch):
+    mapping._load_mappings()
+    compiled_path = mapping._xlsx_path().with_name("map.compiled.json")
+    compiled = json.loads(compiled_path.read_text(encoding="utf-8"))
+    compiled["version"] = -1
+    compiled_path.write_text(json.dumps(compiled), encoding="utf-8")
+    assert len(_reload(mapping, monkeypatch)[1]) == 1
+
+    compiled_path.write_text("{broken", encoding="utf-8")
+    loaded, calls = _reload(mapping, monkeypatch)
+    assert len(calls) == 1 and loaded["province_id"]
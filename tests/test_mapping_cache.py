@@ -0,0 +1,34 @@
+"""LRU của get_mapping: tra lại cùng giá trị không chạy lại các bước match."""
+from __future__ import annotations
+
+from conftest import write_map_workbook
+
+
+def test_repeated_lookups_hit_cache(mapping):
+    mapping.clear_mapping_caches()
+    assert mapping.get_mapping("ward_id", "dịch vọng") == 1
+    before = mapping.mapping_cache_stats()["get_mapping"]
+    assert mapping.get_mapping("ward_id", "dịch vọng") == 1
+    after = mapping.mapping_cache_stats()["get_mapping"]
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+
+def test_reload_clears_cached_results(mapping):
+    assert mapping.get_mapping("ward_id", "dịch vọng") == 1
+    assert mapping.mapping_cache_stats()["get_mapping"]["size"] > 0
+    mapping.clear_mapping_caches()
+    assert mapping.mapping_cache_stats()["get_mapping"]["size"] == 0
+    assert mapping.get_mapping("ward_id", "dịch vọng") == 1
+
+
+def test_nothing_cached_while_mappings_are_missing(mapping):
+    xlsx_path = mapping._xlsx_path()
+    xlsx_path.unlink()
+    mapping.clear_mapping_caches()
+    assert mapping.get_mapping("ward_id", "dịch vọng") is None
+    assert mapping.mapping_cache_stats()["get_mapping"]["size"] == 0
+
+    # map.xlsx xuất hiện lại: lần tra sau load được, không trả None đã nhớ
+    write_map_workbook(xlsx_path)
+    assert mapping.get_mapping("ward_id", "dịch vọng") == 1
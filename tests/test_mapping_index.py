@@ -0,0 +1,25 @@
+"""_SheetIndex của get_mapping: ứng viên từ index phải bao mọi key mà phép quét toàn sheet khớp."""
+from __future__ import annotations
+
+QUERIES = [
+    "dich vong", "phuong 1", "phường 1", "quan 10 ho chi minh", "kim", "ha", "zz", "",
+    "so 12 duong kim ma, ba dinh", "ben-nghe quan 1", "thanh pho ha noi cau giay",
+]
+
+
+def test_candidates_cover_full_scan(mapping):
+    for sheet_name, sheet_mapping in mapping._load_mappings().items():
+        index = mapping._sheet_index(sheet_name, sheet_mapping)
+        keys = [key for key, _ in index.items]
+        for value in QUERIES:
+            contains = {pos for pos, key in enumerate(keys) if value in key or key in value}
+            assert contains <= set(index.contains_candidates(value)), (sheet_name, value)
+            if hasattr(index, "partial_candidates"):
+                partial = {pos for pos, key in enumerate(keys) if mapping.partial_match(value, key)}
+                assert partial <= set(index.partial_candidates(value)), (sheet_name, value)
+
+
+def test_fallback_lookup(mapping):
+    assert mapping.get_mapping("ward_id", "dịch vọng") == 1
+    assert mapping.get_mapping("district_id", "cầu giấy") == 1
+    assert mapping.get_mapping("ward_id", "không có") is None
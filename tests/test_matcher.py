@@ -0,0 +1,37 @@
+"""KeywordMatcher (Aho-Corasick) cho kết quả như vòng `kw in text`."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from conftest import site_module
+
+
+@pytest.fixture
+def matcher(package):
+    return site_module(package, "matcher")
+
+
+def test_search_matches_substring_scan(matcher):
+    rng = random.Random(3)
+    alphabet = "abcđ ạ-"
+    for _ in range(300):
+        size = rng.choice([1, 3, 10, 31, 32, 40, 100])
+        # Có cả từ khoá rỗng, trùng nhau và chồng lên nhau
+        patterns = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 4))) for _ in range(size)]
+        keyword_matcher = matcher.KeywordMatcher(patterns)
+        for _ in range(5):
+            text = "".join(rng.choice(alphabet + "xyz") for _ in range(rng.randint(0, 30)))
+            expected = [idx for idx, pattern in enumerate(patterns) if pattern in text]
+            assert keyword_matcher.search(text) == expected
+            assert keyword_matcher.matches(text) == [patterns[idx] for idx in expected]
+
+
+def test_groups(matcher):
+    keyword_matcher = matcher.KeywordMatcher.from_groups({"a": ["x", "yz"], "b": ["z"]})
+    assert keyword_matcher.labels_in("xyz") == {"a", "b"}
+    assert keyword_matcher.labels_in("q") == set()
+    assert len(keyword_matcher) == 3
+    with pytest.raises(ValueError):
+        matcher.KeywordMatcher(["a"], [1, 2])
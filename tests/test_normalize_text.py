@@ -0,0 +1,48 @@
+"""normalize_text: bảng translate cho kết quả như cách NFD + bỏ ký tự không ASCII cũ, trừ đ/Đ -> d."""
+from __future__ import annotations
+
+import random
+import unicodedata
+
+import pytest
+
+from conftest import site_module
+
+ALPHABET = (
+    "aăâbcdeêghiklmnoôơpqrstuưvxyáàảãạắằẳẵặấầẩẫậéèẻẽẹếềểễệíìỉĩịóòỏõọốồổỗộớờởỡợúùủũụứừửữựýỳỷỹỵ"
+    " ,.-/²AÁÀẢÃẠÊẾỀỂỄỆÔỐỒỔỖỘƠỚỜỞỠỢƯỨỪỬỮỰ́̃日"
+)
+
+
+def _normalize_text_nfd(text) -> str:
+    """Cách chuẩn hoá trước đây."""
+    text = unicodedata.normalize("NFD", str(text))
+    return text.encode("ascii", "ignore").decode("utf-8").lower().strip()
+
+
+@pytest.fixture
+def normalize_text(package):
+    return site_module(package, "utils").normalize_text
+
+
+def test_same_as_nfd_except_d(normalize_text):
+    changed = {
+        chr(code) for code in range(0x10000)
+        if not 0xD800 <= code < 0xE000 and normalize_text(chr(code)) != _normalize_text_nfd(chr(code))
+    }
+    assert changed <= set("đĐÐ")
+
+
+def test_random_strings(normalize_text):
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30)))
+        assert normalize_text(text) == _normalize_text_nfd(text)
+        decomposed = unicodedata.normalize("NFD", text)
+        assert normalize_text(decomposed) == _normalize_text_nfd(decomposed)
+
+
+def test_d_and_non_strings(normalize_text):
+    assert normalize_text("Đống Đa") == "dong da"
+    assert normalize_text("  Quận   Cầu Giấy ") == "quan   cau giay"
+    assert normalize_text(12) == "12"
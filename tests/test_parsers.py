@@ -0,0 +1,48 @@
+"""parsers.py trên corpus chữ hiển thị giá / diện tích / số phòng của các site (src/parser_corpus.json)."""
+from __future__ import annotations
+
+import json
+import math
+
+import pytest
+
+from bench import PARSER_CORPUS
+from conftest import site_module
+
+with open(PARSER_CORPUS, "r", encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+
+def _same_number(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(a, b, rel_tol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "case",
+    [pytest.param(case, id=f"{i}-{case['site']}-{case['field']}") for i, case in enumerate(CORPUS)],
+)
+def test_corpus(package, case):
+    parsers = site_module(package, "parsers")
+    text = case["text"]
+    if case["field"] == "price":
+        price = parsers.parse_price(text)
+        assert _same_number(price.value, case["value"]), text
+        assert (price.per_m2, price.per_month, price.negotiable) == (
+            case["per_m2"], case["per_month"], case["negotiable"]), text
+    elif case["field"] == "area":
+        assert _same_number(parsers.parse_area(text), case["value"]), text
+    else:
+        assert parsers.parse_count(text) == case["value"], text
+
+
+def test_cached_and_uncached_agree(package):
+    parsers = site_module(package, "parsers")
+    for case in CORPUS:
+        if not case["text"]:
+            continue
+        if case["field"] == "price":
+            assert parsers.parse_price(case["text"]) == parsers._parse_price(case["text"])
+        elif case["field"] == "area":
+            assert _same_number(parsers.parse_area(case["text"]), parsers._parse_area(case["text"]))
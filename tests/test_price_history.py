@@ -0,0 +1,102 @@
+"""Lịch sử giá: log nhị phân append-only price_history.bin, ghi khi save_results."""
+from __future__ import annotations
+
+import struct
+from datetime import datetime
+
+import pytest
+
+from conftest import site_module
+
+
+@pytest.fixture
+def price_history(package):
+    return site_module(package, "price_history")
+
+
+def test_record_and_query(price_history, tmp_path):
+    history = price_history.PriceHistory(tmp_path / "history.bin")
+    assert history.record_many([(1, 5e9, 1, 1), (2, 3e9, 1, 2)], ts=1000) == 2
+    # Giá không đổi thì không ghi
+    assert history.record_many([(1, 5e9, 1, 1), (2, 2.8e9, 1, 2)], ts=2000) == 1
+    assert history.record_many([(1, 4e9, 1, 1)], ts=90000) == 1
+    assert history.history(1) == [(1000, 5e9, 1), (90000, 4e9, 1)]
+    assert [change["key"] for change in history.price_changes(1, now=90001)] == [1]
+    (change,) = history.price_changes(2, province_id=2, now=90001)
+    assert change["old_price"] == 3e9 and change["new_price"] == 2.8e9
+
+    # Bản ghi ghi dở ở cuối file bị bỏ qua khi nạp lại
+    with open(tmp_path / "history.bin", "ab") as f:
+        f.write(b"xx")
+    reloaded = price_history.PriceHistory(tmp_path / "history.bin")
+    assert len(reloaded) == 4
+    assert reloaded.history(2) == history.history(2)
+
+
+def test_back_dated_records(price_history, tmp_path, monkeypatch):
+    history = price_history.PriceHistory(tmp_path / "history.bin")
+    history.record_many([(1, 5e9, 1, 1)], ts=5000)
+    with pytest.raises(ValueError):
+        history.record_many([(1, 4e9, 1, 1)], ts=4000)
+    assert len(history) == 1
+    # Đồng hồ máy bị chỉnh lùi: lấy thời điểm của bản ghi cuối
+    monkeypatch.setattr(price_history.time, "time", lambda: 3000.0)
+    history.record_many([(1, 4e9, 1, 1)])
+    assert history.history(1) == [(5000, 5e9, 1), (5000, 4e9, 1)]
+
+    # Log ghi trước khi có kiểm tra này có thể lùi thời gian: price_changes quét cả log
+    record = struct.Struct("<qIdBI")
+    path = tmp_path / "old.bin"
+    path.write_bytes(
+        price_history._MAGIC + record.pack(2, 9000, 3e9, 1, 1) + record.pack(2, 9500, 2.5e9, 1, 1)
+        + record.pack(3, 1000, 2e9, 1, 1) + record.pack(3, 1100, 1.8e9, 1, 1)
+    )
+    old = price_history.PriceHistory(path)
+    # bisect trên mảng thời gian không sort sẽ bỏ sót thay đổi lúc 9500
+    assert [change["key"] for change in old.price_changes(1, now=5000 + 86400)] == [2]
+    assert [change["key"] for change in old.price_changes(1, now=1050 + 86400)] == [2, 3]
+
+
+@pytest.mark.parametrize("mode", ["journal", "rewrite"])
+def test_save_results_records_price_changes(package, tmp_path, monkeypatch, mode):
+    storage = site_module(package, "storage")
+    listing_key = site_module(package, "listing_ids").listing_key
+    monkeypatch.setattr(storage.config, "SAVE_MODE", mode)
+    monkeypatch.setattr(storage, "_price_history", None)
+    results_file = str(tmp_path / "2025-10-18.json")
+    href = "https://x/a-1"
+    seen: set = set()
+    storage.save_results([{"href": href, "title": "a", "price": "5 tỷ"}, {"href": "https://x/b-2", "price": "0"}], results_file, seen)
+    storage.save_results([{"href": href, "title": "a", "price": "4 tỷ"}], results_file, seen)
+    storage.save_results([{"href": href, "title": "a", "price": "4 tỷ"}], results_file, seen)
+
+    history = site_module(package, "price_history").PriceHistory(tmp_path / "price_history.bin")
+    assert [price for _, price, _ in history.history(listing_key(href))] == [5e9, 4e9]
+    assert len(history) == 2
+    assert len(history.price_changes(1, now=int(datetime.now().timestamp()) + 1)) == 1
+
+
+def test_large_province_id_and_header(price_history, tmp_path):
+    history = price_history.PriceHistory(tmp_path / "history.bin")
+    assert history.record_many([(1, 5e9, 1, 70000), (2, 3e9, 1, 2 ** 40)], ts=1000) == 2
+    assert history.record_many([(1, 4e9, 1, 70000)], ts=2000) == 1
+    data = (tmp_path / "history.bin").read_bytes()
+    assert data.startswith(price_history._MAGIC)
+    assert len(data) == len(price_history._MAGIC) + 3 * 25
+
+    reloaded = price_history.PriceHistory(tmp_path / "history.bin")
+    assert [change["key"] for change in reloaded.price_changes(1, province_id=70000, now=2001)] == [1]
+    # ID ngoài khoảng uint32 được lưu là 0 (không rõ tỉnh)
+    assert list(reloaded.provinces) == [70000, 0, 70000]
+
+
+def test_legacy_log_is_migrated(price_history, tmp_path):
+    legacy = struct.Struct("<qIdBH")
+    path = tmp_path / "history.bin"
+    path.write_bytes(legacy.pack(1, 1000, 5e9, 1, 1) + legacy.pack(1, 2000, 4e9, 1, 1) + b"x")
+
+    history = price_history.PriceHistory(path)
+    assert history.history(1) == [(1000, 5e9, 1), (2000, 4e9, 1)]
+    assert path.read_bytes().startswith(price_history._MAGIC)
+    assert path.stat().st_size == len(price_history._MAGIC) + 2 * 25
+    assert price_history.PriceHistory(path).history(1) == history.history(1)
@@ -0,0 +1,50 @@
+"""iter_results / iter_result_hrefs đọc file kết quả theo chunk, kết quả như json.load."""
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from conftest import site_module
+
+
+def _item(i: int, rng: random.Random) -> dict:
+    return {
+        "title": 'Nhà "đẹp" \\ ' + "x" * rng.randint(0, 50),
+        "price": rng.random() * 1e6, "big": 12345678901234, "small": -1.5e-3, "flag": True, "none": None,
+        "other_info": {"href": f'https://example.vn/{i}?a="b"&c=đ', "pid": i},
+        "images": [str(j) for j in range(rng.randint(0, 3))],
+    }
+
+
+def _write(path, items: list, form: str, indent) -> None:
+    if form == "list":
+        text = json.dumps(items, ensure_ascii=False, indent=indent)
+    elif form == "data":
+        text = json.dumps({"data": items}, ensure_ascii=False, indent=indent)
+    elif form == "data_with_meta":
+        text = json.dumps({"meta": {"a": [1, 2, {"href": "meta"}]}, "count": len(items), "data": items, "after": 5},
+                          ensure_ascii=False, indent=indent)
+    else:
+        text = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.mark.parametrize("form", ["list", "data", "data_with_meta", "jsonl"])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_stream_matches_json_load(package, tmp_path, monkeypatch, form, indent):
+    result_stream = site_module(package, "result_stream")
+    # Chunk nhỏ để token, chuỗi và escape bị cắt ngang giữa hai lần đọc
+    monkeypatch.setattr(result_stream, "_CHUNK_SIZE", 7)
+    rng = random.Random(f"{form}{indent}")
+    path = tmp_path / ("results.jsonl" if form == "jsonl" else "results.json")
+    for n in (0, 1, 20):
+        items = [_item(i, rng) for i in range(n)]
+        _write(path, items, form, indent)
+        assert list(result_stream.iter_results(path)) == items
+
+        hrefs = [item["other_info"]["href"] for item in items]
+        if form == "data_with_meta":
+            hrefs.insert(0, "meta")
+        assert list(result_stream.iter_result_hrefs(path)) == hrefs
@@ -0,0 +1,212 @@
+"""SeenIndex: tập href đã crawl lưu trong SQLite theo listing key, dựng một lần từ output/; digest card và
+chế độ persist=False của lần chạy có filter."""
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from conftest import site_module
+
+HREF = "https://example.vn/ban-nha-rieng-duong-le-loi-pr20000001"
+OTHER = "https://example.vn/ban-can-ho-chung-cu-pr20000002"
+
+
+def test_update_is_persisted(package, tmp_path):
+    seen_index = site_module(package, "seen_index")
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    index.update([HREF])
+    index.add(OTHER)
+    assert HREF in index and OTHER in index
+    index.close()
+
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    # add() chỉ ghi nhận trong phiên chạy, update() mới ghi xuống đĩa
+    assert HREF in index
+    assert OTHER not in index
+    assert len(index) == 1
+    index.close()
+
+
+def test_migrates_href_table(package, tmp_path):
+    seen_index = site_module(package, "seen_index")
+    listing_ids = site_module(package, "listing_ids")
+    # Bảng `seen` theo href của phiên bản trước
+    conn = sqlite3.connect(tmp_path / "seen.sqlite")
+    conn.execute("CREATE TABLE seen (href TEXT PRIMARY KEY, first_seen TEXT NOT NULL) WITHOUT ROWID")
+    conn.executemany("INSERT INTO seen VALUES (?, ?)", [(HREF, "2025-09-30"), (OTHER, "2025-09-30")])
+    conn.commit()
+    conn.close()
+
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    assert HREF in index and OTHER in index
+    assert len(index) == 2
+    index.close()
+    conn = sqlite3.connect(tmp_path / "seen.sqlite")
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    keys = {key for (key,) in conn.execute("SELECT key FROM listings")}
+    conn.close()
+    assert "seen" not in tables
+    assert keys == {listing_ids.listing_key(HREF), listing_ids.listing_key(OTHER)}
+
+
+def test_open_seen_index_bootstraps_once(package, tmp_path):
+    storage = site_module(package, "storage")
+    today = datetime(2025, 10, 1)
+    month = tmp_path / "2025-09"
+    month.mkdir()
+    day_file = month / "2025-09-30.json"
+    day_file.write_text(json.dumps({"data": [{"other_info": {"href": HREF}}]}), encoding="utf-8")
+
+    index = storage.open_seen_index(str(tmp_path), today)
+    assert HREF in index and OTHER not in index
+    index.close()
+
+    # Lần mở sau chỉ đọc SQLite, không quét lại output/
+    day_file.unlink()
+    index = storage.open_seen_index(str(tmp_path), today)
+    assert HREF in index
+    storage.save_results([{"href": OTHER, "title": "Bán căn hộ", "price": "2 tỷ"}], str(tmp_path / "2025-10-01.json"), index)
+    index.close()
+
+    index = storage.open_seen_index(str(tmp_path), today)
+    assert OTHER in index
+    index.close()
+
+
+def test_card_status(package, tmp_path):
+    seen_index = site_module(package, "seen_index")
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    digest = seen_index.card_digest("Bán nhà", "5 tỷ", "100 m²", "hôm nay")
+    assert index.card_status(HREF, digest) == seen_index.CARD_NEW
+
+    index.update([HREF], card_digests={HREF: digest})
+    assert index.card_status(HREF, digest) == seen_index.CARD_UNCHANGED
+    changed = seen_index.card_digest("Bán nhà", "4,5 tỷ", "100 m²", "hôm nay")
+    assert index.card_status(HREF, changed) == seen_index.CARD_CHANGED
+    assert index.card_stats == {
+        seen_index.CARD_NEW: 1, seen_index.CARD_CHANGED: 1, seen_index.CARD_UNCHANGED: 1,
+    }
+    index.close()
+
+
+def test_peek_status_has_no_side_effects(package, tmp_path):
+    seen_index = site_module(package, "seen_index")
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    index.update([HREF])
+    digest = seen_index.card_digest("Bán nhà", "5 tỷ")
+    changed = seen_index.card_digest("Bán nhà", "4 tỷ")
+
+    assert index.peek_status(OTHER, digest) == seen_index.CARD_NEW
+    assert index.peek_status(HREF, digest) == seen_index.CARD_UNCHANGED
+    # Không ghi digest: card khác vẫn được coi là không đổi, không có gì được đếm
+    assert index.peek_status(HREF, changed) == seen_index.CARD_UNCHANGED
+    assert sum(index.card_stats.values()) == 0
+
+    index.update([HREF], card_digests={HREF: digest})
+    assert index.peek_status(HREF, changed) == seen_index.CARD_CHANGED
+    assert index.peek_status(HREF, digest) == seen_index.CARD_UNCHANGED
+    assert sum(index.card_stats.values()) == 0
+    index.close()
+
+
+@pytest.mark.parametrize(
+    "posted_date, expected",
+    [
+        ("Cập nhật 3 giờ trước", "2025-10-18"),
+        ("2 ngày trước", "2025-10-16"),
+        ("Hôm qua", "2025-10-17"),
+        # Không xác định được ngày cụ thể
+        ("2 tuần trước", ""),
+        ("18/10/2025", "18/10/2025"),
+    ],
+)
+def test_card_date(package, posted_date, expected):
+    seen_index = site_module(package, "seen_index")
+    assert seen_index._card_date(posted_date, datetime(2025, 10, 18, 10)) == expected
+
+
+def test_check_card(package, tmp_path):
+    seen_index = site_module(package, "seen_index")
+    storage = site_module(package, "storage")
+    # Database cũ chưa có cột card_digest
+    conn = sqlite3.connect(tmp_path / "seen.sqlite")
+    conn.execute("CREATE TABLE listings (key INTEGER PRIMARY KEY, href TEXT, first_seen TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    index.update([HREF])
+    card = ("Bán nhà", "5 tỷ", "60 m2", "2 ngày trước")
+
+    assert seen_index.check_card(index, OTHER, "Bán căn hộ", "2 tỷ")[0] == seen_index.CARD_NEW
+    # Href đã crawl trước khi có digest: ghi digest hiện tại, coi như không đổi
+    assert seen_index.check_card(index, HREF, *card) == (seen_index.CARD_UNCHANGED, seen_index.card_digest(*card))
+    assert seen_index.check_card(index, HREF, *card)[0] == seen_index.CARD_UNCHANGED
+    changed = ("Bán nhà", "4,8 tỷ", "60 m2", "2 ngày trước")
+    assert seen_index.check_card(index, HREF, *changed)[0] == seen_index.CARD_CHANGED
+
+    # Digest mới chỉ được ghi khi item detail đã lưu
+    digest = seen_index.card_digest(*changed)
+    storage._update_sets_from_items([{"href": HREF, "card_digest": digest}], index)
+    index.close()
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    assert seen_index.check_card(index, HREF, *changed)[0] == seen_index.CARD_UNCHANGED
+    # Item không có digest không xoá digest đã lưu
+    storage._update_sets_from_items([{"href": HREF}], index)
+    assert index.card_status(HREF, digest) == seen_index.CARD_UNCHANGED
+    index.close()
+
+    assert seen_index.check_card({HREF}, HREF)[0] == seen_index.CARD_UNCHANGED
+
+
+def test_persist_false_keeps_hrefs_in_memory(package, tmp_path):
+    seen_index = site_module(package, "seen_index")
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    index.update([HREF])
+    index.close()
+
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite", persist=False)
+    assert HREF in index
+    index.update([OTHER], card_digests={OTHER: "d1"})
+    assert OTHER in index
+    index.close()
+
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    assert HREF in index
+    assert OTHER not in index
+    index.close()
+
+
+def test_card_status_without_digest_does_not_write_when_not_persisted(package, tmp_path):
+    seen_index = site_module(package, "seen_index")
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    index.update([HREF])
+    index.close()
+
+    digest = seen_index.card_digest("Bán nhà", "5 tỷ")
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite", persist=False)
+    assert index.card_status(HREF, digest) == seen_index.CARD_UNCHANGED
+    index.close()
+
+    # Lần chạy thường sau đó vẫn chưa có digest: card bất kỳ được coi là không đổi và ghi digest đó
+    index = seen_index.SeenIndex(tmp_path / "seen.sqlite")
+    other = seen_index.card_digest("Bán nhà", "4 tỷ")
+    assert index.card_status(HREF, other) == seen_index.CARD_UNCHANGED
+    assert index.card_status(HREF, digest) == seen_index.CARD_CHANGED
+    index.close()
+
+
+def test_open_seen_index_for_filtered_run(package, tmp_path):
+    storage = site_module(package, "storage")
+    today = datetime(2025, 10, 1)
+
+    index = storage.open_seen_index(str(tmp_path), today, persist=False)
+    index.update([HREF])
+    assert HREF in index
+    index.close()
+
+    index = storage.open_seen_index(str(tmp_path), today)
+    assert HREF not in index
+    index.close()
@@ -0,0 +1,265 @@
+"""Sink ghi kết quả (json, sqlite) và WriteBehindSink: checkpoint đi sau dữ liệu đã lưu."""
+from __future__ import annotations
+
+import gzip
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from conftest import site_module
+
+TODAY = datetime(2025, 10, 18)
+
+
+@pytest.fixture
+def sinks(package, monkeypatch):
+    sinks = site_module(package, "sinks")
+    monkeypatch.setattr(sinks.config, "SAVE_MODE", "journal")
+    return sinks
+
+
+def _page(page: int) -> list[dict]:
+    return [{"href": f"https://x/p{page}-{i}", "title": "t", "price": "1 tỷ"} for i in range(3)]
+
+
+def _recording_sink(sinks, delay: float = 0.0, fail: bool = False):
+    class RecordingSink(sinks.ResultSink):
+        name = "recording"
+
+        def __init__(self):
+            self.batches = []
+
+        def write(self, batch, results):
+            time.sleep(delay)
+            if fail:
+                raise OSError("disk full")
+            self.batches.append([item["href"] for item in batch])
+
+    return RecordingSink()
+
+
+def _returns(fn, timeout: float = 5.0) -> bool:
+    """fn() chạy xong trong `timeout` giây (không treo test nếu thread ghi đã chết)."""
+    thread = threading.Thread(target=fn, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_checkpoint_runs_after_covering_save(package, sinks, tmp_path):
+    storage = site_module(package, "storage")
+    _, _, results_file = sinks.config.prepare_output_paths(TODAY)
+    seen = storage.open_seen_index(str(tmp_path), TODAY)
+    recording = _recording_sink(sinks, delay=0.05)
+    order = []
+    sink = sinks.WriteBehindSink([sinks.JsonFileSink(str(results_file)), recording], seen, [], maxsize=2)
+    all_results = []
+    for page in range(4):
+        all_results.extend(_page(page))
+        sink.submit(all_results)
+        sink.call(lambda page=page: order.append((page, sum(map(len, recording.batches)))))
+    all_results.append({"href": "https://x/late", "title": "t", "price": "1 tỷ"})
+    sink.submit(all_results)
+    sink.close()
+
+    # Checkpoint của trang chỉ chạy khi các item của trang đã vào mọi sink
+    assert all(saved >= 3 * (page + 1) for page, saved in order)
+    assert sum(map(len, recording.batches)) == 13 and sink.stats["errors"] == 0
+    storage.compact_journal(str(results_file))
+    assert len(json.loads(results_file.read_text(encoding="utf-8"))["data"]) == 13
+    seen.close()
+    seen = storage.open_seen_index(str(tmp_path), TODAY)
+    assert "https://x/late" in seen and len(seen) == 13
+    seen.close()
+
+
+def test_json_sink_appends_only_batch_to_journal(package, sinks, tmp_path, monkeypatch):
+    storage = site_module(package, "storage")
+    appended = []
+    append_journal = storage.append_journal
+    monkeypatch.setattr(storage, "append_journal", lambda items, path: appended.append(len(items)) or append_journal(items, path))
+    results_file = str(tmp_path / "2025-10-18.json")
+    sink = sinks.JsonFileSink(results_file)
+    sink.write(_page(0), _page(0))
+    sink.write(_page(1), _page(0) + _page(1))
+
+    # Chỉ batch mới được đưa vào journal, không duyệt lại kết quả cả ngày
+    assert appended == [3, 3]
+    storage.compact_journal(results_file)
+    assert len(json.loads((tmp_path / "2025-10-18.json").read_text(encoding="utf-8"))["data"]) == 6
+
+
+def test_synchronous_mode_writes_in_submit(sinks):
+    recording = _recording_sink(sinks)
+    seen: set = set()
+    sink = sinks.WriteBehindSink([recording], seen, _page(0), threaded=False)
+    sink.submit(_page(0) + _page(1))
+    assert recording.batches == [[item["href"] for item in _page(1)]]
+    assert seen == {item["href"] for item in _page(1)}
+    sink.close()
+    with pytest.raises(RuntimeError):
+        sink.call(lambda: None)
+
+
+def test_failed_batch_is_retried_and_not_marked_seen(sinks):
+    broken = _recording_sink(sinks, fail=True)
+    recording = _recording_sink(sinks)
+    seen: set = set()
+    sink = sinks.WriteBehindSink([broken, recording], seen, [], threaded=False)
+    sink.submit(_page(0))
+    assert seen == set() and sink.stats["errors"] == 1
+
+    broken.write = lambda batch, results: None
+    sink.submit(_page(0) + _page(1))
+    # Batch lỗi được ghi lại cùng batch kế tiếp
+    assert len(recording.batches[-1]) == 6
+    assert len(seen) == 6
+    sink.close()
+
+
+def test_fingerprints_are_added_after_successful_write(package, sinks, tmp_path):
+    fingerprint = site_module(package, "fingerprint")
+    index = fingerprint.FingerprintIndex(tmp_path / "fingerprints.sqlite", "test")
+    broken = _recording_sink(sinks, fail=True)
+    item = {
+        "href": "https://x/a-1", "title": "Bán nhà", "agent_phone": "0912345678", "area": "60 m²", "price": "5 tỷ",
+    }
+    sink = sinks.WriteBehindSink([broken], set(), [], threaded=False, fingerprint_index=index)
+    sink.submit([item])
+    # Sink lỗi: tin chưa được lưu ở đâu thì không vào index fingerprint
+    assert len(index) == 0
+
+    broken.write = lambda batch, results: None
+    sink.call(lambda: None)
+    assert len(index) == 1
+    sink.close()
+    index.close()
+
+
+def test_checkpoint_waits_for_failed_batch(sinks):
+    broken = _recording_sink(sinks, fail=True)
+    seen: set = set()
+    calls = []
+    sink = sinks.WriteBehindSink([broken], seen, [], threaded=False)
+    sink.submit(_page(0))
+    # Không có item mới nhưng batch trước chưa lưu: checkpoint không được chạy
+    sink.call(calls.append, "checkpoint")
+    assert calls == [] and seen == set()
+
+    broken.write = lambda batch, results: None
+    sink.call(calls.append, "checkpoint")
+    assert calls == ["checkpoint"]
+    assert seen == {item["href"] for item in _page(0)}
+    sink.close()
+
+
+def test_index_error_does_not_stop_writer_thread(sinks):
+    class BrokenIndex(set):
+        def update(self, hrefs):
+            raise sqlite3.OperationalError("database is locked")
+
+    recording = _recording_sink(sinks)
+    sink = sinks.WriteBehindSink([recording], BrokenIndex(), [])
+    all_results = _page(0)
+    sink.submit(all_results)
+    assert _returns(sink.flush)
+    # Lỗi của thread ghi được báo ở lần submit kế tiếp, batch của lần đó không bị bỏ qua
+    all_results += _page(1)
+    with pytest.raises(RuntimeError) as excinfo:
+        sink.submit(all_results)
+    assert isinstance(excinfo.value.__cause__, sqlite3.OperationalError)
+    sink.submit(all_results)
+
+    assert _returns(sink.close)
+    assert [len(batch) for batch in recording.batches] == [3, 3]
+    assert sink.stats["errors"] == 2
+
+
+def test_sqlite_sink_upserts_changed_records(sinks, tmp_path):
+    db_path = tmp_path / "results.sqlite"
+    sink = sinks.SqliteSink(db_path, site="test")
+    item = {"href": "https://x/a-1", "title": "a", "price": "5 tỷ"}
+    sink.write([item], [item])
+    sink.write([dict(item)], [])
+    sink.write([dict(item, price="4 tỷ")], [])
+    # Ghi lại record không đổi không tính là upsert
+    assert sink.stats["upserts"] == 2
+    sink.close()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT site, href, data FROM results").fetchall()
+    conn.close()
+    assert len(rows) == 1
+    site, href, data = rows[0]
+    assert (site, href) == ("test", "https://x/a-1")
+    assert json.loads(data)["price"] == 4e9
+
+
+class _IngestStub(BaseHTTPRequestHandler):
+    """Service ingest giả: trả lần lượt các status trong `responses`, ghi lại body đã giải nén."""
+
+    responses: list = []
+    bodies: list = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        assert self.headers["Content-Encoding"] == "gzip"
+        self.bodies.append(json.loads(gzip.decompress(body)))
+        status, headers = self.responses.pop(0) if self.responses else (200, {})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ingest():
+    server = HTTPServer(("127.0.0.1", 0), _IngestStub)
+    _IngestStub.responses, _IngestStub.bodies = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/ingest", _IngestStub
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_sink_retries_and_aborts(sinks, ingest, monkeypatch):
+    url, stub = ingest
+    sleeps = []
+    monkeypatch.setattr(sinks.time, "sleep", sleeps.append)
+    sink = sinks.HttpSink(url, site="test", batch_size=2, max_retries=3, token="")
+    items = _page(0)
+
+    stub.responses = [(503, {"Retry-After": "7"}), (200, {})]
+    sink.write(items, items)
+    # Chunk đầu: 503 rồi 200 (chờ theo Retry-After), chunk sau: 200
+    assert [len(body["data"]) for body in stub.bodies] == [2, 2, 1]
+    assert {body["site"] for body in stub.bodies} == {"test"}
+    assert [sinks._item_href(record) for body in stub.bodies[1:] for record in body["data"]] == [
+        item["href"] for item in items
+    ]
+    assert sleeps == [7]
+    assert sink.stats["retries"] == 1 and sink.stats["requests"] == 2 and sink.stats["records"] == 3
+
+    # 4xx khác 408/429: không thử lại
+    stub.bodies.clear()
+    stub.responses = [(400, {})]
+    with pytest.raises(RuntimeError, match="HTTP 400"):
+        sink.write(items[:1], items)
+    assert len(stub.bodies) == 1 and sleeps == [7]
+    sink.close()
+
+
+def test_build_sinks(sinks, tmp_path):
+    assert [sink.name for sink in sinks.build_sinks(str(tmp_path / "2025-10-18.json"), ["json"])] == ["json"]
+    with pytest.raises(ValueError):
+        sinks.build_sinks(str(tmp_path / "2025-10-18.json"), ["ftp"])
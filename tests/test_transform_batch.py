@@ -0,0 +1,80 @@
+"""transform_batch cho kết quả giống hệt transform_to_example_format từng item."""
+from __future__ import annotations
+
+import importlib.util
+import json
+import random
+
+import pytest
+
+from conftest import DISTRICT_MAPPING, WARD_MAPPING, site_module
+
+LOCATIONS = [
+    "Số 5 Trần Thái Tông, Phường Dịch Vọng, Quận Cầu Giấy, Hà Nội",
+    "P. Quan Hoa, Q. Cầu Giấy, TP. Hà Nội",
+    "Kim Mã, Ba Đình, Hà Nội",
+    "Phường Bến Nghé, Quận 1, Hồ Chí Minh",
+    "Phường 01, Quận 10, TP.HCM",
+    "Đường Lê Lợi, Hồ Chí Minh",
+    "không rõ",
+]
+SPECS = {
+    "Diện tích": "60 m²", "Pháp lý": "Sổ đỏ/ Sổ hồng", "Số phòng ngủ": "3 phòng", "Số toilet": "2",
+    "Hướng nhà": "Đông Nam", "Nội thất": "Đầy đủ", "Số tầng": "3 tầng", "Loại hình nhà ở": "Nhà mặt phố",
+}
+
+
+@pytest.fixture
+def storage(package, mapping, tmp_path, monkeypatch):
+    (tmp_path / "district_mapping.json").write_text(json.dumps(DISTRICT_MAPPING), encoding="utf-8")
+    (tmp_path / "ward_mapping.json").write_text(json.dumps(WARD_MAPPING), encoding="utf-8")
+    centroids = {"1": {"lat": 21.03, "lng": 105.79, "province_id": 1, "district_id": 1}}
+    (tmp_path / "ward_centroids.json").write_text(json.dumps(centroids), encoding="utf-8")
+    names = ["mapping", "geo"]
+    if importlib.util.find_spec(f"{package}.craw_du_lieu.gazetteer") is not None:
+        names.append("gazetteer")
+        monkeypatch.setattr(site_module(package, "gazetteer"), "_gazetteer", None)
+    for name in names:
+        monkeypatch.setattr(site_module(package, name), "_json_mapping_path", lambda json_file: tmp_path / json_file)
+    geo = site_module(package, "geo")
+    monkeypatch.setattr(geo, "_grid", None)
+    monkeypatch.setattr(geo, "_memo", {})
+    return site_module(package, "storage")
+
+
+def _raw_items(n: int) -> list[dict]:
+    rng = random.Random(0)
+    items = []
+    for i in range(n):
+        item = {
+            "pid": str(20_000_000 + i),
+            "href": f"https://example.vn/{rng.choice(['ban', 'cho-thue'])}-nha-rieng-pr{20_000_000 + i}",
+            "title": f"{rng.choice(['Bán', 'Cho thuê'])} {rng.choice(['nhà riêng', 'căn hộ chung cư', 'đất nền'])}",
+            "price": rng.choice(["4,5 tỷ", "850 triệu", "12 triệu/tháng", "2.5 tỷ"]),
+            "area": f"{rng.randint(30, 300)} m²",
+            "location": rng.choice(LOCATIONS),
+            "specs": dict(rng.sample(sorted(SPECS.items()), rng.randint(2, len(SPECS)))),
+            "config": {},
+            "agent_name": "Anh Nam",
+            "agent_phone": "0901234567",
+            "images": [],
+        }
+        if rng.random() < 0.5:
+            item["map_coords"] = f"{21.03 + rng.uniform(-0.01, 0.01):.5f},{105.79 + rng.uniform(-0.01, 0.01):.5f}"
+        items.append(item)
+    return items
+
+
+def test_batch_matches_single(storage):
+    items = _raw_items(200)
+    single = [storage.transform_to_example_format(item) for item in items]
+    assert storage.transform_batch(items) == single
+    assert any(record.get("ward_id") for record in single)
+
+
+def test_transform_cached_many(storage, monkeypatch):
+    monkeypatch.setattr(storage, "_transform_cache", {})
+    items = _raw_items(50)
+    single = [storage.transform_to_example_format(item) for item in items]
+    assert storage.transform_cached_many(items + items[:10]) == single + single[:10]
+    assert storage.transform_cached_many(items) == single
@@ -0,0 +1,51 @@
+"""Cache transform trong save_results: item không đổi không bị transform lại, item đổi được ghi lại."""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from conftest import site_module
+
+
+@pytest.fixture
+def storage(package, monkeypatch):
+    storage = site_module(package, "storage")
+    monkeypatch.setattr(storage, "_transform_cache", {})
+    monkeypatch.setattr(storage, "transform_cache_stats", {"hits": 0, "misses": 0})
+    return storage
+
+
+def _items(n: int) -> list[dict]:
+    return [
+        {"href": f"https://example.vn/ban-nha-rieng-pr2000000{i}", "title": f"Bán nhà {i}", "price": f"{i + 1} tỷ"}
+        for i in range(n)
+    ]
+
+
+def test_transform_cached_reuses_unchanged_items(storage):
+    items = _items(3)
+    first = [storage.transform_cached(item) for item in items]
+    assert storage.transform_cache_stats == {"hits": 0, "misses": 3}
+    assert first == [storage.transform_to_example_format(item) for item in items]
+
+    # Cùng object, rồi bản sao cùng nội dung: đều lấy từ cache
+    assert [storage.transform_cached(item) for item in items] == first
+    assert [storage.transform_cached(dict(item)) for item in items] == first
+    assert storage.transform_cache_stats == {"hits": 6, "misses": 3}
+
+    changed = dict(items[0], price="9 tỷ")
+    assert storage.transform_cached(changed)["price"] == 9e9
+    assert storage.transform_cache_stats["misses"] == 4
+
+
+def test_append_journal_rewrites_changed_items(storage, tmp_path):
+    results_file = tmp_path / "2025-10-01.json"
+    (item,) = _items(1)
+    assert len(storage.append_journal([item], str(results_file))) == 1
+    assert storage.append_journal([dict(item)], str(results_file)) == []
+    assert len(storage.append_journal([dict(item, price="4 tỷ")], str(results_file))) == 1
+
+    assert storage.compact_journal(str(results_file)) == 1
+    (record,) = json.loads(results_file.read_text(encoding="utf-8"))["data"]
+    assert record["price"] == 4e9
@@ -0,0 +1,27 @@
+"""find_ward_key_loose: index ward/district theo (province_id, district_id), tra tên khớp chính xác trước."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import packages_with, site_module
+
+# Thứ tự trong file: "Phường 10" đứng trước "Phường 1"
+WARD_MAPPING = {
+    "10": {"name": "Phường 10", "province_id": 2, "district_id": 4.0},
+    "1": {"name": "Phường 1", "province_id": 2, "district_id": 4},
+    "3": {"name": "Phường Kim Mã", "province_id": 1, "district_id": 2},
+    "x": {"name": "Dòng lỗi", "province_id": 1, "district_id": 2},
+    "7": {"name": "Phường Giảng Võ", "province_id": 1, "district_id": None},
+}
+
+
+@pytest.mark.parametrize("package", packages_with("mapping.find_ward_key_loose"), indirect=True)
+def test_loose_index(package):
+    index = site_module(package, "mapping")._LooseIndex(WARD_MAPPING)
+    assert index.find("Phường 1", 2, 4) == 1
+    assert index.find("  phường   1 ", 2, None) == 1
+    assert index.find("Phường", 2, 4.0) == 10
+    assert index.find("kim", 1, 2) == 3
+    assert index.find("kim", 2, None) is None
+    assert index.find("Giảng Võ", 1, None) == 7
+    assert index.find("Giảng Võ", 1, 2) is None